@@ -0,0 +1 @@
+"""Симулятор внешних API и нагрузочные замеры бота."""
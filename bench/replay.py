@@ -0,0 +1,112 @@
+"""Воспроизведение записанных ответов API через разбор бота.
+
+    python -m bench.replay traffic.jsonl.gz --speedup 10
+
+Запись делает сам бот с RECORD_FILE. Каждый записанный ответ 200 с
+изменившимся телом проходит check_response, сравнение с уже виденными
+статусами того же студента и parse_status для изменившихся работ — как
+в цикле опроса, но без сети и Telegram. Ответы, тело которых не
+изменилось, бот не разбирает, и они только подсчитываются. Паузы между
+ответами сохраняются, делённые на speedup; с --speedup 0 ответы идут
+без пауз.
+"""
+import argparse
+import json
+import time
+from collections import Counter
+from http import HTTPStatus
+from typing import Callable, Dict, Iterable, List, Optional
+
+import homework
+from bench.run import percentile
+from services.diff import diff_statuses
+from services.recording import Record, read_records
+from services.state import HomeworkState
+
+PARSE_ERRORS = (ValueError, KeyError, TypeError)
+
+
+def replay_response(record: Record,
+                    known: Dict[str, HomeworkState]) -> List[str]:
+    """Разбирает один ответ и возвращает сообщения об изменениях.
+
+    known — статусы, уже виденные у студента; дополняется изменениями.
+    """
+    homeworks = homework.check_response(json.loads(record.body))
+    messages = []
+    for change in diff_statuses(known, homeworks):
+        messages.append(homework.parse_status(change.homework))
+        known[change.homework_id] = (change.status, change.updated)
+    return messages
+
+
+def replay(records: Iterable[Record], speedup: float = 0,
+           sleep: Callable[[float], None] = time.sleep,
+           clock: Callable[[], float] = time.perf_counter) -> dict:
+    """Прогоняет записи через разбор бота и возвращает сводку."""
+    known: Dict[str, Dict[str, HomeworkState]] = {}
+    latencies = []
+    errors: Counter = Counter()
+    skipped = unchanged = messages = size = 0
+    previous = None
+    started = clock()
+    for record in records:
+        if speedup and previous is not None:
+            sleep(max(record.at - previous, 0) / speedup)
+        previous = record.at
+        if record.status != HTTPStatus.OK:
+            skipped += 1
+            continue
+        if record.body is None:
+            unchanged += 1
+            continue
+        size += len(record.body.encode())
+        begin = clock()
+        try:
+            messages += len(replay_response(
+                record, known.setdefault(record.token, {})))
+        except PARSE_ERRORS as error:
+            errors[type(error).__name__] += 1
+        latencies.append(clock() - begin)
+    elapsed = clock() - started
+    return {
+        'responses': len(latencies),
+        'skipped': skipped,
+        'unchanged': unchanged,
+        'students': len(known),
+        'messages': messages,
+        'errors': dict(errors),
+        'bytes': size,
+        'elapsed_s': round(elapsed, 3),
+        'responses_per_s': round(len(latencies) / elapsed, 1)
+        if elapsed else None,
+        'parse_p50_ms': ms(percentile(latencies, 0.5)),
+        'parse_p99_ms': ms(percentile(latencies, 0.99)),
+        'parse_total_ms': ms(sum(latencies)),
+    }
+
+
+def ms(seconds: Optional[float]) -> Optional[float]:
+    """Секунды в миллисекундах с округлением; None остаётся None."""
+    return round(seconds * 1000, 3) if seconds is not None else None
+
+
+def main() -> None:
+    """Разбирает аргументы и печатает сводку."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='файл записи RECORD_FILE')
+    parser.add_argument('--speedup', type=float, default=0,
+                        help='во сколько раз сжимать паузы; 0 — без пауз')
+    parser.add_argument('--json', action='store_true',
+                        help='вывести сводку одной JSON-строкой')
+    args = parser.parse_args()
+    result = replay(read_records(args.path), args.speedup)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+        return
+    for key, value in result.items():
+        print(f'{key:>15}: {value}')
+
+
+if __name__ == '__main__':
+    main()
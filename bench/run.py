@@ -0,0 +1,151 @@
+"""Сквозной замер: опрос → разбор → отправка для N подписок.
+
+    python -m bench.run --tenants 1000 --duration 30 --mode async
+
+Печатает пропускную способность, задержку от смены статуса до
+уведомления (p50/p99), процессорное время и пиковый RSS процесса.
+Симулятор работает в том же процессе, и его процессорное время входит
+в замер.
+"""
+import argparse
+import asyncio
+import json
+import resource
+import threading
+import time
+from typing import List, Optional
+
+import telegram
+from telegram.utils.request import Request
+
+import homework
+from bench.simulator import (Simulator, SimulatorStats, add_config_arguments,
+                             parse_config)
+from services.scheduler import PollPolicy
+from services.tenants import Tenant
+
+BOT_TOKEN = '123456:bench'
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    """Перцентиль по ближайшему рангу; None для пустого списка."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def prepare(endpoint: str, telegram_url: str, interval: float,
+            workers: int) -> telegram.Bot:
+    """Настраивает homework на симулятор и возвращает бота."""
+    homework.ENDPOINT = endpoint
+    homework.poll_policy = PollPolicy(base=interval, reviewing=interval,
+                                      idle=interval)
+    homework.init_session(workers)
+    homework.init_state_store(None)
+    homework.init_response_cache()
+    bot = telegram.Bot(BOT_TOKEN, base_url=telegram_url,
+                       request=Request(con_pool_size=workers))
+    homework.init_outbox(bot)
+    return bot
+
+
+def run_load(bot: telegram.Bot, tenants: List[Tenant], mode: str,
+             duration: float, workers: int) -> None:
+    """Гоняет цикл опроса duration секунд."""
+    if mode == 'async':
+        async def limited() -> None:
+            try:
+                await asyncio.wait_for(
+                    homework.run_tenants_async(bot, tenants, workers),
+                    duration)
+            except asyncio.TimeoutError:
+                pass
+        asyncio.run(limited())
+        return
+    thread = threading.Thread(target=homework.run_tenants,
+                              args=(bot, tenants), daemon=True)
+    thread.start()
+    thread.join(duration)
+
+
+def report(stats: SimulatorStats, tenants: int, duration: float,
+           cpu: float) -> dict:
+    """Сводка замера."""
+    p50 = percentile(stats.latencies, 0.5)
+    p99 = percentile(stats.latencies, 0.99)
+    return {
+        'tenants': tenants,
+        'duration_s': round(duration, 2),
+        'polls': stats.polls,
+        'polls_per_s': round(stats.polls / duration, 1),
+        'poll_errors': stats.poll_errors,
+        'api_rate_limited': stats.api_rate_limited,
+        'sends': stats.sends,
+        'sends_per_s': round(stats.sends / duration, 1),
+        'send_errors': stats.send_errors,
+        'rate_limited': stats.rate_limited,
+        'status_changes': stats.changes,
+        'notified_changes': len(stats.latencies),
+        'latency_p50_s': None if p50 is None else round(p50, 3),
+        'latency_p99_s': None if p99 is None else round(p99, 3),
+        'cpu_s': round(cpu, 2),
+        'cpu_ms_per_poll': round(cpu * 1000 / max(stats.polls, 1), 3),
+        'max_rss_mb': round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def benchmark(tenants: int = 100, duration: float = 10,
+              mode: str = 'async', interval: float = 1.0,
+              workers: int = 16, simulator: Optional[Simulator] = None,
+              ) -> dict:
+    """Запускает замер на симуляторе и возвращает сводку."""
+    own_simulator = simulator is None
+    if own_simulator:
+        simulator = Simulator().start()
+    bot = prepare(simulator.endpoint, simulator.telegram_url, interval,
+                  workers)
+    subscriptions = [Tenant(f'token{number}', str(number))
+                     for number in range(tenants)]
+    cpu_started = time.process_time()
+    started = time.monotonic()
+    run_load(bot, subscriptions, mode, duration, workers)
+    homework.outbox.stop(timeout=interval)
+    elapsed = time.monotonic() - started
+    result = report(simulator.stats, tenants, elapsed,
+                    time.process_time() - cpu_started)
+    if own_simulator:
+        simulator.stop()
+    return result
+
+
+def main() -> None:
+    """Разбирает аргументы и печатает сводку."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tenants', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--mode', choices=('sync', 'async'),
+                        default='async')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='интервал опроса подписки, с')
+    parser.add_argument('--workers', type=int, default=16,
+                        help='потоки для сетевых вызовов')
+    parser.add_argument('--json', action='store_true',
+                        help='вывести сводку одной JSON-строкой')
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    simulator = Simulator(parse_config(args)).start()
+    result = benchmark(args.tenants, args.duration, args.mode,
+                       args.interval, args.workers, simulator)
+    simulator.stop()
+    if args.json:
+        print(json.dumps(result))
+        return
+    for key, value in result.items():
+        print(f'{key:>18}: {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+"""Локальный симулятор API Практикума и Telegram Bot API.
+
+Запуск отдельным процессом::
+
+    python -m bench.simulator --port 8080 --latency 0.05 --error-rate 0.01
+
+Эндпоинт статусов: http://127.0.0.1:8080/api/user_api/homework_statuses/
+Telegram: telegram.Bot(token, base_url='http://127.0.0.1:8080/bot')
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+HOMEWORKS_PATH = '/api/user_api/homework_statuses/'
+TELEGRAM_PREFIX = '/bot'
+STATUS_CYCLE = ('reviewing', 'rejected', 'reviewing', 'approved')
+HOMEWORK_NAME = re.compile(r'работы "([^"]+)"')
+
+Fault = Tuple[int, dict, Dict[str, str]]
+
+
+@dataclass
+class SimulatorConfig:
+    """Поведение симулятора."""
+
+    latency: float = 0.0
+    error_rate: float = 0.0
+    api_429_rate: float = 0.0
+    telegram_latency: float = 0.0
+    telegram_429_rate: float = 0.0
+    telegram_error_rate: float = 0.0
+    retry_after: int = 1
+    history: int = 10
+    comment_size: int = 100
+    change_interval: float = 1.0
+    seed: Optional[int] = None
+
+
+@dataclass
+class SimulatedHomework:
+    """Работа студента в симуляторе."""
+
+    id: int
+    name: str
+    status_index: int = 0
+    updated: float = 0.0
+
+    def as_json(self, comment: str) -> dict:
+        """Запись в формате API Практикума."""
+        date = datetime.fromtimestamp(self.updated, timezone.utc)
+        return {
+            'id': self.id,
+            'status': STATUS_CYCLE[self.status_index % len(STATUS_CYCLE)],
+            'homework_name': self.name,
+            'reviewer_comment': comment,
+            'date_updated': date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'lesson_name': self.name,
+        }
+
+
+@dataclass
+class SimulatorStats:
+    """Счётчики симулятора."""
+
+    polls: int = 0
+    poll_errors: int = 0
+    api_rate_limited: int = 0
+    sends: int = 0
+    send_errors: int = 0
+    rate_limited: int = 0
+    changes: int = 0
+    latencies: List[float] = field(default_factory=list)
+
+
+class Simulator:
+    """HTTP-сервер, изображающий оба API.
+
+    Каждые change_interval секунд у каждой известной подписки меняется
+    статус одной работы; время смены запоминается, и когда в sendMessage
+    приходит текст с именем этой работы, в stats.latencies попадает
+    задержка от смены статуса до уведомления.
+    """
+
+    def __init__(self, config: Optional[SimulatorConfig] = None,
+                 host: str = '127.0.0.1', port: int = 0) -> None:
+        """Создаёт сервер; слушать начинает start()."""
+        self.config = config or SimulatorConfig()
+        self.stats = SimulatorStats()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._tenants: Dict[str, List[SimulatedHomework]] = {}
+        self._changed_at: Dict[str, float] = {}
+        self._comment = 'x' * self.config.comment_size
+        self._stopped = threading.Event()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def base_url(self) -> str:
+        """Адрес сервера."""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    @property
+    def endpoint(self) -> str:
+        """Адрес эндпоинта статусов домашних работ."""
+        return self.base_url + HOMEWORKS_PATH
+
+    @property
+    def telegram_url(self) -> str:
+        """base_url для telegram.Bot."""
+        return self.base_url + TELEGRAM_PREFIX
+
+    def start(self) -> 'Simulator':
+        """Запускает сервер и смену статусов в фоновых потоках."""
+        for target in (self._server.serve_forever, self._mutate):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        """Останавливает сервер."""
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _tenant(self, token: str) -> List[SimulatedHomework]:
+        homeworks = self._tenants.get(token)
+        if homeworks is None:
+            now = time.time()
+            homeworks = self._tenants[token] = [
+                SimulatedHomework(number, f'{token}-hw{number}',
+                                  status_index=3, updated=now - 86400)
+                for number in range(self.config.history)]
+        return homeworks
+
+    def _mutate(self) -> None:
+        step = 0
+        while not self._stopped.wait(self.config.change_interval):
+            now = time.time()
+            with self._lock:
+                for homeworks in self._tenants.values():
+                    homework = homeworks[step % len(homeworks)]
+                    homework.status_index += 1
+                    homework.updated = now
+                    self._changed_at[homework.name] = time.monotonic()
+                    self.stats.changes += 1
+            step += 1
+
+    def homeworks(self, token: str, from_date: int) -> dict:
+        """Ответ API статусов для подписки с токеном token."""
+        with self._lock:
+            self.stats.polls += 1
+            homeworks = [
+                homework.as_json(self._comment)
+                for homework in self._tenant(token)
+                if homework.updated >= from_date]
+        return {'homeworks': homeworks, 'current_date': int(time.time())}
+
+    def received(self, text: str) -> None:
+        """Учитывает уведомление, пришедшее в sendMessage."""
+        now = time.monotonic()
+        with self._lock:
+            self.stats.sends += 1
+            for name in HOMEWORK_NAME.findall(text):
+                changed_at = self._changed_at.pop(name, None)
+                if changed_at is not None:
+                    self.stats.latencies.append(now - changed_at)
+
+    def api_fault(self) -> Optional[Fault]:
+        """Ошибка вместо ответа API статусов; None — отвечать как обычно."""
+        config = self.config
+        chance = self._random.random()
+        with self._lock:
+            if chance < config.error_rate:
+                self.stats.poll_errors += 1
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {}, {}
+            if chance < config.error_rate + config.api_429_rate:
+                self.stats.api_rate_limited += 1
+                return (HTTPStatus.TOO_MANY_REQUESTS, {},
+                        {'Retry-After': str(config.retry_after)})
+        return None
+
+    def telegram_fault(self) -> Optional[Fault]:
+        """Ошибка вместо ответа sendMessage; None — отвечать как обычно."""
+        config = self.config
+        chance = self._random.random()
+        with self._lock:
+            if chance < config.telegram_429_rate:
+                self.stats.rate_limited += 1
+                return HTTPStatus.TOO_MANY_REQUESTS, {
+                    'ok': False,
+                    'error_code': HTTPStatus.TOO_MANY_REQUESTS,
+                    'description': 'Too Many Requests',
+                    'parameters': {'retry_after': config.retry_after},
+                }, {}
+            if chance < config.telegram_429_rate + config.telegram_error_rate:
+                self.stats.send_errors += 1
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {
+                    'ok': False,
+                    'error_code': HTTPStatus.INTERNAL_SERVER_ERROR,
+                    'description': 'Internal Server Error',
+                }, {}
+        return None
+
+    def _handler(self) -> type:
+        simulator = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def reply(self, status: int, data: dict,
+                      headers: Optional[dict] = None) -> None:
+                body = json.dumps(data, ensure_ascii=False).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                url = urlparse(self.path)
+                if url.path != HOMEWORKS_PATH:
+                    self.reply(HTTPStatus.NOT_FOUND, {})
+                    return
+                time.sleep(simulator.config.latency)
+                fault = simulator.api_fault()
+                if fault is not None:
+                    self.reply(*fault)
+                    return
+                token = self.headers.get('Authorization', '')[len('OAuth '):]
+                query = parse_qs(url.query)
+                from_date = int(float(query.get('from_date', ['0'])[0]))
+                self.reply(HTTPStatus.OK,
+                           simulator.homeworks(token, from_date))
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'{}')
+                if not self.path.endswith('/sendMessage'):
+                    self.reply(HTTPStatus.OK, {'ok': True, 'result': True})
+                    return
+                time.sleep(simulator.config.telegram_latency)
+                fault = simulator.telegram_fault()
+                if fault is not None:
+                    self.reply(*fault)
+                    return
+                simulator.received(payload.get('text', ''))
+                self.reply(HTTPStatus.OK, {'ok': True, 'result': {
+                    'message_id': simulator.stats.sends,
+                    'date': int(time.time()),
+                    'chat': {'id': payload.get('chat_id'),
+                             'type': 'private'},
+                    'text': payload.get('text', ''),
+                }})
+
+        return Handler
+
+
+def parse_config(args: argparse.Namespace) -> SimulatorConfig:
+    """Собирает SimulatorConfig из аргументов командной строки."""
+    return SimulatorConfig(
+        latency=args.latency, error_rate=args.error_rate,
+        api_429_rate=args.api_429_rate,
+        telegram_latency=args.telegram_latency,
+        telegram_429_rate=args.telegram_429_rate,
+        telegram_error_rate=args.telegram_error_rate,
+        retry_after=args.retry_after, history=args.history,
+        comment_size=args.comment_size,
+        change_interval=args.change_interval, seed=args.seed)
+
+
+def add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    """Добавляет в parser параметры симулятора."""
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='задержка ответа API статусов, с')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='доля ответов 500 от API статусов')
+    parser.add_argument('--api-429-rate', type=float, default=0.0,
+                        help='доля ответов 429 с Retry-After от API статусов')
+    parser.add_argument('--telegram-latency', type=float, default=0.0,
+                        help='задержка ответа sendMessage, с')
+    parser.add_argument('--telegram-429-rate', type=float, default=0.0,
+                        help='доля ответов 429 от sendMessage')
+    parser.add_argument('--telegram-error-rate', type=float, default=0.0,
+                        help='доля ответов 500 от sendMessage')
+    parser.add_argument('--retry-after', type=int, default=1,
+                        help='Retry-After и retry_after в ответах 429, с')
+    parser.add_argument('--history', type=int, default=10,
+                        help='число работ у каждой подписки')
+    parser.add_argument('--comment-size', type=int, default=100,
+                        help='длина reviewer_comment, байт')
+    parser.add_argument('--change-interval', type=float, default=1.0,
+                        help='как часто у подписки меняется статус, с')
+    parser.add_argument('--seed', type=int, default=None)
+
+
+def main() -> None:
+    """Запускает симулятор до Ctrl+C."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    simulator = Simulator(parse_config(args), args.host, args.port).start()
+    print(f'API статусов: {simulator.endpoint}')
+    print(f'Telegram base_url: {simulator.telegram_url}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        simulator.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""Замер холодного старта: сколько стоит импорт бота в новом процессе.
+
+    python -m bench.startup --runs 20
+
+Печатает медиану и p90 времени запуска интерпретатора с импортом
+модуля за вычетом пустого запуска, а также самые дорогие импорты
+по данным python -X importtime.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import List, Tuple
+
+from bench.run import percentile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_python(*args: str) -> subprocess.CompletedProcess:
+    """Запускает новый интерпретатор в корне проекта."""
+    return subprocess.run((sys.executable,) + args, cwd=ROOT, check=True,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True)
+
+
+def wall_times(statement: str, runs: int) -> List[float]:
+    """Время запуска интерпретатора, выполняющего statement, в секундах."""
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        run_python('-c', statement)
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def parse_import_times(output: str, module: str) -> List[Tuple[int, str]]:
+    """Прямые импорты module из вывода -X importtime: [(мкс, модуль)].
+
+    Время импорта включает время вложенных в него импортов.
+    """
+    children = []
+    for line in output.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if name.strip() == module:
+                return sorted(children, reverse=True)
+            children = []
+        elif depth == 1:
+            children.append((int(cumulative), name.strip()))
+    return []
+
+
+def top_imports(module: str) -> List[Tuple[int, str]]:
+    """Самые дорогие импорты, выполняемые при импорте module."""
+    output = run_python('-X', 'importtime', '-c', f'import {module}').stderr
+    return parse_import_times(output, module)
+
+
+def startup(module: str = 'homework', runs: int = 10, top: int = 10) -> dict:
+    """Сводка замера холодного старта модуля."""
+    baseline = wall_times('pass', runs)
+    times = wall_times(f'import {module}', runs)
+    overhead = percentile(baseline, 0.5)
+    return {
+        'module': module,
+        'runs': runs,
+        'interpreter_ms': round(overhead * 1000, 1),
+        'import_p50_ms': round((percentile(times, 0.5) - overhead) * 1000, 1),
+        'import_p90_ms': round((percentile(times, 0.9) - overhead) * 1000, 1),
+        'top_imports_ms': {name: round(micros / 1000, 1)
+                           for micros, name in top_imports(module)[:top]},
+    }
+
+
+def main() -> None:
+    """Разбирает аргументы и печатает сводку."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='homework')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--json', action='store_true',
+                        help='вывести сводку одной JSON-строкой')
+    args = parser.parse_args()
+    result = startup(args.module, args.runs, args.top)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+        return
+    for key, value in result.items():
+        print(f'{key:>15}: {value}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,20 +1,125 @@
+from __future__ import annotations
+
+from concurrent.futures import Executor, ThreadPoolExecutor
 from http import HTTPStatus
 
+import argparse
+import atexit
+import contextvars
+import heapq
 import requests
 import logging
 import os
+import signal
+import socket
 import time
+from functools import partial
+from operator import attrgetter
+from types import ModuleType
 from logging.handlers import RotatingFileHandler
-import telegram
+from typing import (TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List,
+                    Optional, Tuple, Union)
+
+from services.alerts import GLOBAL_SCOPE, ErrorAggregator, fingerprint
+from services.diff import diff_statuses, parse_updated
+from services.lease import LeaseKeeper, SQLiteLease
+from services.messages import TEXT, Catalog, Renderer, parse_mode
+from services.logs import JsonFormatter, start_queue_logging
+from services.http import (ApiResponseError, ResponseCache,
+                           parse_retry_after, pooled_session)
+from services.metrics import Registry, serve_metrics
+from services.outbox import Outbox
+from services.profiling import Profiler, Sampler, functions, package
+from services.recording import Recorder
+from services.resilience import Backoff, CircuitBreaker, CircuitOpenError
+from services.scheduler import PollPolicy
+from services.shutdown import Shutdown
+from services.singleflight import CoalescingCache, SingleFlight
+from services.snapshots import SnapshotCache
+from services.state import MemoryStateStore, open_state_store
+from services.stream import HomeworkStream
+from services.tenants import Tenant, load_tenants
+from services.tracing import FileExporter, NoopTracer, Tracer
 
-from dotenv import load_dotenv
+if TYPE_CHECKING:
+    import asyncio
+    import telegram
+    import telegram.ext
 
-load_dotenv()
+ENV_FILE = os.getenv('ENV_FILE', os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '.env'))
+if os.path.exists(ENV_FILE):
+    from dotenv import load_dotenv
+    load_dotenv(ENV_FILE)
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+ERRORS_CHAT_ID = os.getenv('ERRORS_CHAT_ID', TELEGRAM_CHAT_ID)
+TENANTS_FILE = os.getenv('TENANTS_FILE')
+ASYNC_MODE = os.getenv('ASYNC_MODE', '').lower() in ('1', 'true', 'yes')
+IO_THREADS = int(os.getenv('IO_THREADS', 16))
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', IO_THREADS))
+CONNECT_TIMEOUT = float(os.getenv('CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.getenv('READ_TIMEOUT', 10))
 
 RETRY_TIME = 600
+CURSOR_OVERLAP = int(os.getenv('CURSOR_OVERLAP', 120))
+STATE_DB = os.getenv('STATE_DB')
+REVIEWING_RETRY_TIME = int(os.getenv('REVIEWING_RETRY_TIME', 120))
+IDLE_RETRY_TIME = int(os.getenv('IDLE_RETRY_TIME', 1800))
+TELEGRAM_GLOBAL_RATE = float(os.getenv('TELEGRAM_GLOBAL_RATE', 30))
+TELEGRAM_CHAT_RATE = float(os.getenv('TELEGRAM_CHAT_RATE', 1))
+OUTBOX_WORKERS = int(os.getenv('OUTBOX_WORKERS', 4))
+UNAVAILABLE_CODES = (
+    HTTPStatus.REQUEST_TIMEOUT,
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.INTERNAL_SERVER_ERROR,
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+)
+STATE_FLUSH_INTERVAL = 1.0
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', 20))
+ERROR_WINDOW = float(os.getenv('ERROR_WINDOW', 3600))
+ERROR_SUMMARY_INTERVAL = float(os.getenv('ERROR_SUMMARY_INTERVAL', 3600))
+LOG_JSON = os.getenv('LOG_FORMAT', '').lower() == 'json'
+LOG_FILE = os.getenv('LOG_FILE', 'homework.py.log')
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 0))
+SHARDS = int(os.getenv('SHARDS', 1))
+NODE_COUNT = int(os.getenv('NODE_COUNT', 1))
+NODE_INDEX = int(os.getenv('NODE_INDEX', 0))
+LEASE_DB = os.getenv('LEASE_DB', STATE_DB)
+LEASE_TTL = float(os.getenv('LEASE_TTL', 30))
+LEASE_NAME = f'poller/node-{NODE_INDEX}'
+COMMANDS = os.getenv('COMMANDS', '').lower()
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8443))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+STATUS_TTL = float(os.getenv('STATUS_TTL', 2 * IDLE_RETRY_TIME))
+STATUS_LINES = 10
+FULL_HISTORY_FROM = 1
+RESPONSE_CACHE = os.getenv('RESPONSE_CACHE', '1').lower() in (
+    '1', 'true', 'yes')
+STREAM_RESPONSES = os.getenv('STREAM_RESPONSES', '').lower() in (
+    '1', 'true', 'yes')
+STREAM_CHUNK_SIZE = int(os.getenv('STREAM_CHUNK_SIZE', 16384))
+API_CACHE_TTL = float(os.getenv('API_CACHE_TTL', 5))
+API_CACHE_SIZE = int(os.getenv('API_CACHE_SIZE', 1024))
+TRACE_FILE = os.getenv('TRACE_FILE')
+RECORD_FILE = os.getenv('RECORD_FILE')
+PROFILE_WINDOW = float(os.getenv('PROFILE_WINDOW', 30))
+PROFILE_DIR = os.getenv('PROFILE_DIR', '.')
+PROFILE_SIGNAL = getattr(signal, 'SIGUSR1', None)
+PROFILE_TARGETS = {
+    'get_api_answer': functions(__file__, 'get_api_answer',
+                                'fetch_response'),
+    'check_response': functions(__file__, 'check_response'),
+    'parse_status': functions(__file__, 'parse_status', 'render_status'),
+    'send_message': functions(__file__, 'send_message', 'deliver_message'),
+    'logging': package(os.path.dirname(logging.__file__)),
+}
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
@@ -23,67 +128,347 @@ VERDICTS = {
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+DEFAULT_LOCALE = 'ru'
+CATALOGS = {
+    'ru': Catalog(
+        'Изменился статус проверки работы "{name}". {verdict}',
+        VERDICTS, 'Сбой в работе программы: {error}',
+        'Повторных сбоев за последние {minutes} мин.: {count}',
+        'Работа "{name}": {verdict}', {
+            'empty': 'Работ на проверке пока нет.',
+            'failed': 'Не удалось получить статусы, попробуйте позже.',
+            'paused': 'Уведомления приостановлены. Включить: /subscribe',
+            'subscribed': 'Уведомления включены.',
+            'unknown': 'Этот чат не подписан на уведомления.',
+        }),
+    'en': Catalog(
+        'Homework "{name}" review status changed. {verdict}', {
+            'approved': 'The reviewer approved the homework. Hooray!',
+            'reviewing': 'The reviewer has started reviewing the homework.',
+            'rejected': 'The reviewer has left comments on the homework.',
+        }, 'Bot failure: {error}',
+        'Repeated failures in the last {minutes} min: {count}',
+        'Homework "{name}": {verdict}', {
+            'empty': 'No homework has been submitted yet.',
+            'failed': 'Could not fetch statuses, please try again later.',
+            'paused': 'Notifications are paused. Resume: /subscribe',
+            'subscribed': 'Notifications are on.',
+            'unknown': 'This chat is not subscribed to notifications.',
+        }),
+}
+renderer = Renderer(CATALOGS, DEFAULT_LOCALE)
+
+session: Optional[requests.Session] = None
+state_store = MemoryStateStore()
+outbox: Optional[Outbox] = None
+lease_keeper: Optional[LeaseKeeper] = None
+response_cache: Optional[ResponseCache] = None
+api_calls: Optional[CoalescingCache] = None
+tracer: NoopTracer = NoopTracer()
+recorder: Optional[Recorder] = None
+status_cache = SnapshotCache(STATUS_TTL)
+status_refreshes = SingleFlight()
+subscriptions: Dict[str, List[Tenant]] = {}
+updater: Optional[telegram.ext.Updater] = None
+error_alerts = ErrorAggregator(window=ERROR_WINDOW,
+                               summary_interval=ERROR_SUMMARY_INTERVAL)
+poll_policy = PollPolicy(base=RETRY_TIME, reviewing=REVIEWING_RETRY_TIME,
+                         idle=IDLE_RETRY_TIME)
+retry_backoff = Backoff(base=30, cap=IDLE_RETRY_TIME)
+api_breaker = CircuitBreaker(
+    probe_timeout=CONNECT_TIMEOUT + READ_TIMEOUT)
+
+metrics = Registry()
+polls_total = metrics.counter(
+    'homework_bot_polls', 'Запросы к API Практикума по коду ответа.')
+sends_total = metrics.counter(
+    'homework_bot_sends', 'Отправки сообщений в Telegram.')
+errors_total = metrics.counter(
+    'homework_bot_errors', 'Сбои цикла опроса по типу исключения.')
+api_latency = metrics.histogram(
+    'homework_bot_api_latency_seconds', 'Время запроса к API Практикума.')
+send_latency = metrics.histogram(
+    'homework_bot_send_latency_seconds', 'Время отправки в Telegram.')
+notification_latency = metrics.histogram(
+    'homework_bot_notification_latency_seconds',
+    'Время от смены статуса до отправки уведомления.')
+cache_hits_total = metrics.counter(
+    'homework_bot_cache_hits',
+    'Опросы, ответ которых не изменился и не разбирался.')
+poll_cycles_total = metrics.counter(
+    'homework_bot_poll_cycles', 'Выполненные циклы опроса подписок.')
+commands_total = metrics.counter(
+    'homework_bot_commands', 'Команды бота по имени.')
+tenants_gauge = metrics.gauge(
+    'homework_bot_tenants', 'Число опрашиваемых подписок.')
+metrics.gauge('homework_bot_outbox_depth',
+              'Сообщения, ожидающие отправки.',
+              lambda: len(outbox) if outbox is not None else 0)
+metrics.gauge('homework_bot_api_shared_requests',
+              'Запросы к API, получившие чужой или недавний ответ.',
+              lambda: api_calls.shared if api_calls is not None else 0)
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
+services_logger = logging.getLogger('services')
+services_logger.setLevel(logging.INFO)
 handler = RotatingFileHandler(
-    'homework.py.log',
+    LOG_FILE,
     maxBytes=50000000,
     backupCount=5,
-    encoding='utf-8')
-logger.addHandler(handler)
+    encoding='utf-8',
+    delay=True)
+if LOG_JSON:
+    handler.setFormatter(JsonFormatter())
+log_listener = start_queue_logging((logger, services_logger), handler)
+atexit.register(log_listener.stop)
 
-LOG_SEND_SUCCESSFUL = 'Успешная отправка сообщения: '
-LOG_SEND_ERROR = 'Ошибка при отправке сообщения: '
+LOG_SEND_SUCCESSFUL = 'Успешная отправка сообщения: %s'
+LOG_SEND_ERROR = 'Ошибка при отправке сообщения: %s'
+LOG_SEND_REJECTED = ('Telegram отказался доставить статус работы %s '
+                     'подписке %s, статус считается обработанным')
 LOG_CONNECTION_TRY = 'Попытка запроса к: '
-LOG_CONNECTION_SUCCESSFUL = 'Успешный запрос с '
+LOG_CONNECTION_SUCCESSFUL = 'Успешный запрос с %s'
 LOG_CONNECTION_ERROR = 'Ошибка при запросе: '
 LOG_CODE_ERROR = '\n Код ошибки: '
 LOG_KEY_ERROR = 'Не найден ключ: '
 LOG_NOT_HOMEWORKS = 'В ответе сервера не нашел: '
+LOG_NOT_DICT = 'Ответ сервера должен быть словарём, получен: '
 LOG_NOT_TOKEN = 'Нет обязательной переменной для запуска программы'
 LOG_LOOP_REPEAT = f'Бот делает повторный запрос, после {RETRY_TIME}с. сна'
 LOG_NO_STATUS_CHANGED = (f'Статусы не изменены, '
                          f'повторная проверка через {RETRY_TIME}с.')
+LOG_TENANTS_LOADED = 'Загружено подписок: %d'
+LOG_SHARD_TENANTS = 'Шард %s опрашивает подписок: %d'
+LOG_SHARDS_WITHOUT_DB = ('SHARDS без STATE_DB: при перераспределении '
+                         'подписок состояние не передаётся между шардами')
+LOG_COMMANDS_SINGLE_PROCESS = ('Команды бота принимает только один процесс: '
+                               'при SHARDS или NODE_COUNT больше 1 '
+                               'они отключены')
+LOG_COMMANDS_STARTED = 'Команды бота принимаются через %s'
+LOG_STATUS_FAILED = 'Не удалось обновить статусы для /status: %s'
+LOG_STATUS_PARSED = 'Успешно извлекли и передали: \n имя: "%s", \n статус: %s'
+
+
+def load_telegram() -> ModuleType:
+    """Импортирует python-telegram-bot при первом обращении.
+
+    Библиотека тянет за собой большое дерево зависимостей, а нужна
+    только для отправки сообщений, поэтому не грузится при импорте.
+    """
+    import telegram
+    import telegram.utils.request
+    return telegram
+
+
+def create_bot(token: Optional[str] = TELEGRAM_TOKEN,
+               **kwargs: object) -> telegram.Bot:
+    """Создаёт бота с пулом соединений на все потоки отправки."""
+    telegram = load_telegram()
+    request = telegram.utils.request.Request(
+        con_pool_size=max(IO_THREADS, OUTBOX_WORKERS))
+    return telegram.Bot(token=token, request=request, **kwargs)
 
 
 def send_message(bot: telegram.Bot, message: str) -> bool:
     """Отправляет сообщение в Telegram чат."""
+    return send_message_to(bot, TELEGRAM_CHAT_ID, message)
+
+
+def send_message_to(bot: telegram.Bot, chat_id: str, message: str,
+                    parse_mode: Optional[str] = None) -> bool:
+    """Отправляет сообщение в указанный Telegram чат."""
     try:
-        bot.send_message(chat_id=TELEGRAM_CHAT_ID, text=message)
-        logger.info(LOG_SEND_SUCCESSFUL + message)
+        deliver_message(bot, chat_id, message, parse_mode)
         return True
-    except ConnectionError:
-        logger.error(LOG_SEND_ERROR + message)
+    except (ConnectionError, load_telegram().error.TelegramError):
+        logger.error(LOG_SEND_ERROR, message)
         return False
 
 
+def deliver_message(bot: telegram.Bot, chat_id: str, message: str,
+                    parse_mode: Optional[str] = None) -> None:
+    """Отправляет сообщение, пропуская ошибки Telegram наружу."""
+    options = {'parse_mode': parse_mode} if parse_mode else {}
+    started = time.monotonic()
+    try:
+        with tracer.span('send_message', {
+                'telegram.chat_id': chat_id,
+                'telegram.parse_mode': parse_mode}):
+            bot.send_message(chat_id=chat_id, text=message, **options)
+    except Exception:
+        sends_total.inc(result='error')
+        raise
+    finally:
+        send_latency.observe(time.monotonic() - started)
+    sends_total.inc(result='ok')
+    logger.info(LOG_SEND_SUCCESSFUL, message)
+
+
 def get_api_answer(current_timestamp: int) -> requests.get:
     """Делает запрос к эндпоинту API-сервиса."""
+    return request_homeworks(PRACTICUM_TOKEN, current_timestamp)
+
+
+def request_homeworks(token: str, current_timestamp: int) -> dict:
+    """Делает запрос к эндпоинту API-сервиса с токеном студента."""
+    return fetch_response(token, current_timestamp).json()
+
+
+def fetch_response(token: str, current_timestamp: int,
+                   extra_headers: Optional[dict] = None,
+                   stream: bool = False) -> requests.Response:
+    """Запрашивает статусы и возвращает ответ с кодом 200 или 304.
+
+    С stream=True тело не читается заранее: его отдаёт iter_content.
+    Одинаковые запросы (токен, from_date, условные заголовки) делят
+    один вызов API и его недавний ответ, если включён api_calls.
+    """
     timestamp = current_timestamp or int(time.time())
+    with tracer.span('get_api_answer', {'from_date': timestamp}) as span:
+        try:
+            response = share_request(token, timestamp, extra_headers,
+                                     stream)
+        except ApiResponseError as error:
+            span.set_attribute('http.status_code', error.status_code)
+            raise
+        span.set_attribute('http.status_code', response.status_code)
+        return response
+
+
+def share_request(token: str, timestamp: int,
+                  extra_headers: Optional[dict] = None,
+                  stream: bool = False) -> requests.Response:
+    """Запрос к API через общий кеш одинаковых запросов, если он есть."""
+    if api_calls is None or stream:
+        return send_request(token, timestamp, extra_headers, stream)
+    key = (token, timestamp, tuple(sorted((extra_headers or {}).items())))
+    return api_calls.call(key, send_request, token, timestamp,
+                          extra_headers)
+
+
+def send_request(token: str, timestamp: int,
+                 extra_headers: Optional[dict] = None,
+                 stream: bool = False) -> requests.Response:
+    """Выполняет запрос статусов к API Практикума."""
     params = {'from_date': timestamp}
+    headers = {'Authorization': f'OAuth {token}'}
+    if extra_headers:
+        headers.update(extra_headers)
+    options = {'stream': True} if stream else {}
+    http = session or requests
+    api_breaker.before_request()
+    started = time.monotonic()
     try:
-        response = requests.get(ENDPOINT, headers=HEADERS, params=params)
-        logger.info(LOG_CONNECTION_SUCCESSFUL + ENDPOINT)
-        if response.status_code == HTTPStatus.OK:
-            logger.info(LOG_CONNECTION_SUCCESSFUL + ENDPOINT)
-            return response.json()
-    except ConnectionError:
+        response = http.get(ENDPOINT, headers=headers, params=params,
+                            timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                            **options)
+        api_latency.observe(time.monotonic() - started)
+        polls_total.inc(code=str(response.status_code))
+        if recorder is not None and not stream:
+            recorder.record(token, timestamp, response.status_code,
+                            response.text)
+        if response.status_code in (HTTPStatus.OK, HTTPStatus.NOT_MODIFIED):
+            api_breaker.record_success()
+            logger.info(LOG_CONNECTION_SUCCESSFUL, ENDPOINT)
+            return response
+    except (ConnectionError, requests.RequestException):
+        api_latency.observe(time.monotonic() - started)
+        polls_total.inc(code='error')
+        api_breaker.record_failure()
         logger.error(LOG_CONNECTION_ERROR + ENDPOINT)
         raise ConnectionError(LOG_CONNECTION_ERROR + ENDPOINT)
-    logger.error(
-        LOG_CONNECTION_ERROR + ENDPOINT
-        + LOG_CODE_ERROR + str(response.status_code))
-    raise ConnectionError(
-        LOG_CONNECTION_ERROR + ENDPOINT
-        + LOG_CODE_ERROR + str(response.status_code))
+    if response.status_code in UNAVAILABLE_CODES:
+        api_breaker.record_failure()
+    else:
+        api_breaker.record_success()
+    message = (LOG_CONNECTION_ERROR + ENDPOINT
+               + LOG_CODE_ERROR + str(response.status_code))
+    logger.error(message)
+    try:
+        raise ApiResponseError(
+            message, response.status_code,
+            parse_retry_after(getattr(response, 'headers', {})))
+    finally:
+        if stream:
+            response.close()
+
+
+def request_changes(tenant: Tenant) -> Union[dict, HomeworkStream, None]:
+    """Запрашивает статусы подписки; None — ответ не изменился.
+
+    С кешем ответов запрос условный (If-None-Match, If-Modified-Since),
+    а тело, совпавшее с прошлым, не разбирается: курсор сдвигается по
+    current_date, найденному в байтах ответа.
+    """
+    from_date = tenant_from_date(tenant)
+    if STREAM_RESPONSES:
+        return stream_changes(tenant, from_date)
+    if response_cache is None:
+        return request_homeworks(tenant.practicum_token, from_date)
+    response = fetch_response(tenant.practicum_token, from_date,
+                              response_cache.validators(tenant.key))
+    unchanged, current_date = response_cache.unchanged(tenant.key, response)
+    if not unchanged:
+        return response.json()
+    if current_date is not None:
+        save_from_date(tenant, {'current_date': current_date})
+    cache_hits_total.inc()
+    return None
+
+
+def stream_changes(tenant: Tenant,
+                   from_date: int) -> Optional[HomeworkStream]:
+    """Запрашивает статусы подписки и разбирает тело по мере чтения.
+
+    Тело не сравнивается с прошлым целиком — для этого его пришлось бы
+    держать в памяти; от повторной передачи спасают только валидаторы
+    условного запроса.
+    """
+    validators = (response_cache.validators(tenant.key)
+                  if response_cache is not None else None)
+    response = fetch_response(tenant.practicum_token, from_date,
+                              validators, stream=True)
+    if response.status_code == HTTPStatus.NOT_MODIFIED:
+        response.close()
+        cache_hits_total.inc()
+        return None
+    if response_cache is not None:
+        response_cache.remember(tenant.key, response)
+    return HomeworkStream(response.iter_content(STREAM_CHUNK_SIZE),
+                          close=response.close)
+
+
+def collect_changes(tenant: Tenant) -> Optional[Tuple[dict, list]]:
+    """Запрашивает статусы и собирает новые; None — ответ не изменился.
+
+    Возвращает ответ и список (изменение, сообщение). Потоковый ответ
+    при этом дочитывается до конца, поэтому вызов целиком блокирующий.
+    """
+    response = request_changes(tenant)
+    if response is None:
+        status_cache.touch(tenant.key)
+        return None
+    if isinstance(response, HomeworkStream):
+        homeworks = response
+    else:
+        with tracer.span('check_response'):
+            homeworks = check_response(response)
+    homeworks = status_cache.observe(tenant.key, homeworks)
+    with tracer.span('diff_statuses') as span:
+        pending = list(pending_statuses(tenant, homeworks))
+        span.set_attribute('changes', len(pending))
+    return response, pending
 
 
 def check_response(response: requests.request) -> list:
     """Проверяет ответ API на корректность."""
     KEY = 'homeworks'
+    if not isinstance(response, dict):
+        logger.error(LOG_NOT_DICT + type(response).__name__)
+        raise TypeError(LOG_NOT_DICT + type(response).__name__)
     if KEY not in response:
-        logger.error(LOG_KEY_ERROR, KEY)
+        logger.error(LOG_KEY_ERROR + KEY)
         raise KeyError(LOG_KEY_ERROR, KEY)
     if isinstance(response[KEY], list):
         return response[KEY]
@@ -93,16 +478,33 @@ def check_response(response: requests.request) -> list:
 
 def parse_status(homework: requests.request) -> str:
     """Извлекает из информации конкретную домашнюю работу и его статус."""
+    return render_status(homework)
+
+
+def render_status(homework: dict, locale: Optional[str] = None,
+                  message_format: str = TEXT) -> str:
+    """Сообщение о статусе работы на языке и в разметке подписки."""
     homework_name = homework.get('homework_name')
     homework_status = homework.get('status')
     if homework_status not in VERDICTS:
-        logger.error(LOG_KEY_ERROR + homework_status)
-        raise KeyError(LOG_KEY_ERROR + homework_status)
-    verdict = VERDICTS[homework_status]
-    logger.info(f'Успешно извлекли и передали: \n'
-                f' имя: "{homework_name}", \n'
-                f' статус: {verdict}')
-    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+        logger.error(LOG_KEY_ERROR + str(homework_status))
+        raise KeyError(LOG_KEY_ERROR + str(homework_status))
+    logger.info(LOG_STATUS_PARSED, homework_name, homework_status)
+    return renderer.status(homework_name, homework_status, locale,
+                           message_format)
+
+
+def rewind_cursor(tenant: Tenant, from_date: int) -> None:
+    """Возвращает курсор подписки назад, чтобы снова увидеть изменение.
+
+    Вызывается для уведомлений, которые так и не ушли из очереди:
+    курсор к этому времени уже сдвинут, и без отката изменение
+    потерялось бы. Повтор отсечёт дедупликация по хранилищу.
+    """
+    if from_date < tenant_from_date(tenant):
+        tenant.from_date = from_date
+        state_store.set_cursor(tenant.key, from_date)
+    forget_response(tenant)
 
 
 def check_tokens() -> bool:
@@ -115,42 +517,694 @@ def check_tokens() -> bool:
     return True
 
 
-def main() -> None:
-    """Основная логика работы бота."""
+def get_tenants() -> List[Tenant]:
+    """Собирает подписки из TENANTS_FILE или из переменных окружения."""
+    if TENANTS_FILE:
+        if TELEGRAM_TOKEN is None:
+            logger.critical(LOG_NOT_TOKEN)
+            raise Warning(LOG_NOT_TOKEN)
+        tenants = load_tenants(TENANTS_FILE)
+        logger.info(LOG_TENANTS_LOADED, len(tenants))
+        return tenants
     if not check_tokens():
         logger.critical(LOG_NOT_TOKEN)
         raise Warning(LOG_NOT_TOKEN)
-    bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time())
-    last_error = [None]
-    last_message = {}
-    while True:
+    return [Tenant(practicum_token=PRACTICUM_TOKEN,
+                   chat_id=TELEGRAM_CHAT_ID)]
+
+
+def next_from_date(response: dict, from_date: int) -> int:
+    """Сдвигает курсор опроса к current_date из ответа API.
+
+    Курсор отступает на CURSOR_OVERLAP секунд назад, чтобы не потерять
+    изменения на границе двух опросов; повторы отсекает дедупликация.
+    """
+    current_date = response.get('current_date')
+    if not isinstance(current_date, int):
+        return from_date
+    return max(current_date - CURSOR_OVERLAP, from_date, 1)
+
+
+def tenant_from_date(tenant: Tenant) -> int:
+    """Возвращает курсор подписки, при первом обращении — из хранилища."""
+    if tenant.from_date is None:
+        tenant.from_date = (state_store.get_cursor(tenant.key)
+                            or int(time.time()))
+    return tenant.from_date
+
+
+def save_from_date(tenant: Tenant, response: dict) -> None:
+    """Сдвигает курсор подписки и сохраняет его в хранилище."""
+    tenant.from_date = next_from_date(response, tenant_from_date(tenant))
+    state_store.set_cursor(tenant.key, tenant.from_date)
+
+
+def pending_statuses(tenant: Tenant,
+                     homeworks: Iterable[dict]) -> Iterator[tuple]:
+    """Отдаёт (изменение, сообщение) для новых статусов подписки."""
+    known = state_store.get_homeworks(tenant.key)
+    for change in diff_statuses(known, homeworks):
+        with tracer.span('parse_status', {
+                'homework.id': change.homework_id,
+                'homework.status': change.status}):
+            message = render_status(change.homework, tenant.locale,
+                                    tenant.message_format)
+        yield change, message
+
+
+def mark_sent(tenant: Tenant, pending: tuple) -> None:
+    """Запоминает отправленный статус работы."""
+    change, _ = pending
+    state_store.set_homework(tenant.key, change.homework_id, change.status,
+                             change.updated)
+    updated = parse_updated(change.updated)
+    if updated is not None:
+        notification_latency.observe(max(time.time() - updated, 0))
+
+
+def mark_rejected(tenant: Tenant, pending: tuple) -> None:
+    """Запоминает статус, который Telegram отказался доставить.
+
+    Повтор такого сообщения тоже не пройдёт (бот заблокирован, чата
+    нет), поэтому курсор не откатывается, а статус считается
+    обработанным и не ставится в очередь на следующем опросе.
+    """
+    change, _ = pending
+    logger.warning(LOG_SEND_REJECTED, change.homework_id, tenant.key)
+    state_store.set_homework(tenant.key, change.homework_id, change.status,
+                             change.updated)
+
+
+def notify(bot: telegram.Bot, tenant: Tenant, pending: tuple) -> bool:
+    """Отправляет уведомление о смене статуса или ставит его в очередь.
+
+    Возвращает False, если сообщение не удалось отправить сразу.
+    """
+    change, message = pending
+    with tracer.span('notify', {
+            'tenant': tenant.key, 'homework.id': change.homework_id,
+            'homework.status': change.status,
+            'queued': outbox is not None}) as span:
+        if outbox is None:
+            sent = send_message_to(bot, tenant.chat_id, message,
+                                   tenant.parse_mode)
+            span.set_attribute('sent', sent)
+            if sent:
+                mark_sent(tenant, pending)
+            return sent
+        enqueue_notification(tenant, pending)
+        return True
+
+
+def enqueue_notification(tenant: Tenant, pending: tuple) -> None:
+    """Ставит уведомление о смене статуса в очередь отправки."""
+    change, message = pending
+    outbox.put(tenant.chat_id, message,
+               key=(tenant.key, change.homework_id, change.status),
+               on_sent=partial(mark_sent, tenant, pending),
+               parse_mode=tenant.parse_mode,
+               on_dropped=partial(rewind_cursor, tenant,
+                                  tenant_from_date(tenant)),
+               on_rejected=partial(mark_rejected, tenant, pending))
+
+
+def notify_error(bot: telegram.Bot, tenant: Tenant,
+                 error: Exception) -> None:
+    """Сообщает о сбое, если о таком сбое недавно не сообщали.
+
+    Недоступность API касается всех подписок сразу, поэтому о ней
+    узнаёт только общий чат ERRORS_CHAT_ID, а не каждая подписка.
+    """
+    logger.error(LOG_CONNECTION_ERROR + '%s', error, exc_info=error)
+    errors_total.inc(type=type(error).__name__)
+    target = None if upstream_error(error) else tenant
+    scope = GLOBAL_SCOPE if target is None else tenant.key
+    if error_alerts.record(scope, fingerprint(error, ENDPOINT), target):
+        send_alert(bot, target, partial(renderer.error, error))
+
+
+def upstream_error(error: Exception) -> bool:
+    """Сбой на стороне API, а не в данных конкретной подписки."""
+    if isinstance(error, ApiResponseError):
+        return error.status_code in UNAVAILABLE_CODES
+    return isinstance(error, ConnectionError)
+
+
+def send_alert(bot: telegram.Bot, target: Optional[Tenant],
+               render: Callable[..., str]) -> None:
+    """Отправляет сообщение о сбоях подписке или в общий чат ошибок."""
+    if target is None:
+        chat_id, locale, message_format = ERRORS_CHAT_ID, None, TEXT
+    else:
+        chat_id = target.chat_id
+        locale, message_format = target.locale, target.message_format
+    if chat_id is None:
+        return
+    message = render(locale=locale, message_format=message_format)
+    if outbox is None:
+        send_message_to(bot, chat_id, message, parse_mode(message_format))
+        return
+    outbox.put(chat_id, message, key=(chat_id, message),
+               parse_mode=parse_mode(message_format))
+
+
+def send_error_summaries(bot: telegram.Bot) -> None:
+    """Рассылает сводки о скрытых повторах сбоев, если пришло время."""
+    minutes = round(error_alerts.summary_interval / 60)
+    for target, count in error_alerts.summaries():
+        send_alert(bot, target, partial(renderer.summary, count, minutes))
+
+
+def next_poll_delay(tenant: Tenant, changed: bool,
+                    error: Optional[Exception] = None) -> float:
+    """Пауза до следующего опроса подписки по её состоянию.
+
+    После сбоя пауза растёт экспоненциально с числом сбоев подряд;
+    пока автомат отключения разомкнут, опрос откладывается до пробной
+    попытки.
+    """
+    if isinstance(error, CircuitOpenError):
+        return error.retry_after + poll_policy.first_delay()
+    if error is not None:
+        tenant.failures += 1
+        return max(retry_backoff.delay(tenant.failures),
+                   getattr(error, 'retry_after', None) or 0)
+    tenant.failures = 0
+    error_alerts.resolve(tenant.key)
+    tenant.idle_polls = 0 if changed else tenant.idle_polls + 1
+    known = state_store.get_homeworks(tenant.key)
+    reviewing = any(
+        status == 'reviewing' for status, _ in tuple(known.values()))
+    return poll_policy.delay(reviewing, tenant.idle_polls)
+
+
+def finish_poll(tenant: Tenant, response: dict, pending: list,
+                delivered: List[bool]) -> float:
+    """Сдвигает курсор, если все уведомления ушли, и выбирает паузу.
+
+    Если уведомление не отправилось, курсор и кеш ответа не сдвигаются,
+    чтобы следующий опрос снова увидел это изменение.
+    """
+    if all(delivered):
+        save_from_date(tenant, response)
+    else:
+        forget_response(tenant)
+    if not pending:
+        logger.debug(LOG_NO_STATUS_CHANGED)
+    return next_poll_delay(tenant, bool(pending))
+
+
+def forget_response(tenant: Tenant) -> None:
+    """Сбрасывает кеш ответа подписки, чтобы следующий был разобран."""
+    if response_cache is not None:
+        response_cache.forget(tenant.key)
+
+
+def tenant_paused(tenant: Tenant) -> bool:
+    """Приостановлена ли подписка; при первом обращении — из хранилища."""
+    if tenant.paused is None:
+        tenant.paused = state_store.is_paused(tenant.key)
+    return tenant.paused
+
+
+def set_paused(tenant: Tenant, paused: bool) -> None:
+    """Приостанавливает или возобновляет опрос подписки."""
+    tenant.paused = paused
+    state_store.set_paused(tenant.key, paused)
+
+
+def poll_tenant(bot: telegram.Bot, tenant: Tenant) -> float:
+    """Один цикл проверки статусов для одной подписки.
+
+    Возвращает паузу в секундах до следующего опроса.
+    """
+    if tenant_paused(tenant):
+        return poll_policy.delay(False, tenant.idle_polls)
+    poll_cycles_total.inc()
+    with tracer.span('poll', {'tenant': tenant.key}) as span:
         try:
-            response = get_api_answer(current_timestamp)
-            homeworks = check_response(response)
-            for homework in homeworks:
-                if homework['homework_name'] not in last_message:
-                    status_homework = parse_status(homework)
-                    if send_message(bot, status_homework):
-                        last_message[
-                            homework['homework_name']] = status_homework
-
-            current_timestamp = 1
-            time.sleep(RETRY_TIME)
-            logger.info(LOG_LOOP_REPEAT, exc_info=True)
-            logger.debug(LOG_NO_STATUS_CHANGED)
+            changes = collect_changes(tenant)
+            if changes is None:
+                return next_poll_delay(tenant, False)
+            response, pending = changes
+            delivered = [notify(bot, tenant, item) for item in pending]
+            return finish_poll(tenant, response, pending, delivered)
+        except Exception as error:
+            span.record_error(error)
+            forget_response(tenant)
+            notify_error(bot, tenant, error)
+            return next_poll_delay(tenant, False, error)
+
+
+def run_tenants(bot: telegram.Bot, tenants: List[Tenant]) -> None:
+    """Опрашивает все подписки из одного планировщика."""
+    start = time.monotonic()
+    queue = [(start + poll_policy.first_delay(), index)
+             for index in range(len(tenants))]
+    heapq.heapify(queue)
+    while queue and not shutdown.requested:
+        due, index = heapq.heappop(queue)
+        delay = due - time.monotonic()
+        if delay > 0:
+            state_store.flush()
+            send_error_summaries(bot)
+            if shutdown.wait(delay):
+                break
+        check_lease()
+        delay = poll_tenant(bot, tenants[index])
+        heapq.heappush(queue, (time.monotonic() + delay, index))
+        logger.debug(LOG_LOOP_REPEAT)
 
+
+async def collect_changes_async(
+        executor: Executor, tenant: Tenant) -> Optional[Tuple[dict, list]]:
+    """Асинхронный запрос к API: блокирующий вызов уходит в пул потоков."""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, contextvars.copy_context().run, collect_changes, tenant)
+
+
+async def notify_async(executor: Executor, bot: telegram.Bot,
+                       tenant: Tenant, pending: tuple) -> bool:
+    """Асинхронно отправляет уведомление или ставит его в очередь."""
+    import asyncio
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor, contextvars.copy_context().run, notify, bot, tenant,
+        pending)
+
+
+async def poll_tenant_async(executor: Executor, bot: telegram.Bot,
+                            tenant: Tenant) -> float:
+    """Асинхронный цикл проверки статусов для одной подписки.
+
+    Возвращает паузу в секундах до следующего опроса.
+    """
+    import asyncio
+    if tenant_paused(tenant):
+        return poll_policy.delay(False, tenant.idle_polls)
+    poll_cycles_total.inc()
+    with tracer.span('poll', {'tenant': tenant.key}) as span:
+        try:
+            changes = await collect_changes_async(executor, tenant)
+            if changes is None:
+                return next_poll_delay(tenant, False)
+            response, pending = changes
+            delivered = await asyncio.gather(*(
+                notify_async(executor, bot, tenant, item)
+                for item in pending))
+            return finish_poll(tenant, response, pending, delivered)
         except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            if last_error[0] != message:
-                if send_message(bot, message):
-                    last_error[0] = message
-                    logger.error(LOG_CONNECTION_ERROR + str(error),
-                                 exc_info=True)
-            time.sleep(RETRY_TIME)
+            span.record_error(error)
+            forget_response(tenant)
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                executor, contextvars.copy_context().run, notify_error, bot,
+                tenant, error)
+            return next_poll_delay(tenant, False, error)
+
+
+async def wait_event(event: asyncio.Event, timeout: float) -> bool:
+    """Ждёт событие не дольше timeout секунд; True — дождались."""
+    import asyncio
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+    except asyncio.TimeoutError:
+        return False
+    return True
+
+
+async def run_tenants_async(bot: telegram.Bot, tenants: List[Tenant],
+                            io_threads: int = IO_THREADS) -> None:
+    """Опрашивает подписки конкурентно на ограниченном пуле потоков.
+
+    После запроса остановки новые опросы не начинаются, а начатые
+    доводятся до конца.
+    """
+    import asyncio
+    executor = ThreadPoolExecutor(max_workers=io_threads)
+    limit = asyncio.Semaphore(io_threads)
+    stopped = asyncio.Event()
+    stop = partial(asyncio.get_running_loop().call_soon_threadsafe,
+                   stopped.set)
+    pause = partial(wait_event, stopped)
+
+    async def poll_forever(tenant: Tenant) -> None:
+        if await pause(poll_policy.first_delay()):
+            return
+        while True:
+            check_lease()
+            async with limit:
+                if stopped.is_set():
+                    return
+                delay = await poll_tenant_async(executor, bot, tenant)
+            if await pause(delay):
+                return
+
+    async def flush_forever() -> None:
+        loop = asyncio.get_running_loop()
+        while not await pause(STATE_FLUSH_INTERVAL):
+            state_store.flush()
+            await loop.run_in_executor(executor, send_error_summaries, bot)
+
+    shutdown.subscribe(stop)
+    try:
+        await asyncio.gather(flush_forever(), *(
+            poll_forever(tenant) for tenant in tenants))
+    finally:
+        shutdown.unsubscribe(stop)
+        executor.shutdown(wait=False)
+
+
+def init_session(pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+    """Включает пул соединений для запросов к API Практикума."""
+    global session
+    session = pooled_session(pool_size)
+    return session
+
+
+def init_state_store(path: Optional[str] = STATE_DB) -> MemoryStateStore:
+    """Открывает хранилище состояния: SQLite по пути или в памяти."""
+    global state_store
+    state_store = open_state_store(path)
+    return state_store
+
+
+def init_response_cache() -> Optional[ResponseCache]:
+    """Включает условные запросы и кеш ответов, если он не отключён."""
+    global response_cache
+    response_cache = ResponseCache() if RESPONSE_CACHE else None
+    return response_cache
+
+
+def init_api_calls(ttl: float = API_CACHE_TTL,
+                   max_size: int = API_CACHE_SIZE) -> CoalescingCache:
+    """Схлопывает одинаковые запросы к API и кеширует их на ttl секунд."""
+    global api_calls
+    api_calls = CoalescingCache(ttl, max_size)
+    return api_calls
+
+
+def init_tracing(path: Optional[str] = TRACE_FILE) -> NoopTracer:
+    """Включает запись спанов в файл path; без пути трассировки нет."""
+    global tracer
+    tracer = Tracer(FileExporter(path)) if path else NoopTracer()
+    return tracer
+
+
+def init_recorder(path: Optional[str] = RECORD_FILE
+                  ) -> Optional[Recorder]:
+    """Включает запись ответов API в файл path для bench.replay."""
+    global recorder
+    recorder = Recorder(path) if path else None
+    return recorder
+
+
+def init_outbox(bot: telegram.Bot) -> Outbox:
+    """Запускает очередь исходящих сообщений для бота.
+
+    Unauthorized (бот заблокирован) и BadRequest (чата нет, сообщение
+    отклонено) не повторяются; повтор с откатом курсора остаётся для
+    сетевых сбоев и таймаутов.
+    """
+    global outbox
+    error = load_telegram().error
+    outbox = Outbox(partial(deliver_message, bot),
+                    global_rate=TELEGRAM_GLOBAL_RATE,
+                    chat_rate=TELEGRAM_CHAT_RATE,
+                    workers=OUTBOX_WORKERS,
+                    permanent_errors=(error.Unauthorized,
+                                      error.BadRequest)).start()
+    return outbox
+
+
+def init_lease(name: str, path: Optional[str] = LEASE_DB
+               ) -> Optional[LeaseKeeper]:
+    """Ждёт аренду набора подписок name и начинает её продлевать."""
+    global lease_keeper
+    if not path:
+        return None
+    owner = f'{socket.gethostname()}:{os.getpid()}'
+    lease_keeper = LeaseKeeper(
+        SQLiteLease(path, name, owner, ttl=LEASE_TTL),
+        on_lost=abandon_outbox).start()
+    return lease_keeper
+
+
+def abandon_outbox() -> None:
+    """Прекращает отправку сразу: аренда у другого процесса.
+
+    Неотправленные уведомления откатывают курсоры через on_dropped,
+    и их отправит новый владелец аренды.
+    """
+    if outbox is not None:
+        outbox.stop(timeout=0)
+
+
+def check_lease() -> None:
+    """Выбрасывает LeaseLost, если аренду перехватил другой процесс."""
+    if lease_keeper is not None:
+        lease_keeper.check()
+
+
+def homework_snapshot(tenant: Tenant) -> List[dict]:
+    """Все работы подписки: из кеша или одним общим запросом к API."""
+    homeworks = status_cache.get(tenant.key)
+    if homeworks is not None:
+        return homeworks
+    return status_refreshes.do(tenant.key, refresh_snapshot, tenant)
+
+
+def refresh_snapshot(tenant: Tenant) -> List[dict]:
+    """Запрашивает всю историю работ подписки и кладёт её в кеш."""
+    homeworks = status_cache.get(tenant.key)
+    if homeworks is not None:
+        return homeworks
+    response = request_homeworks(tenant.practicum_token, FULL_HISTORY_FROM)
+    return status_cache.replace(tenant.key, check_response(response))
+
+
+def command_status(tenant: Tenant) -> str:
+    """Ответ на /status: последние работы подписки и их статусы."""
+    locale, message_format = tenant.locale, tenant.message_format
+    try:
+        homeworks = homework_snapshot(tenant)
+    except Exception as error:
+        logger.error(LOG_STATUS_FAILED, error)
+        return renderer.reply(locale, 'failed', message_format)
+    lines = [renderer.current(homework['homework_name'], homework['status'],
+                              locale, message_format)
+             for homework in homeworks if homework['status'] in VERDICTS]
+    if not lines:
+        return renderer.reply(locale, 'empty', message_format)
+    return '\n'.join(lines[:STATUS_LINES])
+
+
+def command_pause(tenant: Tenant) -> str:
+    """Ответ на /pause: опрос подписки приостанавливается."""
+    set_paused(tenant, True)
+    return renderer.reply(tenant.locale, 'paused', tenant.message_format)
+
+
+def command_subscribe(tenant: Tenant) -> str:
+    """Ответ на /subscribe: опрос подписки возобновляется."""
+    set_paused(tenant, False)
+    return renderer.reply(tenant.locale, 'subscribed', tenant.message_format)
+
+
+BOT_COMMANDS = {
+    'status': command_status,
+    'pause': command_pause,
+    'subscribe': command_subscribe,
+}
+
+
+def answer_command(chat_id: str, command: str) -> Tuple[str, Optional[str]]:
+    """Ответ на команду из чата и его parse_mode.
+
+    Если к чату привязано несколько подписок, команда относится ко всем.
+    """
+    commands_total.inc(command=command)
+    tenants = subscriptions.get(chat_id)
+    if not tenants:
+        return renderer.reply(None, 'unknown', TEXT), None
+    answers = [BOT_COMMANDS[command](tenant) for tenant in tenants]
+    return '\n\n'.join(answers), tenants[0].parse_mode
+
+
+def on_command(update: telegram.Update, context: object) -> None:
+    """Отвечает на команду, пришедшую из Telegram."""
+    message = update.effective_message
+    command = message.text.split()[0][1:].split('@')[0].lower()
+    text, parse_mode = answer_command(str(message.chat_id), command)
+    options = {'parse_mode': parse_mode} if parse_mode else {}
+    message.reply_text(text, **options)
+
+
+def start_commands(bot: telegram.Bot, tenants: List[Tenant]
+                   ) -> Optional[telegram.ext.Updater]:
+    """Начинает принимать команды бота: long polling или вебхук.
+
+    COMMANDS=polling забирает обновления через getUpdates,
+    COMMANDS=webhook поднимает сервер для WEBHOOK_URL.
+    """
+    global updater
+    if COMMANDS not in ('polling', 'webhook'):
+        return None
+    if SHARDS > 1 or NODE_COUNT > 1:
+        logger.warning(LOG_COMMANDS_SINGLE_PROCESS)
+        return None
+    subscriptions.clear()
+    for tenant in tenants:
+        subscriptions.setdefault(tenant.chat_id, []).append(tenant)
+    import telegram.ext
+    updater = telegram.ext.Updater(bot=bot)
+    for command in BOT_COMMANDS:
+        updater.dispatcher.add_handler(
+            telegram.ext.CommandHandler(command, on_command))
+    if COMMANDS == 'webhook':
+        updater.start_webhook(listen=WEBHOOK_HOST, port=WEBHOOK_PORT,
+                              url_path=WEBHOOK_PATH, webhook_url=WEBHOOK_URL)
+    else:
+        updater.start_polling()
+    logger.info(LOG_COMMANDS_STARTED, COMMANDS)
+    return updater
+
+
+def serve(tenants: List[Tenant], metrics_port: int = METRICS_PORT,
+          lease_name: str = LEASE_NAME) -> None:
+    """Опрашивает подписки в текущем процессе до остановки."""
+    tenants_gauge.set(len(tenants))
+    if metrics_port:
+        serve_metrics(metrics, METRICS_HOST, metrics_port)
+    try:
+        init_lease(lease_name)
+        init_session()
+        init_state_store()
+        init_response_cache()
+        init_api_calls()
+        init_tracing()
+        init_recorder()
+        bot = create_bot()
+        init_outbox(bot)
+        start_commands(bot, tenants)
+        shutdown.defer_exit()
+        if ASYNC_MODE:
+            import asyncio
+            asyncio.run(run_tenants_async(bot, tenants))
         else:
-            time.sleep(RETRY_TIME)
-            logger.info(LOG_LOOP_REPEAT, exc_info=True)
+            run_tenants(bot, tenants)
+    finally:
+        drain()
+
+
+def drain() -> None:
+    """Досылает очередь, сохраняет состояние и отдаёт аренду.
+
+    Очередь досылается не дольше, чем осталось до срока остановки, а
+    после потери аренды не досылается вовсе; для неотправленных
+    уведомлений курсор откатывается назад.
+    """
+    if updater is not None:
+        updater.stop()
+    if lease_keeper is not None and lease_keeper.lost:
+        abandon_outbox()
+    elif outbox is not None:
+        outbox.stop(timeout=shutdown.remaining())
+    tracer.close()
+    if recorder is not None:
+        recorder.close()
+    state_store.close()
+    if lease_keeper is not None:
+        lease_keeper.stop()
+
+
+def force_exit() -> None:
+    """Завершает процесс, не дождавшись остановки потоков."""
+    state_store.flush()
+    if recorder is not None:
+        recorder.close()
+    log_listener.stop()
+    os._exit(1)
+
+
+shutdown = Shutdown(SHUTDOWN_TIMEOUT, force_exit)
+
+
+def profile_path() -> str:
+    """Путь для отчёта профилирования этого процесса."""
+    return os.path.join(PROFILE_DIR,
+                        f'profile-{os.getpid()}-{int(time.time())}.txt')
+
+
+profiler = Profiler(Sampler(PROFILE_TARGETS), PROFILE_WINDOW, profile_path,
+                    polls=poll_cycles_total.value)
+
+
+def init_profiler(window: Optional[float] = None) -> Profiler:
+    """Включает окна профилирования по сигналу и, если задано, сразу.
+
+    Каждый PROFILE_SIGNAL (SIGUSR1) запускает окно на PROFILE_WINDOW
+    секунд или досрочно завершает идущее.
+    """
+    if PROFILE_SIGNAL is not None:
+        signal.signal(PROFILE_SIGNAL, profiler.toggle)
+    if window:
+        profiler.start(window)
+    return profiler
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Уведомления о статусе проверки домашних работ.')
+    parser.add_argument(
+        '--profile', type=float, nargs='?', const=PROFILE_WINDOW,
+        metavar='SECONDS',
+        help='профилировать цикл опроса SECONDS секунд после старта')
+    return parser.parse_args(argv)
+
+
+def exit_on_sigterm() -> None:
+    """Превращает SIGTERM в SystemExit, чтобы отработали блоки finally."""
+    def handle(signum: int, frame: object) -> None:
+        raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, handle)
+
+
+def run_shard(shard: str, tenants: List[Tenant],
+              profile: Optional[float] = None) -> None:
+    """Точка входа процесса-шарда: свой цикл опроса своих подписок."""
+    shutdown.install()
+    init_profiler(profile)
+    logger.info(LOG_SHARD_TENANTS, shard, len(tenants))
+    index = int(shard.rsplit('-', 1)[-1])
+    serve(tenants, METRICS_PORT + 1 + index if METRICS_PORT else 0,
+          f'{LEASE_NAME}/{shard}')
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Основная логика работы бота."""
+    from services.sharding import Supervisor, owned
+    args = parse_args(argv)
+    tenants = owned(get_tenants(), attrgetter('key'), NODE_COUNT,
+                    NODE_INDEX)
+    if SHARDS <= 1:
+        shutdown.install()
+        init_profiler(args.profile)
+        serve(tenants)
+        return
+    if not STATE_DB:
+        logger.warning(LOG_SHARDS_WITHOUT_DB)
+    exit_on_sigterm()
+    supervisor = Supervisor(partial(run_shard, profile=args.profile),
+                            tenants, attrgetter('key'), SHARDS,
+                            stop_timeout=SHUTDOWN_TIMEOUT)
+    if PROFILE_SIGNAL is not None:
+        signal.signal(PROFILE_SIGNAL, supervisor.forward)
+    supervisor.run()
 
 
 if __name__ == '__main__':
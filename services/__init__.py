@@ -0,0 +1 @@
+"""Вспомогательные компоненты бота, не зависящие от homework.py."""
@@ -0,0 +1,95 @@
+"""Сообщения о сбоях: отпечатки ошибок, окно тишины и сводки."""
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+GLOBAL_SCOPE = '*'
+
+
+def fingerprint(error: Exception, endpoint: str) -> str:
+    """Отпечаток сбоя: тип исключения, адрес и код ответа, если он есть."""
+    parts = [type(error).__name__, endpoint]
+    status_code = getattr(error, 'status_code', None)
+    if status_code is not None:
+        parts.append(str(int(status_code)))
+    return ':'.join(parts)
+
+
+@dataclass
+class Scope:
+    """Сбои одного получателя: когда о каком сообщали и сколько скрыли."""
+
+    target: Hashable
+    summary_at: float
+    sent: Dict[str, float] = field(default_factory=dict)
+    suppressed: int = 0
+
+
+class ErrorAggregator:
+    """Решает, сообщать ли о сбое, и копит скрытые повторы для сводок.
+
+    О сбое с данным отпечатком получатель (scope) узнаёт один раз за
+    window секунд, остальные повторы только считаются. Раз в
+    summary_interval секунд summaries() отдаёт число скрытых повторов.
+    resolve() после успешного опроса открывает окно заново, чтобы о
+    следующем сбое сообщили сразу, но накопленный счётчик сохраняет
+    до сводки.
+    """
+
+    def __init__(self, window: float = 3600, summary_interval: float = 3600,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Создаёт агрегатор без сбоев."""
+        self.window = window
+        self.summary_interval = summary_interval
+        self._clock = clock
+        self._scopes: Dict[Hashable, Scope] = {}
+        self._lock = threading.Lock()
+
+    def record(self, scope: Hashable, fingerprint: str,
+               target: Optional[Hashable] = None) -> bool:
+        """Учитывает сбой; True — о нём нужно сообщить сейчас.
+
+        target — адресат сводок для scope, его вернёт summaries().
+        """
+        now = self._clock()
+        with self._lock:
+            state = self._scopes.get(scope)
+            if state is None:
+                state = self._scopes[scope] = Scope(
+                    target, now + self.summary_interval)
+            sent = state.sent.get(fingerprint)
+            if sent is not None and now - sent < self.window:
+                state.suppressed += 1
+                return False
+            state.sent[fingerprint] = now
+            return True
+
+    def resolve(self, scope: Hashable) -> None:
+        """Отмечает, что у получателя снова всё работает."""
+        with self._lock:
+            state = self._scopes.get(scope)
+            if state is None:
+                return
+            if state.suppressed:
+                state.sent.clear()
+            else:
+                del self._scopes[scope]
+
+    def summaries(self) -> List[Tuple[Hashable, int]]:
+        """Сводки, которым пришло время: [(target, скрытых повторов)]."""
+        now = self._clock()
+        result = []
+        with self._lock:
+            for scope, state in list(self._scopes.items()):
+                if now < state.summary_at:
+                    continue
+                if state.suppressed:
+                    result.append((state.target, state.suppressed))
+                state.suppressed = 0
+                state.summary_at = now + self.summary_interval
+                state.sent = {key: sent for key, sent in state.sent.items()
+                              if now - sent < self.window}
+                if not state.sent:
+                    del self._scopes[scope]
+        return result
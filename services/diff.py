@@ -0,0 +1,63 @@
+"""Поиск изменений статусов домашних работ между опросами."""
+import sys
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, Mapping, NamedTuple, Optional
+
+from services.state import HomeworkState
+
+UPDATED_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+class Change(NamedTuple):
+    """Переход статуса одной работы."""
+
+    homework_id: str
+    status: str
+    previous: Optional[str]
+    updated: Optional[str]
+    homework: dict
+
+
+def homework_id(homework: dict) -> str:
+    """Идентификатор работы; в старых ответах API его заменяет имя."""
+    return str(homework.get('id', homework.get('homework_name')))
+
+
+def parse_updated(updated: Optional[str]) -> Optional[float]:
+    """Переводит date_updated из ответа API в unix-время."""
+    if not updated:
+        return None
+    try:
+        date = datetime.strptime(updated, UPDATED_FORMAT)
+    except (TypeError, ValueError):
+        return None
+    return date.replace(tzinfo=timezone.utc).timestamp()
+
+
+def diff_statuses(known: Mapping[str, HomeworkState],
+                  homeworks: Iterable[dict]) -> Iterator[Change]:
+    """Отдаёт только новые работы и смены статуса.
+
+    known — индекс подписки {id: (статус, дата обновления)}. Работа
+    сверяется с индексом по id за O(1), поэтому цена вызова зависит от
+    размера ответа API, а не от всей истории подписки. Повторы одной
+    работы в ответе схлопываются: побеждает последняя запись.
+    homeworks читается один раз, и в памяти остаются только изменения,
+    так что сюда можно передать поток работ из ответа.
+    """
+    latest = {}
+    for homework in homeworks:
+        key = homework_id(homework)
+        sent = known.get(key)
+        if sent is not None and sent[0] == homework.get('status'):
+            latest.pop(key, None)
+        else:
+            latest[key] = homework
+    for key, homework in latest.items():
+        status = homework.get('status')
+        sent = known.get(key)
+        previous = sent[0] if sent is not None else None
+        if isinstance(status, str):
+            status = sys.intern(status)
+        yield Change(key, status, previous, homework.get('date_updated'),
+                     homework)
@@ -0,0 +1,119 @@
+"""HTTP-сессия с пулом соединений, ошибки и кеш ответов API."""
+import hashlib
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from http import HTTPStatus
+from typing import Dict, Mapping, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def pooled_session(pool_size: int) -> requests.Session:
+    """Создаёт сессию, которая переиспользует TCP/TLS-соединения.
+
+    pool_size ограничивает число одновременно открытых соединений
+    к одному хосту; при исчерпании пула запросы ждут свободное
+    соединение, а не открывают новое.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                          pool_block=True)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class ApiResponseError(ConnectionError):
+    """API ответило кодом, отличным от 200."""
+
+    def __init__(self, message: str, status_code: int,
+                 retry_after: Optional[float] = None) -> None:
+        """Сохраняет код ответа и паузу из заголовка Retry-After."""
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def parse_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    """Разбирает Retry-After: число секунд или HTTP-дату."""
+    value = headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+CURRENT_DATE = re.compile(rb'"current_date"\s*:\s*(\d+)')
+
+
+@dataclass
+class CacheEntry:
+    """Валидаторы и отпечаток последнего ответа."""
+
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    digest: Optional[bytes] = None
+
+
+def body_digest(body: bytes) -> Tuple[bytes, Optional[int]]:
+    """Отпечаток тела ответа без current_date и сам current_date.
+
+    current_date меняется в каждом ответе, поэтому в отпечаток не
+    входит: одинаковые списки работ дают одинаковый отпечаток без
+    разбора JSON.
+    """
+    match = CURRENT_DATE.search(body)
+    current_date = int(match.group(1)) if match else None
+    stripped = CURRENT_DATE.sub(b'', body, count=1) if match else body
+    return hashlib.blake2b(stripped, digest_size=16).digest(), current_date
+
+
+class ResponseCache:
+    """Кеш последних ответов API по ключу подписки."""
+
+    def __init__(self) -> None:
+        """Создаёт пустой кеш."""
+        self._entries: Dict[str, CacheEntry] = {}
+
+    def validators(self, key: str) -> Dict[str, str]:
+        """Заголовки условного запроса для подписки."""
+        entry = self._entries.get(key)
+        headers = {}
+        if entry is not None and entry.etag:
+            headers['If-None-Match'] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def unchanged(self, key: str, response: requests.Response
+                  ) -> Tuple[bool, Optional[int]]:
+        """Сверяет ответ с прошлым: (не изменился ли, current_date)."""
+        if response.status_code == HTTPStatus.NOT_MODIFIED:
+            return True, None
+        digest, current_date = body_digest(response.content)
+        entry = self._entries.get(key)
+        same = entry is not None and entry.digest == digest
+        self._entries[key] = CacheEntry(
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'), digest)
+        return same, current_date
+
+    def remember(self, key: str, response: requests.Response) -> None:
+        """Запоминает только валидаторы ответа, не читая его тело."""
+        self._entries[key] = CacheEntry(
+            response.headers.get('ETag'),
+            response.headers.get('Last-Modified'))
+
+    def forget(self, key: str) -> None:
+        """Забывает ответ подписки: следующий будет разобран целиком."""
+        self._entries.pop(key, None)
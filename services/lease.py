@@ -0,0 +1,166 @@
+"""Аренда права опроса: набор подписок опрашивает один процесс."""
+import logging
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional
+
+LOG_LEASE_WAIT = 'Аренда %s занята процессом %s, ожидание'
+LOG_LEASE_ACQUIRED = 'Аренда %s получена процессом %s'
+LOG_LEASE_LOST = 'Аренда %s потеряна процессом %s'
+
+SCHEMA = ('CREATE TABLE IF NOT EXISTS leases ('
+          ' name TEXT PRIMARY KEY,'
+          ' owner TEXT NOT NULL,'
+          ' expires REAL NOT NULL)')
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseLost(RuntimeError):
+    """Аренду перехватил другой процесс или её не удалось продлить."""
+
+
+class SQLiteLease:
+    """Аренда с истечением срока в общем SQLite-файле.
+
+    Владелец продлевает аренду не реже раза в ttl секунд. Если он
+    перестал продлевать (завис или упал), по истечении ttl аренду может
+    забрать другой процесс.
+    """
+
+    def __init__(self, path: str, name: str, owner: str, ttl: float = 30,
+                 clock: Callable[[], float] = time.time) -> None:
+        """Открывает файл аренд path; name — что арендуется."""
+        self.name = name
+        self.owner = owner
+        self.ttl = ttl
+        self._clock = clock
+        self._connection = sqlite3.connect(
+            path, timeout=ttl, isolation_level=None,
+            check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute(SCHEMA)
+        self._lock = threading.Lock()
+
+    def current_owner(self) -> Optional[str]:
+        """Владелец действующей аренды или None."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT owner, expires FROM leases WHERE name = ?',
+                (self.name,)).fetchone()
+        if row is None or row[1] <= self._clock():
+            return None
+        return row[0]
+
+    def acquire(self) -> bool:
+        """Берёт или продлевает аренду; False — она у другого процесса."""
+        with self._lock:
+            connection = self._connection
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                now = self._clock()
+                row = connection.execute(
+                    'SELECT owner, expires FROM leases WHERE name = ?',
+                    (self.name,)).fetchone()
+                if row is not None and row[0] != self.owner and row[1] > now:
+                    connection.execute('ROLLBACK')
+                    return False
+                connection.execute(
+                    'INSERT OR REPLACE INTO leases VALUES (?, ?, ?)',
+                    (self.name, self.owner, now + self.ttl))
+                connection.execute('COMMIT')
+                return True
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+
+    def release(self) -> None:
+        """Отдаёт аренду, если она принадлежит этому процессу."""
+        with self._lock:
+            self._connection.execute(
+                'DELETE FROM leases WHERE name = ? AND owner = ?',
+                (self.name, self.owner))
+
+    def close(self) -> None:
+        """Закрывает соединение, не отдавая аренду."""
+        with self._lock:
+            self._connection.close()
+
+
+class LeaseKeeper:
+    """Берёт аренду и продлевает её из фонового потока.
+
+    on_lost вызывается из потока продления сразу при потере аренды,
+    чтобы остановить работу, не дожидаясь следующего check().
+    """
+
+    def __init__(self, lease: SQLiteLease,
+                 interval: Optional[float] = None,
+                 on_lost: Optional[Callable[[], None]] = None) -> None:
+        """Период продления interval по умолчанию — треть ttl."""
+        self.lease = lease
+        self.interval = interval or lease.ttl / 3
+        self.on_lost = on_lost
+        self._acquired = False
+        self.held = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def wait_acquire(self, timeout: Optional[float] = None) -> bool:
+        """Ждёт аренду не дольше timeout секунд."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self.lease.acquire():
+            logger.info(LOG_LEASE_WAIT, self.lease.name,
+                        self.lease.current_owner())
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            if self._stopped.wait(self.interval):
+                return False
+        logger.info(LOG_LEASE_ACQUIRED, self.lease.name, self.lease.owner)
+        self._acquired = True
+        self.held.set()
+        return True
+
+    def _heartbeat(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                renewed = self.lease.acquire()
+            except sqlite3.Error:
+                renewed = False
+            if not renewed:
+                logger.error(LOG_LEASE_LOST, self.lease.name,
+                             self.lease.owner)
+                self.held.clear()
+                if self.on_lost is not None:
+                    self.on_lost()
+                return
+
+    def start(self) -> 'LeaseKeeper':
+        """Ждёт аренду и запускает её продление."""
+        self.wait_acquire()
+        self._thread = threading.Thread(target=self._heartbeat, daemon=True,
+                                        name='lease-heartbeat')
+        self._thread.start()
+        return self
+
+    @property
+    def lost(self) -> bool:
+        """Аренда была получена, но больше не наша."""
+        return self._acquired and not self.held.is_set()
+
+    def check(self) -> None:
+        """Выбрасывает LeaseLost, если аренда больше не наша."""
+        if not self.held.is_set():
+            raise LeaseLost(self.lease.name)
+
+    def stop(self) -> None:
+        """Останавливает продление и отдаёт аренду."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.held.is_set():
+            self.lease.release()
+            self.held.clear()
+        self._acquired = False
+        self.lease.close()
@@ -0,0 +1,103 @@
+"""Неблокирующее логирование через очередь и JSON-формат записей."""
+import json
+import logging
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Iterable, Optional
+
+
+class JsonFormatter(logging.Formatter):
+    """Записывает каждую запись одной JSON-строкой."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Собирает JSON из полей записи."""
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False)
+
+
+class LazyQueueListener(QueueListener):
+    """QueueListener, поток которого запускается при первой записи.
+
+    Импорт модуля с логгерами не должен запускать потоки. После stop()
+    поток больше не запускается.
+    """
+
+    def __init__(self, log_queue: queue.Queue,
+                 *handlers: logging.Handler,
+                 respect_handler_level: bool = False) -> None:
+        """Создаёт listener; поток запускает ensure_started()."""
+        super().__init__(log_queue, *handlers,
+                         respect_handler_level=respect_handler_level)
+        self._lock = threading.Lock()
+        self._stopped = False
+
+    def ensure_started(self) -> None:
+        """Запускает поток, если он ещё не запущен и не остановлен."""
+        if self._thread is not None or self._stopped:
+            return
+        with self._lock:
+            if self._thread is None and not self._stopped:
+                self.start()
+
+    def stop(self) -> None:
+        """Дописывает оставшиеся записи и останавливает поток."""
+        with self._lock:
+            self._stopped = True
+            if self._thread is not None:
+                super().stop()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Кладёт записи в очередь, не форматируя их и не блокируясь.
+
+    Сообщение собирается из msg и args уже в потоке QueueListener,
+    поэтому в args не стоит передавать объекты, которые потом меняются.
+    При переполнении очереди запись отбрасывается и учитывается в
+    dropped.
+    """
+
+    def __init__(self, log_queue: queue.Queue,
+                 listener: Optional[LazyQueueListener] = None) -> None:
+        """Создаёт обработчик для очереди log_queue."""
+        super().__init__(log_queue)
+        self.listener = listener
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Отдаёт запись как есть: форматирование — в фоновом потоке."""
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """Кладёт запись в очередь без ожидания."""
+        if self.listener is not None:
+            self.listener.ensure_started()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def start_queue_logging(loggers: Iterable[logging.Logger],
+                        handler: logging.Handler,
+                        max_size: int = 10000) -> LazyQueueListener:
+    """Переносит запись handler в фоновый поток.
+
+    Логгеры получают DroppingQueueHandler, а handler вызывается из
+    LazyQueueListener, поток которого запускается первой записью.
+    listener.stop() дописывает оставшиеся записи.
+    """
+    log_queue = queue.Queue(max_size)
+    listener = LazyQueueListener(log_queue, handler,
+                                 respect_handler_level=True)
+    queue_handler = DroppingQueueHandler(log_queue, listener)
+    for logger in loggers:
+        logger.addHandler(queue_handler)
+    return listener
@@ -0,0 +1,153 @@
+"""Сообщения бота: шаблоны по языкам и форматам Telegram."""
+import html
+import re
+from functools import lru_cache
+from typing import Callable, Dict, Mapping, NamedTuple, Optional
+
+LOG_UNKNOWN_FORMAT = 'Неизвестный формат сообщений: '
+
+TEXT = 'text'
+HTML = 'html'
+MARKDOWN = 'markdown'
+PARSE_MODES = {TEXT: None, HTML: 'HTML', MARKDOWN: 'MarkdownV2'}
+MARKDOWN_SPECIAL = re.compile(r'([_*\[\]()~`>#+\-=|{}.!\\])')
+TEMPLATE_CACHE_SIZE = 1024
+
+
+def escape_markdown(text: str) -> str:
+    """Экранирует спецсимволы MarkdownV2."""
+    return MARKDOWN_SPECIAL.sub(r'\\\1', text)
+
+
+def escape_html(text: str) -> str:
+    """Экранирует &, < и > для разметки HTML."""
+    return html.escape(text, quote=False)
+
+
+ESCAPERS: Dict[str, Callable[[str], str]] = {
+    TEXT: str,
+    HTML: escape_html,
+    MARKDOWN: escape_markdown,
+}
+
+
+def parse_mode(message_format: str) -> Optional[str]:
+    """Значение parse_mode для Bot.send_message по формату сообщений."""
+    if message_format not in PARSE_MODES:
+        raise ValueError(LOG_UNKNOWN_FORMAT + str(message_format))
+    return PARSE_MODES[message_format]
+
+
+class Catalog(NamedTuple):
+    """Тексты одного языка; {name}, {error}, {count} — при отправке.
+
+    replies — готовые ответы на команды бота по ключу.
+    """
+
+    status: str
+    verdicts: Mapping[str, str]
+    error: str
+    summary: str
+    current: str
+    replies: Mapping[str, str]
+
+
+class Template(NamedTuple):
+    """Шаблон, в котором осталось подставить одно значение."""
+
+    prefix: str
+    suffix: str
+    escape: Callable[[str], str]
+
+    def render(self, value: object) -> str:
+        """Подставляет экранированное значение между готовыми частями."""
+        return self.prefix + self.escape(str(value)) + self.suffix
+
+
+def compile_template(frame: str, field: str, values: Mapping[str, str],
+                     escape: Callable[[str], str]) -> Template:
+    """Собирает шаблон: подставляет values и экранирует текст один раз."""
+    prefix, _, suffix = frame.partition('{' + field + '}')
+    return Template(escape(prefix.format(**values)),
+                    escape(suffix.format(**values)), escape)
+
+
+class Renderer:
+    """Кеш собранных шаблонов по (язык, статус, формат).
+
+    Шаблон собирается при первом обращении, дальше отрисовка сообщения —
+    экранирование имени работы и одна склейка строк. Неизвестный язык
+    заменяется языком по умолчанию, неизвестный статус даёт KeyError.
+    """
+
+    def __init__(self, catalogs: Mapping[str, Catalog],
+                 default_locale: str) -> None:
+        """Создаёт отрисовщик с пустым кешем шаблонов."""
+        self.catalogs = catalogs
+        self.default_locale = default_locale
+        self.status_template = lru_cache(TEMPLATE_CACHE_SIZE)(
+            self._status_template)
+        self.error_template = lru_cache(TEMPLATE_CACHE_SIZE)(
+            self._error_template)
+        self.summary_template = lru_cache(TEMPLATE_CACHE_SIZE)(
+            self._summary_template)
+        self.reply = lru_cache(TEMPLATE_CACHE_SIZE)(self._reply)
+
+    def catalog(self, locale: Optional[str]) -> Catalog:
+        """Тексты языка locale или языка по умолчанию."""
+        return (self.catalogs.get(locale)
+                or self.catalogs[self.default_locale])
+
+    @staticmethod
+    def escaper(message_format: str) -> Callable[[str], str]:
+        """Функция экранирования для формата сообщений."""
+        if message_format not in ESCAPERS:
+            raise ValueError(LOG_UNKNOWN_FORMAT + str(message_format))
+        return ESCAPERS[message_format]
+
+    def _status_template(self, locale: Optional[str], status: str,
+                         message_format: str,
+                         frame: str = 'status') -> Template:
+        catalog = self.catalog(locale)
+        return compile_template(getattr(catalog, frame), 'name',
+                                {'verdict': catalog.verdicts[status]},
+                                self.escaper(message_format))
+
+    def _reply(self, locale: Optional[str], key: str,
+               message_format: str) -> str:
+        return self.escaper(message_format)(self.catalog(locale).replies[key])
+
+    def _error_template(self, locale: Optional[str],
+                        message_format: str) -> Template:
+        return compile_template(self.catalog(locale).error, 'error', {},
+                                self.escaper(message_format))
+
+    def _summary_template(self, locale: Optional[str], minutes: int,
+                          message_format: str) -> Template:
+        return compile_template(self.catalog(locale).summary, 'count',
+                                {'minutes': str(minutes)},
+                                self.escaper(message_format))
+
+    def status(self, name: object, status: str, locale: Optional[str] = None,
+               message_format: str = TEXT) -> str:
+        """Сообщение о смене статуса работы name."""
+        return self.status_template(locale, status,
+                                    message_format).render(name)
+
+    def current(self, name: object, status: str,
+                locale: Optional[str] = None,
+                message_format: str = TEXT) -> str:
+        """Строка ответа на /status о текущем статусе работы name."""
+        return self.status_template(locale, status, message_format,
+                                    'current').render(name)
+
+    def error(self, error: object, locale: Optional[str] = None,
+              message_format: str = TEXT) -> str:
+        """Сообщение о сбое в работе бота."""
+        return self.error_template(locale, message_format).render(error)
+
+    def summary(self, count: int, minutes: int, locale: Optional[str] = None,
+                message_format: str = TEXT) -> str:
+        """Сводка о скрытых повторах сбоев за minutes минут."""
+        return self.summary_template(locale, minutes,
+                                     message_format).render(count)
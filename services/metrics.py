@@ -0,0 +1,208 @@
+"""Метрики в текстовом формате Prometheus и HTTP-эндпоинт для них."""
+import bisect
+import threading
+from http import HTTPStatus
+from typing import (TYPE_CHECKING, Callable, Dict, List, Optional, Sequence,
+                    Tuple)
+
+if TYPE_CHECKING:
+    from http.server import ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+                   30, 60, 300, 900, 1800, 3600)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def format_labels(labels: Labels) -> str:
+    """Метки в виде {name="value",...}."""
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', r'\\')
+                         .replace('"', r'\"').replace('\n', r'\n'))
+        for name, value in labels)
+    return '{' + pairs + '}'
+
+
+class Metric:
+    """Общая часть метрик: имя, описание и блокировка."""
+
+    kind = 'untyped'
+
+    def __init__(self, name: str, description: str) -> None:
+        """Создаёт метрику без значений."""
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        """Значения метрики: (суффикс имени, метки, значение)."""
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """Метрика в текстовом формате Prometheus."""
+        lines = [f'# HELP {self.name} {self.description}',
+                 f'# TYPE {self.name} {self.kind}']
+        for suffix, labels, value in self.samples():
+            lines.append(f'{self.name}{suffix}{format_labels(labels)} '
+                         f'{value:g}')
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, description: str) -> None:
+        """Создаёт счётчик."""
+        super().__init__(name, description)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Увеличивает счётчик с метками labels."""
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Текущее значение счётчика с метками labels."""
+        return self._values.get(tuple(sorted(labels.items())), 0)
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        """Значения счётчика по меткам."""
+        with self._lock:
+            return [('_total', key, value)
+                    for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """Текущее значение: задаётся set() или вычисляется при чтении."""
+
+    kind = 'gauge'
+
+    def __init__(self, name: str, description: str,
+                 function: Optional[Callable[[], float]] = None) -> None:
+        """Создаёт показатель; function вызывается при каждом чтении."""
+        super().__init__(name, description)
+        self._value = 0.0
+        self.function = function
+
+    def set(self, value: float) -> None:
+        """Задаёт значение."""
+        self._value = value
+
+    def value(self) -> float:
+        """Текущее значение."""
+        if self.function is not None:
+            return self.function()
+        return self._value
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        """Единственное значение показателя."""
+        return [('', (), self.value())]
+
+
+class Histogram(Metric):
+    """Распределение значений по фиксированным корзинам."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, description: str,
+                 buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        """Создаёт гистограмму с верхними границами корзин buckets."""
+        super().__init__(name, description)
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """Учитывает одно наблюдение."""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @property
+    def count(self) -> int:
+        """Число наблюдений."""
+        return sum(self._counts)
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        """Накопленные счётчики корзин, сумма и число наблюдений."""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            samples.append(('_bucket', (('le', f'{bound:g}'),), cumulative))
+        cumulative += counts[-1]
+        samples.append(('_bucket', (('le', '+Inf'),), cumulative))
+        samples.append(('_sum', (), total))
+        samples.append(('_count', (), cumulative))
+        return samples
+
+
+class Registry:
+    """Набор метрик, отдаваемых одним эндпоинтом."""
+
+    def __init__(self) -> None:
+        """Создаёт пустой набор."""
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        """Добавляет метрику и возвращает её."""
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, description: str) -> Counter:
+        """Создаёт и регистрирует счётчик."""
+        return self.register(Counter(name, description))
+
+    def gauge(self, name: str, description: str,
+              function: Optional[Callable[[], float]] = None) -> Gauge:
+        """Создаёт и регистрирует показатель."""
+        return self.register(Gauge(name, description, function))
+
+    def histogram(self, name: str, description: str,
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Создаёт и регистрирует гистограмму."""
+        return self.register(Histogram(name, description, buckets))
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus."""
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+
+def serve_metrics(registry: Registry, host: str = '127.0.0.1',
+                  port: int = 9100) -> 'ThreadingHTTPServer':
+    """Отдаёт метрики по GET /metrics из фонового потока.
+
+    http.server импортируется здесь: без METRICS_PORT он не нужен.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+            body = registry.render().encode()
+            self.send_response(HTTPStatus.OK)
+            self.send_header('Content-Type',
+                             'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
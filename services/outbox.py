@@ -0,0 +1,334 @@
+"""Очередь исходящих сообщений Telegram с ограничением частоты."""
+import contextvars
+import heapq
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import (Callable, Deque, Dict, Hashable, List, Optional, Tuple,
+                    Type)
+
+from services.resilience import Backoff
+
+LOG_OUTBOX_RETRY = 'Повторная отправка в чат %s через %.1fс.: %s'
+LOG_OUTBOX_DROP = 'Сообщения в чат %s не отправлены после %d попыток: %s'
+LOG_OUTBOX_REJECTED = 'Чат %s не принимает сообщения, повтора не будет: %s'
+LOG_OUTBOX_ABANDONED = 'При остановке не отправлено сообщений: %d'
+LOG_OUTBOX_CALLBACK_ERROR = 'Сбой обработчика сообщения в чат %s'
+LOG_OUTBOX_WORKER_ERROR = 'Сбой отправки сообщений в чат %s'
+
+MESSAGE_LIMIT = 4096
+MESSAGE_SEPARATOR = '\n\n'
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Ведро токенов: rate токенов в секунду, не больше capacity."""
+
+    def __init__(self, rate: float, capacity: float, now: float) -> None:
+        """Создаёт полное ведро."""
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Сколько секунд ждать до появления токена."""
+        self.tokens = min(self.capacity,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        """Забирает токен; вызывать после wait_time() == 0."""
+        self.tokens -= 1
+
+
+@dataclass
+class Message:
+    """Сообщение в очереди и действие после успешной отправки."""
+
+    text: str
+    key: Optional[Hashable] = None
+    on_sent: Optional[Callable[[], None]] = None
+    parse_mode: Optional[str] = None
+    on_dropped: Optional[Callable[[], None]] = None
+    on_rejected: Optional[Callable[[], None]] = None
+    context: Optional[contextvars.Context] = None
+
+
+@dataclass
+class ChatQueue:
+    """Сообщения одного чата и его ограничение частоты."""
+
+    bucket: TokenBucket
+    messages: Deque[Message] = field(default_factory=deque)
+    attempts: int = 0
+    scheduled: bool = False
+
+
+class Outbox:
+    """Очередь между разбором статусов и API Telegram.
+
+    put() не блокируется: сообщения забирают фоновые потоки. Частота
+    ограничена ведрами токенов на каждый чат и на весь бот, несколько
+    сообщений одному чату склеиваются в одно, если у них одна разметка
+    (parse_mode). Ошибка с атрибутом
+    retry_after (telegram.error.RetryAfter) откладывает чат на
+    указанное время, остальные ошибки — на экспоненциальную паузу,
+    после max_attempts попыток сообщения отбрасываются. Для
+    отброшенных сообщений, как и для не отправленных к остановке,
+    вызывается on_dropped. Ошибки из permanent_errors (бот заблокирован,
+    чата нет) не повторяются: сообщения сразу отбрасываются с вызовом
+    on_rejected. Ошибки обработчиков логируются и не останавливают
+    потоки отправки. send вызывается в контексте (contextvars) вызова
+    put() первого сообщения пакета: так, например, спан отправки
+    становится дочерним к спану, в котором сообщение поставили.
+    """
+
+    def __init__(self, send: Callable[[str, str], object],
+                 global_rate: float = 30, chat_rate: float = 1,
+                 chat_burst: float = 3, workers: int = 4,
+                 max_attempts: int = 5,
+                 backoff: Optional[Backoff] = None,
+                 permanent_errors: Tuple[Type[Exception], ...] = (),
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Создаёт очередь; потоки запускает start()."""
+        self._send = send
+        self.permanent_errors = permanent_errors
+        self._clock = clock
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff or Backoff(base=1, cap=60)
+        self._global = TokenBucket(global_rate, global_rate, clock())
+        self._chats: Dict[str, ChatQueue] = {}
+        self._keys = set()
+        self._ready: List[tuple] = []
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._threads: List[threading.Thread] = []
+
+    def put(self, chat_id: str, text: str, key: Optional[Hashable] = None,
+            on_sent: Optional[Callable[[], None]] = None,
+            parse_mode: Optional[str] = None,
+            on_dropped: Optional[Callable[[], None]] = None,
+            on_rejected: Optional[Callable[[], None]] = None) -> bool:
+        """Ставит сообщение в очередь.
+
+        Сообщение с ключом, который уже ждёт отправки, не дублируется.
+        После stop() сообщение не ставится, для него вызывается
+        on_dropped.
+        """
+        with self._condition:
+            if not self._stopping:
+                if key is not None:
+                    if key in self._keys:
+                        return False
+                    self._keys.add(key)
+                self._enqueue(chat_id, Message(
+                    text, key, on_sent, parse_mode, on_dropped, on_rejected,
+                    contextvars.copy_context()))
+                return True
+        self._callback(chat_id, on_dropped)
+        return False
+
+    def _enqueue(self, chat_id: str, message: Message) -> None:
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = self._chats[chat_id] = ChatQueue(TokenBucket(
+                self.chat_rate, self.chat_burst, self._clock()))
+        chat.messages.append(message)
+        self._schedule(chat_id, chat, self._clock())
+
+    def __len__(self) -> int:
+        """Число сообщений, ожидающих отправки."""
+        with self._condition:
+            return sum(len(chat.messages) for chat in self._chats.values())
+
+    def _schedule(self, chat_id: str, chat: ChatQueue, when: float) -> None:
+        if not chat.scheduled:
+            chat.scheduled = True
+            heapq.heappush(self._ready, (when, chat_id))
+            self._condition.notify()
+
+    def _next_batch(self) -> Optional[tuple]:
+        """Ждёт чат, которому можно отправить; None — очередь закрыта."""
+        with self._condition:
+            while True:
+                if self._stopping and not self._ready:
+                    return None
+                if not self._ready:
+                    self._condition.wait()
+                    continue
+                now = self._clock()
+                when, chat_id = self._ready[0]
+                if when > now:
+                    self._condition.wait(when - now)
+                    continue
+                heapq.heappop(self._ready)
+                chat = self._chats[chat_id]
+                wait = max(chat.bucket.wait_time(now),
+                           self._global.wait_time(now))
+                if wait > 0:
+                    heapq.heappush(self._ready, (now + wait, chat_id))
+                    continue
+                chat.bucket.take()
+                self._global.take()
+                return chat_id, chat, self._pop_batch(chat)
+
+    @staticmethod
+    def _pop_batch(chat: ChatQueue) -> List[Message]:
+        batch = [chat.messages.popleft()]
+        size = len(batch[0].text)
+        while (chat.messages
+               and chat.messages[0].parse_mode == batch[0].parse_mode):
+            size += len(MESSAGE_SEPARATOR) + len(chat.messages[0].text)
+            if size > MESSAGE_LIMIT:
+                break
+            batch.append(chat.messages.popleft())
+        return batch
+
+    def _deliver(self, chat_id: str, chat: ChatQueue,
+                 batch: List[Message]) -> None:
+        text = MESSAGE_SEPARATOR.join(message.text for message in batch)
+        options = {}
+        if batch[0].parse_mode is not None:
+            options['parse_mode'] = batch[0].parse_mode
+        context = batch[0].context or contextvars.copy_context()
+        try:
+            context.run(self._send, chat_id, text, **options)
+        except Exception as error:
+            self._retry(chat_id, chat, batch, error)
+            return
+        for message in batch:
+            self._callback(chat_id, message.on_sent)
+        with self._condition:
+            chat.attempts = 0
+            self._finish(chat_id, chat, batch, self._clock())
+
+    def _retry(self, chat_id: str, chat: ChatQueue, batch: List[Message],
+               error: Exception) -> None:
+        if isinstance(error, self.permanent_errors):
+            self._reject(chat_id, chat, batch, error)
+            return
+        with self._condition:
+            chat.attempts += 1
+            retry_after = getattr(error, 'retry_after', None)
+            dropped = (retry_after is None
+                       and chat.attempts >= self.max_attempts)
+            if not dropped:
+                self._requeue(chat_id, chat, batch, error, retry_after)
+                return
+            logger.error(LOG_OUTBOX_DROP, chat_id, chat.attempts, error)
+            chat.attempts = 0
+            self._finish(chat_id, chat, batch, self._clock())
+        self._dropped(batch, chat_id)
+
+    def _reject(self, chat_id: str, chat: ChatQueue, batch: List[Message],
+                error: Exception) -> None:
+        logger.error(LOG_OUTBOX_REJECTED, chat_id, error)
+        with self._condition:
+            chat.attempts = 0
+            self._finish(chat_id, chat, batch, self._clock())
+        for message in batch:
+            self._callback(chat_id, message.on_rejected)
+
+    def _requeue(self, chat_id: str, chat: ChatQueue, batch: List[Message],
+                 error: Exception, retry_after: Optional[float]) -> None:
+        if retry_after is None:
+            delay = self.backoff.delay(chat.attempts)
+        else:
+            delay = float(retry_after)
+        logger.warning(LOG_OUTBOX_RETRY, chat_id, delay, error)
+        chat.messages.extendleft(reversed(batch))
+        chat.scheduled = False
+        self._schedule(chat_id, chat, self._clock() + delay)
+
+    @classmethod
+    def _dropped(cls, messages: List[Message],
+                 chat_id: Optional[str] = None) -> None:
+        for message in messages:
+            cls._callback(chat_id, message.on_dropped)
+
+    @staticmethod
+    def _callback(chat_id: Optional[str],
+                  callback: Optional[Callable[[], None]]) -> None:
+        if callback is None:
+            return
+        try:
+            callback()
+        except Exception:
+            logger.exception(LOG_OUTBOX_CALLBACK_ERROR, chat_id)
+
+    def _finish(self, chat_id: str, chat: ChatQueue, batch: List[Message],
+                now: float) -> None:
+        for message in batch:
+            self._keys.discard(message.key)
+        chat.scheduled = False
+        if chat.messages:
+            self._schedule(chat_id, chat, now)
+        self._condition.notify_all()
+
+    def _work(self) -> None:
+        while True:
+            item = self._next_batch()
+            if item is None:
+                return
+            try:
+                self._deliver(*item)
+            except Exception:
+                logger.exception(LOG_OUTBOX_WORKER_ERROR, item[0])
+                self._release(*item)
+
+    def _release(self, chat_id: str, chat: ChatQueue,
+                 batch: List[Message]) -> None:
+        """Освобождает чат после непредвиденного сбоя отправки пакета."""
+        with self._condition:
+            for message in batch:
+                self._keys.discard(message.key)
+            if not chat.scheduled:
+                return
+            chat.scheduled = False
+            if chat.messages:
+                self._schedule(chat_id, chat, self._clock())
+            self._condition.notify_all()
+
+    def start(self) -> 'Outbox':
+        """Запускает фоновые потоки отправки."""
+        for number in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True,
+                                      name=f'outbox-{number}')
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> int:
+        """Дожидается отправки очереди не дольше timeout секунд.
+
+        Возвращает число сообщений, которые не успели отправить.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        deadline = None if timeout is None else self._clock() + timeout
+        for thread in self._threads:
+            remaining = (None if deadline is None
+                         else max(deadline - self._clock(), 0))
+            thread.join(remaining)
+        with self._condition:
+            abandoned = [message for chat in self._chats.values()
+                         for message in chat.messages]
+            for chat in self._chats.values():
+                chat.messages.clear()
+            self._keys.clear()
+            self._ready.clear()
+        if abandoned:
+            logger.warning(LOG_OUTBOX_ABANDONED, len(abandoned))
+        self._dropped(abandoned)
+        return len(abandoned)
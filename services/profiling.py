@@ -0,0 +1,204 @@
+"""Профилирование работающего процесса выборкой стеков всех потоков.
+
+cProfile видит только поток, в котором включён, а опрос идёт и в пуле
+потоков, и в потоках очереди отправки. Поэтому профилировщик раз в
+interval секунд снимает стеки всех потоков через sys._current_frames
+и считает, в скольких выборках встретилась каждая отслеживаемая
+функция (включая вложенные вызовы) и какая функция была на вершине
+стека (собственное время). Выборки меряют настенное время; потоки,
+которые ждут работу (ожидание события, очереди, select), в них не
+попадают. Расход процессора за окно даёт process_time.
+"""
+import logging
+import queue
+import selectors
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import thread
+from types import CodeType, FrameType
+from typing import Callable, Dict, List, Optional, Tuple
+
+LOG_PROFILE_STARTED = 'Профилирование запущено на %s с'
+LOG_PROFILE_WRITTEN = 'Отчёт профилирования записан в %s'
+
+Matcher = Callable[[CodeType], bool]
+
+logger = logging.getLogger(__name__)
+
+
+def functions(filename: str, *names: str) -> Matcher:
+    """Отбирает функции names, объявленные в файле filename."""
+    wanted = frozenset(names)
+    return lambda code: (code.co_name in wanted
+                         and code.co_filename == filename)
+
+
+def package(directory: str) -> Matcher:
+    """Отбирает все функции из файлов каталога directory."""
+    return lambda code: code.co_filename.startswith(directory)
+
+
+def any_of(*matchers: Matcher) -> Matcher:
+    """Отбирает функции, подходящие под любой из matchers."""
+    return lambda code: any(matches(code) for matches in matchers)
+
+
+WAITING = any_of(
+    functions(threading.__file__, 'wait', '_wait_for_tstate_lock'),
+    functions(queue.__file__, 'get'),
+    functions(selectors.__file__, 'select'),
+    functions(thread.__file__, '_worker'),
+)
+
+
+class ProfileReport:
+    """Итог окна профилирования."""
+
+    def __init__(self, duration: float, cpu: float, samples: int,
+                 targets: Dict[str, int], hot: List[Tuple[str, int]],
+                 interval: float, polls: float = 0, idle: int = 0) -> None:
+        """Сохраняет итоги окна."""
+        self.duration = duration
+        self.idle = idle
+        self.cpu = cpu
+        self.samples = samples
+        self.targets = targets
+        self.hot = hot
+        self.interval = interval
+        self.polls = polls
+
+    def format(self) -> str:
+        """Текст отчёта: процессор на опрос, этапы и горячие функции."""
+        per_poll = self.cpu / self.polls * 1000 if self.polls else 0.0
+        lines = [
+            f'Окно {self.duration:.1f} с, выборок {self.samples}, '
+            f'ожидающих {self.idle}, шаг {self.interval * 1000:g} мс',
+            f'Процессор {self.cpu:.3f} с, опросов {self.polls:g}, '
+            f'на опрос {per_poll:.2f} мс',
+            '',
+            'Этап: выборки, доля, оценка времени в с',
+        ]
+        for label, count in self.targets.items():
+            lines.append(
+                f'  {label}: {count}, {self.share(count):.1%}, '
+                f'{count * self.interval:.3f}')
+        lines += ['', 'Горячие функции (вершина стека): выборки, доля']
+        for name, count in self.hot:
+            lines.append(f'  {name}: {count}, {self.share(count):.1%}')
+        return '\n'.join(lines) + '\n'
+
+    def share(self, count: int) -> float:
+        """Доля выборок."""
+        return count / self.samples if self.samples else 0.0
+
+
+class Sampler:
+    """Снимает стеки всех потоков, кроме своего, и копит счётчики."""
+
+    def __init__(self, targets: Dict[str, Matcher],
+                 interval: float = 0.01, top: int = 20,
+                 waiting: Matcher = WAITING) -> None:
+        """Создаёт профилировщик с отслеживаемыми этапами targets.
+
+        Выборки потоков, у которых на вершине стека функция ожидания
+        waiting, только подсчитываются как ожидающие.
+        """
+        self.targets = targets
+        self.waiting = waiting
+        self.interval = interval
+        self.top = top
+
+    def run(self, duration: float, stop: threading.Event,
+            polls: Callable[[], float] = lambda: 0) -> ProfileReport:
+        """Профилирует duration секунд или до stop и возвращает отчёт."""
+        own = threading.get_ident()
+        labels: Counter = Counter()
+        hot: Counter = Counter()
+        samples = idle = 0
+        started, cpu, polls_before = (
+            time.monotonic(), time.process_time(), polls())
+        deadline = started + duration
+        while not stop.wait(self.interval) and time.monotonic() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if self.waiting(frame.f_code):
+                    idle += 1
+                    continue
+                samples += 1
+                self._sample(frame, labels, hot)
+        return ProfileReport(
+            time.monotonic() - started, time.process_time() - cpu, samples,
+            {label: labels[label] for label in self.targets},
+            [(name, count) for name, count in hot.most_common(self.top)],
+            self.interval, polls() - polls_before, idle)
+
+    def _sample(self, frame: FrameType, labels: Counter,
+                hot: Counter) -> None:
+        code = frame.f_code
+        hot[f'{code.co_filename}:{code.co_firstlineno}({code.co_name})'] += 1
+        seen = set()
+        while frame is not None:
+            for label, matches in self.targets.items():
+                if label not in seen and matches(frame.f_code):
+                    seen.add(label)
+            frame = frame.f_back
+        labels.update(seen)
+
+
+class Profiler:
+    """Окна профилирования по запросу: запуск, досрочная остановка."""
+
+    def __init__(self, sampler: Sampler, window: float,
+                 output: Callable[[], str],
+                 polls: Callable[[], float] = lambda: 0) -> None:
+        """Создаёт профилировщик; output даёт путь для очередного отчёта."""
+        self.sampler = sampler
+        self.window = window
+        self.output = output
+        self.polls = polls
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.RLock()
+
+    @property
+    def running(self) -> bool:
+        """Идёт ли сейчас окно профилирования."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, window: Optional[float] = None) -> bool:
+        """Начинает окно; False — окно уже идёт."""
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(window or self.window,),
+                name='profiler', daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        """Досрочно завершает окно; отчёт всё равно пишется."""
+        self._stop.set()
+
+    def toggle(self, *signal_args: object) -> None:
+        """Запускает окно или завершает идущее; годится как обработчик."""
+        if not self.start():
+            self.stop()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        """Ждёт записи отчёта текущего окна."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self, window: float) -> None:
+        logger.info(LOG_PROFILE_STARTED, window)
+        report = self.sampler.run(window, self._stop, self.polls)
+        path = self.output()
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(report.format())
+        logger.info(LOG_PROFILE_WRITTEN, path)
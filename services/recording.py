@@ -0,0 +1,161 @@
+"""Запись ответов API Практикума для воспроизведения без сети.
+
+Запись — файл со строками JSON, по строке на запрос:
+
+    {"at": 1650000012.5, "token": "3f2a...", "from_date": 1650000000,
+     "status": 200, "body": "<тело ответа как есть>"}
+
+at — unix-время ответа, token — хеш токена: сам токен и заголовок
+Authorization в файл не попадают. Если тело ответа 200 совпало с
+прошлым телом того же токена без учёта current_date, поля body в
+строке нет: бот такое тело не разбирает. Каждая строка уходит в файл
+одной записью в режиме дозаписи без буфера, поэтому несколько
+процессов могут писать в один файл, а при аварийном завершении
+теряется не больше одной строки. В файл с суффиксом .gz каждая
+строка пишется отдельным членом gzip: файл остаётся сжатым, а
+оборванный член пропускается при чтении.
+"""
+import gzip
+import hashlib
+import json
+import threading
+import time
+import zlib
+from typing import (BinaryIO, Callable, Dict, Generator, Iterator, NamedTuple,
+                    Optional)
+
+from services.http import body_digest
+
+GZIP_SUFFIX = '.gz'
+GZIP_MAGIC = b'\x1f\x8b\x08'
+READ_SIZE = 1 << 16
+
+
+class Record(NamedTuple):
+    """Один записанный запрос и ответ; body None — тело не изменилось."""
+
+    at: float
+    token: str
+    from_date: int
+    status: int
+    body: Optional[str] = None
+
+
+def redact(token: str) -> str:
+    """Хеш токена: различает студентов, но не раскрывает токен."""
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+class Recorder:
+    """Дописывает запросы и ответы в файл записи."""
+
+    def __init__(self, path: str,
+                 clock: Callable[[], float] = time.time) -> None:
+        """Запоминает путь; файл открывается при первой записи."""
+        self.path = path
+        self._clock = clock
+        self._compress = path.endswith(GZIP_SUFFIX)
+        self._digests: Dict[str, bytes] = {}
+        self._file = None
+        self._lock = threading.Lock()
+
+    def record(self, token: str, from_date: int, status: int,
+               body: str) -> None:
+        """Записывает ответ status с телом body на запрос from_date."""
+        token = redact(token)
+        record = Record(round(self._clock(), 3), token, from_date, status,
+                        body)._asdict()
+        with self._lock:
+            if status == 200 and self._unchanged(token, body):
+                del record['body']
+            data = (json.dumps(record, ensure_ascii=False) + '\n').encode()
+            if self._compress:
+                data = gzip.compress(data)
+            if self._file is None:
+                self._file = open(self.path, 'ab', buffering=0)
+            self._file.write(data)
+
+    def _unchanged(self, token: str, body: str) -> bool:
+        digest, _ = body_digest(body.encode())
+        previous = self._digests.get(token)
+        self._digests[token] = digest
+        return digest == previous
+
+    def close(self) -> None:
+        """Закрывает файл."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_records(path: str) -> Iterator[Record]:
+    """Читает записи из файла по порядку.
+
+    Строки, которые не удалось разобрать (оборванные при аварийном
+    завершении), и повреждённые члены сжатого файла пропускаются.
+    """
+    if path.endswith(GZIP_SUFFIX):
+        with open(path, 'rb') as file:
+            yield from filter(None, map(parse_record, gzip_lines(file)))
+        return
+    with open(path, encoding='utf-8', errors='replace') as file:
+        yield from filter(None, map(parse_record, file))
+
+
+def gzip_lines(file: BinaryIO) -> Iterator[str]:
+    """Строки из gzip-членов файла; испорченный член пропускается.
+
+    gzip.open останавливается на первой ошибке и теряет всё, что
+    дописано после оборванного члена, поэтому члены распаковываются
+    по одному, а после ошибки поиск продолжается со следующего
+    заголовка gzip.
+    """
+    buffer = bytearray()
+    while True:
+        start = buffer.find(GZIP_MAGIC)
+        if start < 0:
+            chunk = file.read(READ_SIZE)
+            if not chunk:
+                return
+            del buffer[:max(len(buffer) + 1 - len(GZIP_MAGIC), 0)]
+            buffer += chunk
+            continue
+        del buffer[:start]
+        buffer = yield from inflate_member(file, buffer)
+
+
+def inflate_member(file: BinaryIO,
+                   buffer: bytearray) -> Generator[str, None, bytearray]:
+    """Отдаёт строки члена gzip в начале buffer, дочитывая file.
+
+    Возвращает байты после члена, а если член испорчен — всё
+    прочитанное после первого байта его заголовка.
+    """
+    decoder = zlib.decompressobj(zlib.MAX_WBITS | 16)
+    tail, fed = b'', 0
+    try:
+        while not decoder.eof:
+            if fed == len(buffer):
+                chunk = file.read(READ_SIZE)
+                if not chunk:
+                    return buffer[1:]
+                buffer += chunk
+            *lines, tail = (
+                tail + decoder.decompress(buffer[fed:])).split(b'\n')
+            fed = len(buffer)
+            for line in lines:
+                yield line.decode('utf-8', errors='replace')
+    except zlib.error:
+        return buffer[1:]
+    if tail:
+        yield tail.decode('utf-8', errors='replace')
+    return bytearray(decoder.unused_data)
+
+
+def parse_record(line: str) -> Optional[Record]:
+    """Запись из строки файла; None — строка пустая или повреждена."""
+    try:
+        return Record(**json.loads(line))
+    except (ValueError, TypeError):
+        return None
@@ -0,0 +1,101 @@
+"""Повторы с экспоненциальной паузой и автомат отключения запросов."""
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+LOG_CIRCUIT_OPEN = 'API недоступно, запросы приостановлены на: '
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+@dataclass
+class Backoff:
+    """Экспоненциальная пауза с ограничением и случайным разбросом."""
+
+    base: float = 30
+    cap: float = 1800
+
+    def delay(self, attempt: int, rng: random.Random = random) -> float:
+        """Пауза перед повтором номер attempt (с единицы)."""
+        ceiling = min(self.cap, self.base * 2 ** min(attempt - 1, 32))
+        return rng.uniform(ceiling / 2, ceiling)
+
+
+class CircuitOpenError(ConnectionError):
+    """Запрос не отправлен: автомат отключения разомкнут."""
+
+    def __init__(self, retry_after: float) -> None:
+        """Сохраняет время до следующей пробной попытки."""
+        super().__init__(LOG_CIRCUIT_OPEN + f'{retry_after:.0f}с.')
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Автомат отключения, общий для всех запросов к одному API.
+
+    После failure_threshold сбоев подряд автомат размыкается, и запросы
+    не отправляются reset_timeout секунд. Затем пропускается одна
+    пробная попытка: успех замыкает автомат, сбой размыкает снова.
+    """
+
+    def __init__(self, failure_threshold: int = 5,
+                 reset_timeout: float = 60,
+                 probe_timeout: float = 15,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Создаёт замкнутый автомат."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.probe_timeout = probe_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started = 0.0
+
+    @property
+    def state(self) -> str:
+        """Текущее состояние: closed, open или half_open."""
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if (self._state == OPEN
+                and self._clock() - self._opened_at >= self.reset_timeout):
+            self._state = HALF_OPEN
+            self._probe_started = 0.0
+        return self._state
+
+    def before_request(self) -> None:
+        """Пропускает запрос или выбрасывает CircuitOpenError."""
+        with self._lock:
+            state = self._current_state()
+            now = self._clock()
+            if state == CLOSED:
+                return
+            if state == OPEN:
+                raise CircuitOpenError(
+                    self.reset_timeout - (now - self._opened_at))
+            if now - self._probe_started >= self.probe_timeout:
+                self._probe_started = now
+                return
+            raise CircuitOpenError(self.probe_timeout)
+
+    def record_success(self) -> None:
+        """Замыкает автомат после успешного запроса."""
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        """Учитывает сбой и при необходимости размыкает автомат."""
+        with self._lock:
+            self._failures += 1
+            state = self._current_state()
+            if state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = self._clock()
@@ -0,0 +1,33 @@
+"""Выбор времени следующего опроса подписки."""
+import random
+from dataclasses import dataclass
+
+
+@dataclass
+class PollPolicy:
+    """Интервалы опроса в зависимости от состояния подписки.
+
+    Пока хотя бы одна работа на ревью, подписка опрашивается раз в
+    reviewing секунд. Когда ждать нечего, интервал растёт вдвое после
+    каждого опроса без изменений — от base до idle. Ко всем интервалам
+    добавляется случайный разброс ±jitter, чтобы подписки не
+    опрашивались одновременно.
+    """
+
+    base: float = 600
+    reviewing: float = 120
+    idle: float = 1800
+    jitter: float = 0.1
+
+    def delay(self, reviewing: bool, idle_polls: int,
+              rng: random.Random = random) -> float:
+        """Возвращает паузу в секундах до следующего опроса."""
+        if reviewing:
+            delay = self.reviewing
+        else:
+            delay = min(self.base * 2 ** min(idle_polls, 16), self.idle)
+        return delay * (1 + rng.uniform(-self.jitter, self.jitter))
+
+    def first_delay(self, rng: random.Random = random) -> float:
+        """Разносит первые опросы подписок по окну base * jitter."""
+        return rng.uniform(0, self.base * self.jitter)
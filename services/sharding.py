@@ -0,0 +1,213 @@
+"""Распределение подписок по процессам через консистентное хеширование."""
+import bisect
+import hashlib
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Hashable, Iterable, List
+
+LOG_SHARD_STARTED = 'Шард %s запущен, подписок: %d'
+LOG_SHARD_DIED = 'Шард %s завершился с кодом %s, перезапуск'
+LOG_SHARD_EXITED = 'Шард %s завершил работу'
+LOG_SHARD_EVICTED = 'Шард %s падает слишком часто, подписки перераспределены'
+
+logger = logging.getLogger(__name__)
+
+
+def ring_hash(value: str) -> int:
+    """Стабильный между процессами и запусками хеш строки."""
+    return int.from_bytes(hashlib.md5(value.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """Кольцо консистентного хеширования.
+
+    Каждый узел занимает replicas точек кольца; ключ принадлежит
+    ближайшему по часовой стрелке узлу. При удалении узла переезжают
+    только его ключи.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 100
+                 ) -> None:
+        """Создаёт кольцо из узлов nodes."""
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        """Добавляет узел."""
+        for replica in range(self.replicas):
+            point = ring_hash(f'{node}#{replica}')
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+                self._owners[point] = node
+
+    def remove(self, node: str) -> None:
+        """Убирает узел."""
+        for replica in range(self.replicas):
+            point = ring_hash(f'{node}#{replica}')
+            if self._owners.get(point) == node:
+                del self._owners[point]
+                self._points.remove(point)
+
+    @property
+    def nodes(self) -> List[str]:
+        """Узлы кольца."""
+        return sorted(set(self._owners.values()))
+
+    def node_for(self, key: str) -> str:
+        """Узел, которому принадлежит ключ."""
+        if not self._points:
+            raise LookupError('Кольцо пустое')
+        index = bisect.bisect(self._points, ring_hash(key))
+        return self._owners[self._points[index % len(self._points)]]
+
+    def assign(self, items: Iterable, key: Callable[[object], str]
+               ) -> Dict[str, list]:
+        """Раскладывает items по узлам."""
+        assignment = {node: [] for node in self.nodes}
+        for item in items:
+            assignment[self.node_for(key(item))].append(item)
+        return assignment
+
+
+class Supervisor:
+    """Запускает по процессу на шард и следит за ними.
+
+    target(shard, items) выполняется в отдельном процессе; шард без
+    подписок не запускается. Шард, завершившийся с кодом 0, считается
+    закончившим работу, а упавший перезапускается; если за
+    restart_window секунд он упал больше max_restarts раз, шард
+    убирается из кольца, а его подписки
+    переезжают к остальным: затронутые шарды останавливаются и
+    запускаются заново с новым набором. Состояние подписок при этом
+    передаётся через общее хранилище, которое шард сбрасывает при
+    остановке. Останавливаемые шарды получают SIGTERM одновременно и
+    ждутся с общим сроком stop_timeout; не успевшие добиваются SIGKILL.
+    """
+
+    def __init__(self, target: Callable[[str, list], None], items: list,
+                 key: Callable[[object], str], shards: int,
+                 max_restarts: int = 5, restart_window: float = 60,
+                 check_interval: float = 1.0,
+                 stop_timeout: float = 30) -> None:
+        """Готовит кольцо из shards шардов; процессы запускает run()."""
+        self.target = target
+        self.items = items
+        self.key = key
+        self.max_restarts = max_restarts
+        self.restart_window = restart_window
+        self.check_interval = check_interval
+        self.stop_timeout = stop_timeout
+        self.ring = HashRing(f'shard-{number}' for number in range(shards))
+        self._context = multiprocessing.get_context('spawn')
+        self._processes: Dict[str, multiprocessing.Process] = {}
+        self._assignment: Dict[str, list] = {}
+        self._restarts: Dict[Hashable, Deque[float]] = {}
+        self._stopping = False
+
+    def _start(self, shard: str) -> None:
+        items = self._assignment.get(shard, [])
+        process = self._context.Process(
+            target=self.target, args=(shard, items), name=shard,
+            daemon=False)
+        process.start()
+        self._processes[shard] = process
+        logger.info(LOG_SHARD_STARTED, shard, len(items))
+
+    def _stop(self, shards: Iterable[str]) -> None:
+        processes = []
+        for shard in list(shards):
+            process = self._processes.pop(shard, None)
+            if process is not None:
+                processes.append(process)
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + self.stop_timeout
+        for process in processes:
+            process.join(max(deadline - time.monotonic(), 0))
+        for process in processes:
+            if process.is_alive():
+                process.kill()
+                process.join()
+
+    def start(self) -> None:
+        """Раскладывает подписки и запускает все шарды."""
+        self._assignment = self.ring.assign(self.items, self.key)
+        for shard in self.ring.nodes:
+            if self._assignment[shard]:
+                self._start(shard)
+
+    def rebalance(self, evicted: str) -> None:
+        """Убирает шард из кольца и раздаёт его подписки остальным."""
+        self.ring.remove(evicted)
+        previous = self._assignment
+        self._assignment = self.ring.assign(self.items, self.key)
+        moved = [shard for shard in self.ring.nodes
+                 if self._assignment[shard] != previous.get(shard)]
+        self._stop([evicted, *moved])
+        for shard in moved:
+            if self._assignment[shard]:
+                self._start(shard)
+        logger.warning(LOG_SHARD_EVICTED, evicted)
+
+    def check(self) -> None:
+        """Перезапускает упавшие шарды."""
+        now = time.monotonic()
+        for shard, process in list(self._processes.items()):
+            if process.is_alive():
+                continue
+            if process.exitcode == 0:
+                del self._processes[shard]
+                logger.info(LOG_SHARD_EXITED, shard)
+                continue
+            restarts = self._restarts.setdefault(shard, deque())
+            restarts.append(now)
+            while restarts and now - restarts[0] > self.restart_window:
+                restarts.popleft()
+            if len(restarts) > self.max_restarts and len(self.ring.nodes) > 1:
+                self.rebalance(shard)
+                continue
+            logger.error(LOG_SHARD_DIED, shard, process.exitcode)
+            self._start(shard)
+
+    def run(self) -> None:
+        """Запускает шарды и следит за ними до stop()."""
+        self.start()
+        try:
+            while not self._stopping:
+                time.sleep(self.check_interval)
+                self.check()
+        finally:
+            self.stop()
+
+    def forward(self, signum: int, frame: object = None) -> None:
+        """Пересылает сигнал живым шардам; годится как обработчик."""
+        for process in list(self._processes.values()):
+            if process.is_alive() and process.pid is not None:
+                os.kill(process.pid, signum)
+
+    def stop(self) -> None:
+        """Останавливает все шарды."""
+        self._stopping = True
+        self._stop(self._processes)
+
+    @property
+    def assignment(self) -> Dict[str, list]:
+        """Текущее распределение подписок по шардам."""
+        return self._assignment
+
+
+def owned(items: Iterable, key: Callable[[object], str], nodes: int,
+          node: int) -> List:
+    """Оставляет элементы, принадлежащие узлу node из nodes узлов."""
+    if nodes <= 1:
+        return list(items)
+    ring = HashRing(f'node-{number}' for number in range(nodes))
+    name = f'node-{node}'
+    return [item for item in items if ring.node_for(key(item)) == name]
@@ -0,0 +1,98 @@
+"""Остановка процесса по сигналу: ожидание, которое можно прервать."""
+import logging
+import signal
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+LOG_SHUTDOWN_REQUESTED = 'Получен сигнал %s: завершаем работу за %.0fс.'
+LOG_SHUTDOWN_TIMEOUT = 'Не успели завершить работу за %.0fс.'
+
+STOP_SIGNALS = (signal.SIGTERM, signal.SIGINT)
+
+logger = logging.getLogger(__name__)
+
+
+class Shutdown:
+    """Флаг остановки процесса с ограниченным сроком завершения.
+
+    Циклы ждут следующего шага через wait() вместо time.sleep() и
+    выходят, как только остановку запросили. Пока не вызван
+    defer_exit(), сигнал сразу прерывает процесс через SystemExit:
+    незаконченной работы ещё нет. После него сигнал только поднимает
+    флаг, а текущий опрос и отправки доводятся до конца. Если процесс
+    не завершился за timeout секунд, вызывается on_timeout.
+    """
+
+    def __init__(self, timeout: float,
+                 on_timeout: Callable[[], None]) -> None:
+        """Создаёт флаг; обработчики сигналов ставит install()."""
+        self.timeout = timeout
+        self.on_timeout = on_timeout
+        self.deadline: Optional[float] = None
+        self._event = threading.Event()
+        self._callbacks: List[Callable[[], None]] = []
+        self._graceful = False
+        self._lock = threading.RLock()
+
+    @property
+    def requested(self) -> bool:
+        """Запрошена ли остановка."""
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Спит до timeout секунд; True — если запросили остановку."""
+        return self._event.wait(timeout)
+
+    def remaining(self) -> float:
+        """Сколько секунд осталось до срока завершения."""
+        if self.deadline is None:
+            return self.timeout
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    def subscribe(self, callback: Callable[[], None]) -> None:
+        """Вызывает callback при запросе остановки или сразу, если он был."""
+        with self._lock:
+            if not self.requested:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def unsubscribe(self, callback: Callable[[], None]) -> None:
+        """Отменяет subscribe()."""
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def request(self, signum: Optional[int] = None) -> None:
+        """Запрашивает остановку и запускает отсчёт срока."""
+        with self._lock:
+            if self.requested:
+                return
+            self.deadline = time.monotonic() + self.timeout
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        logger.warning(LOG_SHUTDOWN_REQUESTED, signum, self.timeout)
+        watchdog = threading.Timer(self.timeout, self._expire)
+        watchdog.daemon = True
+        watchdog.start()
+        for callback in callbacks:
+            callback()
+
+    def _expire(self) -> None:
+        logger.critical(LOG_SHUTDOWN_TIMEOUT, self.timeout)
+        self.on_timeout()
+
+    def defer_exit(self) -> None:
+        """Дальше сигнал не прерывает работу, а просит её закончить."""
+        self._graceful = True
+
+    def _handle(self, signum: int, frame: object) -> None:
+        self.request(signum)
+        if not self._graceful:
+            raise SystemExit(0)
+
+    def install(self, signals: Iterable[int] = STOP_SIGNALS) -> None:
+        """Ставит обработчики сигналов остановки."""
+        for signum in signals:
+            signal.signal(signum, self._handle)
@@ -0,0 +1,104 @@
+"""Схлопывание одновременных одинаковых вызовов в один."""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Hashable, Tuple, TypeVar
+
+T = TypeVar('T')
+
+
+class SingleFlight:
+    """Выполняет function один раз на ключ, пока вызов не завершился.
+
+    Первый вызывающий с данным ключом выполняет функцию, остальные,
+    пришедшие до её завершения, ждут и получают тот же результат или
+    то же исключение. Завершённые вызовы не кешируются.
+    """
+
+    def __init__(self) -> None:
+        """Создаёт пустую таблицу вызовов в полёте."""
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[..., T],
+           *args: object) -> T:
+        """Вызывает function(*args) или присоединяется к такому вызову."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = function(*args)
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def __len__(self) -> int:
+        """Число вызовов в полёте."""
+        with self._lock:
+            return len(self._calls)
+
+
+class CoalescingCache:
+    """Одиночный полёт плюс короткий кеш результатов с вытеснением LRU.
+
+    Результат вызова живёт ttl секунд; всего хранится не больше
+    max_size результатов, давно не запрошенные вытесняются первыми.
+    Ошибки не кешируются, но делятся между одновременными вызовами.
+    Результат отдаётся всем вызывающим как есть, менять его нельзя.
+    """
+
+    def __init__(self, ttl: float = 5.0, max_size: int = 1024,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Создаёт пустой кеш."""
+        self.ttl = ttl
+        self.max_size = max_size
+        self.shared = 0
+        self._clock = clock
+        self._flight = SingleFlight()
+        self._results: 'OrderedDict[Hashable, Tuple[float, object]]' = (
+            OrderedDict())
+        self._lock = threading.Lock()
+
+    def call(self, key: Hashable, function: Callable[..., T],
+             *args: object) -> T:
+        """Результат function(*args) из кеша, общего вызова или новый."""
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and self._clock() - cached[0] < self.ttl:
+                self._results.move_to_end(key)
+                self.shared += 1
+                return cached[1]
+        calls = []
+        result = self._flight.do(key, self._load, key, function, args, calls)
+        if not calls:
+            with self._lock:
+                self.shared += 1
+        return result
+
+    def _load(self, key: Hashable, function: Callable[..., T],
+              args: tuple, calls: list) -> T:
+        calls.append(key)
+        result = function(*args)
+        if self.ttl > 0:
+            with self._lock:
+                self._results[key] = (self._clock(), result)
+                self._results.move_to_end(key)
+                while len(self._results) > self.max_size:
+                    self._results.popitem(last=False)
+        return result
+
+    def __len__(self) -> int:
+        """Число результатов в кеше, включая устаревшие."""
+        with self._lock:
+            return len(self._results)
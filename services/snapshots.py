@@ -0,0 +1,89 @@
+"""Кеш текущих статусов работ подписки для ответов на команды."""
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from services.diff import homework_id
+
+SNAPSHOT_FIELDS = ('homework_name', 'status', 'date_updated')
+
+
+class Snapshot:
+    """Все работы подписки на момент fetched_at."""
+
+    def __init__(self, homeworks: Iterable[dict], fetched_at: float) -> None:
+        """Запоминает только поля, нужные для ответа."""
+        self.homeworks: Dict[str, dict] = {}
+        self.fetched_at = fetched_at
+        self.merge(homeworks, fetched_at)
+
+    def merge(self, homeworks: Iterable[dict], fetched_at: float) -> None:
+        """Обновляет работы из ответа API и время свежести."""
+        for homework in homeworks:
+            self.add(homework)
+        self.fetched_at = fetched_at
+
+    def add(self, homework: dict) -> None:
+        """Добавляет или обновляет одну работу."""
+        self.homeworks[homework_id(homework)] = {
+            name: homework.get(name) for name in SNAPSHOT_FIELDS}
+
+    def items(self) -> List[dict]:
+        """Работы, последние обновлённые первыми."""
+        return sorted(self.homeworks.values(),
+                      key=lambda homework: homework['date_updated'] or '',
+                      reverse=True)
+
+
+class SnapshotCache:
+    """Снимки работ по ключу подписки со сроком свежести ttl.
+
+    Снимок создаётся полным запросом (replace), а дальше его держат
+    свежим обычные опросы: ответ с from_date содержит все работы,
+    изменившиеся с прошлого опроса, и observe() вливает их в снимок.
+    """
+
+    def __init__(self, ttl: float,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        """Создаёт пустой кеш."""
+        self.ttl = ttl
+        self._clock = clock
+        self._snapshots: Dict[str, Snapshot] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        """Работы подписки, если снимок есть и не устарел."""
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if (snapshot is None
+                    or self._clock() - snapshot.fetched_at > self.ttl):
+                return None
+            return snapshot.items()
+
+    def replace(self, key: str, homeworks: Iterable[dict]) -> List[dict]:
+        """Заменяет снимок результатом полного запроса."""
+        snapshot = Snapshot(homeworks, self._clock())
+        with self._lock:
+            self._snapshots[key] = snapshot
+            return snapshot.items()
+
+    def touch(self, key: str) -> None:
+        """Отмечает, что у подписки ничего не изменилось."""
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None:
+                snapshot.fetched_at = self._clock()
+
+    def observe(self, key: str,
+                homeworks: Iterable[dict]) -> Iterator[dict]:
+        """Пропускает работы из ответа опроса, вливая их в снимок."""
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            yield from homeworks
+            return
+        for homework in homeworks:
+            with self._lock:
+                snapshot.add(homework)
+            yield homework
+        self.touch(key)
@@ -0,0 +1,186 @@
+"""Хранилище отправленных статусов и курсоров опроса."""
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple
+
+HomeworkState = Tuple[str, Optional[str]]
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cursors ('
+    ' tenant TEXT PRIMARY KEY,'
+    ' from_date INTEGER NOT NULL)',
+    'CREATE TABLE IF NOT EXISTS homeworks ('
+    ' tenant TEXT NOT NULL,'
+    ' homework_id TEXT NOT NULL,'
+    ' status TEXT NOT NULL,'
+    ' updated TEXT,'
+    ' PRIMARY KEY (tenant, homework_id))',
+    'CREATE TABLE IF NOT EXISTS paused ('
+    ' tenant TEXT PRIMARY KEY)',
+)
+
+
+class MemoryStateStore:
+    """Состояние в памяти процесса; теряется при перезапуске."""
+
+    def __init__(self) -> None:
+        """Создаёт пустое хранилище."""
+        self._cursors: Dict[str, int] = {}
+        self._homeworks: Dict[str, Dict[str, HomeworkState]] = {}
+        self._paused: Set[str] = set()
+
+    def get_cursor(self, tenant: str) -> Optional[int]:
+        """Возвращает сохранённый from_date подписки."""
+        return self._cursors.get(tenant)
+
+    def set_cursor(self, tenant: str, from_date: int) -> None:
+        """Запоминает from_date подписки."""
+        self._cursors[tenant] = from_date
+
+    def get_homeworks(self, tenant: str) -> Dict[str, HomeworkState]:
+        """Возвращает {id работы: (статус, дата обновления)}."""
+        return self._homeworks.setdefault(tenant, {})
+
+    def set_homework(self, tenant: str, homework_id: str, status: str,
+                     updated: Optional[str] = None) -> None:
+        """Запоминает отправленный статус работы."""
+        self.get_homeworks(tenant)[homework_id] = (status, updated)
+
+    def is_paused(self, tenant: str) -> bool:
+        """Приостановлены ли уведомления подписки."""
+        return tenant in self._paused
+
+    def set_paused(self, tenant: str, paused: bool) -> None:
+        """Приостанавливает или возобновляет уведомления подписки."""
+        if paused:
+            self._paused.add(tenant)
+        else:
+            self._paused.discard(tenant)
+
+    def flush(self) -> None:
+        """Сбрасывает накопленные изменения; в памяти сбрасывать нечего."""
+
+    def close(self) -> None:
+        """Освобождает ресурсы хранилища."""
+        self.flush()
+
+
+class SQLiteStateStore(MemoryStateStore):
+    """Состояние в SQLite (WAL) с пакетной записью.
+
+    Чтение ленивое: состояние подписки читается из базы при первом
+    обращении, поэтому старт не зависит от числа подписок. Записи
+    копятся в памяти и уходят одной транзакцией, когда их набралось
+    batch_size или прошло flush_interval секунд.
+    """
+
+    def __init__(self, path: str, batch_size: int = 100,
+                 flush_interval: float = 1.0) -> None:
+        """Открывает базу по пути path и создаёт таблицы."""
+        super().__init__()
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            self._connection.execute(statement)
+        self._connection.commit()
+        self._pending_cursors: Dict[str, int] = {}
+        self._pending_homeworks: Dict[Tuple[str, str], HomeworkState] = {}
+        self._last_flush = time.monotonic()
+
+    def get_cursor(self, tenant: str) -> Optional[int]:
+        """Возвращает сохранённый from_date подписки."""
+        with self._lock:
+            if tenant not in self._cursors:
+                row = self._connection.execute(
+                    'SELECT from_date FROM cursors WHERE tenant = ?',
+                    (tenant,)).fetchone()
+                if row is None:
+                    return None
+                self._cursors[tenant] = row[0]
+            return self._cursors[tenant]
+
+    def set_cursor(self, tenant: str, from_date: int) -> None:
+        """Запоминает from_date подписки."""
+        with self._lock:
+            self._cursors[tenant] = from_date
+            self._pending_cursors[tenant] = from_date
+            self._maybe_flush()
+
+    def get_homeworks(self, tenant: str) -> Dict[str, HomeworkState]:
+        """Возвращает {id работы: (статус, дата обновления)}."""
+        with self._lock:
+            if tenant not in self._homeworks:
+                rows = self._connection.execute(
+                    'SELECT homework_id, status, updated FROM homeworks '
+                    'WHERE tenant = ?', (tenant,))
+                self._homeworks[tenant] = {
+                    homework_id: (status, updated)
+                    for homework_id, status, updated in rows}
+            return self._homeworks[tenant]
+
+    def set_homework(self, tenant: str, homework_id: str, status: str,
+                     updated: Optional[str] = None) -> None:
+        """Запоминает отправленный статус работы."""
+        with self._lock:
+            super().set_homework(tenant, homework_id, status, updated)
+            self._pending_homeworks[tenant, homework_id] = (status, updated)
+            self._maybe_flush()
+
+    def is_paused(self, tenant: str) -> bool:
+        """Приостановлены ли уведомления подписки."""
+        with self._lock:
+            return self._connection.execute(
+                'SELECT 1 FROM paused WHERE tenant = ?',
+                (tenant,)).fetchone() is not None
+
+    def set_paused(self, tenant: str, paused: bool) -> None:
+        """Приостанавливает или возобновляет уведомления; пишет сразу."""
+        with self._lock, self._connection:
+            if paused:
+                self._connection.execute(
+                    'INSERT OR IGNORE INTO paused VALUES (?)', (tenant,))
+            else:
+                self._connection.execute(
+                    'DELETE FROM paused WHERE tenant = ?', (tenant,))
+
+    def _maybe_flush(self) -> None:
+        pending = len(self._pending_cursors) + len(self._pending_homeworks)
+        expired = time.monotonic() - self._last_flush >= self.flush_interval
+        if pending >= self.batch_size or (pending and expired):
+            self.flush()
+
+    def flush(self) -> None:
+        """Записывает накопленные изменения одной транзакцией."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            if not (self._pending_cursors or self._pending_homeworks):
+                return
+            with self._connection:
+                self._connection.executemany(
+                    'INSERT OR REPLACE INTO cursors VALUES (?, ?)',
+                    self._pending_cursors.items())
+                self._connection.executemany(
+                    'INSERT OR REPLACE INTO homeworks VALUES (?, ?, ?, ?)',
+                    ((tenant, homework_id, status, updated)
+                     for (tenant, homework_id), (status, updated)
+                     in self._pending_homeworks.items()))
+            self._pending_cursors.clear()
+            self._pending_homeworks.clear()
+
+    def close(self) -> None:
+        """Сбрасывает изменения и закрывает соединение."""
+        with self._lock:
+            self.flush()
+            self._connection.close()
+
+
+def open_state_store(path: Optional[str]) -> MemoryStateStore:
+    """Открывает SQLite-хранилище по пути или хранилище в памяти."""
+    if path:
+        return SQLiteStateStore(path)
+    return MemoryStateStore()
@@ -0,0 +1,136 @@
+"""Потоковый разбор ответа API: работы отдаются по одной."""
+import codecs
+import json
+from typing import Callable, Iterable, Iterator, Optional
+
+LOG_STREAM_NOT_OBJECT = 'Ответ сервера должен быть JSON-объектом'
+LOG_STREAM_TRUNCATED = 'Ответ сервера оборвался'
+HOMEWORKS_KEY = 'homeworks'
+WHITESPACE = ' \t\n\r'
+CLOSED = '}]"'
+NUMBER_TAIL = '.eE+-0123456789'
+
+decoder = json.JSONDecoder()
+
+
+class HomeworkStream:
+    """Итератор по работам из тела ответа, читаемого кусками.
+
+    В памяти одновременно держится только текущий кусок и разбираемая
+    работа, поэтому пиковая память не зависит от длины истории.
+    Остальные поля ответа (current_date) доступны через get() после
+    того, как итератор исчерпан. Ошибки формата те же, что у
+    check_response: KeyError без ключа homeworks, TypeError для
+    неверных типов.
+    """
+
+    def __init__(self, chunks: Iterable[bytes],
+                 close: Optional[Callable[[], None]] = None) -> None:
+        """Создаёт поток поверх кусков тела chunks."""
+        self._chunks = iter(chunks)
+        self._close = close
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._position = 0
+        self._exhausted = False
+        self.fields = {}
+
+    def get(self, key: str, default: object = None) -> object:
+        """Поле ответа вне списка работ, как у dict.get."""
+        return self.fields.get(key, default)
+
+    def _fill(self) -> bool:
+        """Дочитывает кусок; False — тело закончилось."""
+        if self._exhausted:
+            return False
+        self._buffer = self._buffer[self._position:]
+        self._position = 0
+        for chunk in self._chunks:
+            if chunk:
+                self._buffer += self._decoder.decode(chunk)
+                return True
+        self._buffer += self._decoder.decode(b'', final=True)
+        self._exhausted = True
+        return False
+
+    def _peek(self) -> str:
+        """Следующий значимый символ, не сдвигая позицию."""
+        while True:
+            while (self._position < len(self._buffer)
+                   and self._buffer[self._position] in WHITESPACE):
+                self._position += 1
+            if self._position < len(self._buffer):
+                return self._buffer[self._position]
+            if not self._fill():
+                raise ValueError(LOG_STREAM_TRUNCATED)
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if char not in chars:
+            raise TypeError(LOG_STREAM_NOT_OBJECT)
+        self._position += 1
+        return char
+
+    def _value(self) -> object:
+        """Разбирает одно значение целиком, дочитывая тело при нужде.
+
+        Число в конце буфера может продолжиться в следующем куске,
+        поэтому оно принимается, только когда за ним есть символ, которым
+        число продолжиться не может: "1." или "1e" ещё не конец числа.
+        """
+        self._peek()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            complete = (self._exhausted or self._buffer[end - 1] in CLOSED
+                        or (end < len(self._buffer)
+                            and self._buffer[end] not in NUMBER_TAIL))
+            if complete or not self._fill():
+                self._position = end
+                return value
+
+    def __iter__(self) -> Iterator[dict]:
+        """Отдаёт работы по одной."""
+        try:
+            yield from self._homeworks()
+        finally:
+            if self._close is not None:
+                self._close()
+
+    def _homeworks(self) -> Iterator[dict]:
+        self._expect('{')
+        found = False
+        if self._peek() == '}':
+            self._position += 1
+        else:
+            while True:
+                key = self._value()
+                self._expect(':')
+                if key == HOMEWORKS_KEY:
+                    found = True
+                    yield from self._items()
+                else:
+                    self.fields[key] = self._value()
+                if self._expect(',}') == '}':
+                    break
+        if not found:
+            raise KeyError(HOMEWORKS_KEY)
+
+    def _items(self) -> Iterator[dict]:
+        if self._peek() != '[':
+            raise TypeError(HOMEWORKS_KEY)
+        self._position += 1
+        if self._peek() == ']':
+            self._position += 1
+            return
+        while True:
+            item = self._value()
+            if not isinstance(item, dict):
+                raise TypeError(HOMEWORKS_KEY)
+            yield item
+            if self._expect(',]') == ']':
+                return
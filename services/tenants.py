@@ -0,0 +1,65 @@
+"""Подписки студентов: пары (токен Практикума, чат Telegram)."""
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import List, Optional
+
+from services.messages import TEXT, parse_mode
+
+LOG_TENANTS_NOT_LIST = 'Файл подписок должен содержать список: '
+LOG_TENANT_KEY_ERROR = 'В подписке не найден ключ: '
+
+TENANT_KEYS = ('practicum_token', 'chat_id')
+
+
+@dataclass
+class Tenant:
+    """Подписка одного студента и её состояние между опросами."""
+
+    practicum_token: str
+    chat_id: str
+    from_date: Optional[int] = None
+    idle_polls: int = 0
+    failures: int = 0
+    locale: Optional[str] = None
+    message_format: str = TEXT
+    paused: Optional[bool] = None
+
+    @property
+    def parse_mode(self) -> Optional[str]:
+        """parse_mode для сообщений подписки."""
+        return parse_mode(self.message_format)
+
+    @property
+    def key(self) -> str:
+        """Стабильный ключ подписки для хранилища без токена в открытую."""
+        raw = f'{self.practicum_token}:{self.chat_id}'.encode()
+        return hashlib.sha256(raw).hexdigest()[:16]
+
+    def __repr__(self) -> str:
+        """Не выводит токен в логи."""
+        return f'Tenant(chat_id={self.chat_id!r})'
+
+
+def load_tenants(path: str) -> List[Tenant]:
+    """Загружает список подписок из JSON-файла.
+
+    Формат файла: [{"practicum_token": "...", "chat_id": "..."}, ...];
+    необязательные ключи locale (ru, en) и format (text, html, markdown).
+    """
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    if not isinstance(data, list):
+        raise TypeError(LOG_TENANTS_NOT_LIST + path)
+    tenants = []
+    for item in data:
+        for key in TENANT_KEYS:
+            if key not in item:
+                raise KeyError(LOG_TENANT_KEY_ERROR + key)
+        tenant = Tenant(practicum_token=item['practicum_token'],
+                        chat_id=str(item['chat_id']),
+                        locale=item.get('locale'),
+                        message_format=item.get('format', TEXT))
+        parse_mode(tenant.message_format)
+        tenants.append(tenant)
+    return tenants
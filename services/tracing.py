@@ -0,0 +1,180 @@
+"""Трассировка циклов опроса спанами в модели OpenTelemetry.
+
+Спан — именованный отрезок работы с началом, концом, атрибутами и
+статусом; спаны одного цикла опроса связаны общим trace_id и ссылкой
+на родителя. Текущий спан хранится в contextvars, поэтому вложенность
+сохраняется и в потоках, и в задачах asyncio. По умолчанию работает
+NoopTracer, который ничего не создаёт и не пишет.
+"""
+import contextvars
+import json
+import random
+import threading
+import time
+from typing import Callable, List, Optional
+
+OK = 'OK'
+ERROR = 'ERROR'
+
+Exporter = Callable[['Span'], None]
+
+current_span: contextvars.ContextVar[Optional['Span']] = (
+    contextvars.ContextVar('current_span', default=None))
+
+
+class NoopSpan:
+    """Спан, который ничего не записывает."""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: object) -> None:
+        """Ничего не делает."""
+
+    def record_error(self, error: BaseException) -> None:
+        """Ничего не делает."""
+
+    def __enter__(self) -> 'NoopSpan':
+        """Возвращает сам спан."""
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Ничего не делает."""
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class NoopTracer:
+    """Трассировка выключена: спаны не создаются."""
+
+    def span(self, name: str,
+             attributes: Optional[dict] = None) -> NoopSpan:
+        """Возвращает общий пустой спан."""
+        return NOOP_SPAN
+
+    def close(self) -> None:
+        """Ничего не делает."""
+
+
+class Span(NoopSpan):
+    """Отрезок работы; при выходе из with уходит в экспортёр."""
+
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'attributes',
+                 'status', 'message', 'start', 'end', '_exporter', '_token')
+
+    def __init__(self, name: str, exporter: Exporter,
+                 attributes: Optional[dict] = None) -> None:
+        """Создаёт спан, дочерний к текущему, если он есть."""
+        parent = current_span.get()
+        self.name = name
+        self.trace_id = (parent.trace_id if parent is not None
+                         else f'{random.getrandbits(128):032x}')
+        self.span_id = f'{random.getrandbits(64):016x}'
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = dict(attributes or {})
+        self.status = OK
+        self.message = None
+        self.start = self.end = 0
+        self._exporter = exporter
+        self._token = None
+
+    def set_attribute(self, key: str, value: object) -> None:
+        """Добавляет атрибут спана."""
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        """Отмечает спан ошибкой error."""
+        self.status = ERROR
+        self.message = type(error).__name__
+        self.attributes['exception.type'] = type(error).__name__
+
+    def __enter__(self) -> 'Span':
+        """Делает спан текущим и засекает начало."""
+        self._token = current_span.set(self)
+        self.start = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type: object, error: Optional[BaseException],
+                 traceback: object) -> None:
+        """Засекает конец, отмечает исключение и экспортирует спан."""
+        self.end = time.time_ns()
+        current_span.reset(self._token)
+        if error is not None:
+            self.record_error(error)
+        self._exporter(self)
+
+    def to_dict(self) -> dict:
+        """Спан в виде словаря с полями OpenTelemetry."""
+        status = {'code': self.status}
+        if self.message is not None:
+            status['message'] = self.message
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_id,
+            'start_time_unix_nano': self.start,
+            'end_time_unix_nano': self.end,
+            'attributes': self.attributes,
+            'status': status,
+        }
+
+
+class Tracer(NoopTracer):
+    """Создаёт спаны и отдаёт завершённые экспортёру."""
+
+    def __init__(self, exporter: Exporter) -> None:
+        """Создаёт трассировщик с экспортёром exporter."""
+        self.exporter = exporter
+
+    def span(self, name: str, attributes: Optional[dict] = None) -> Span:
+        """Новый спан для with, дочерний к текущему."""
+        return Span(name, self.exporter, attributes)
+
+    def close(self) -> None:
+        """Закрывает экспортёр, если его есть что закрывать."""
+        close = getattr(self.exporter, 'close', None)
+        if close is not None:
+            close()
+
+
+class MemoryExporter:
+    """Копит завершённые спаны в памяти вместо коллектора."""
+
+    def __init__(self) -> None:
+        """Создаёт пустой список спанов."""
+        self.spans: List[Span] = []
+
+    def __call__(self, span: Span) -> None:
+        """Запоминает спан."""
+        self.spans.append(span)
+
+
+class FileExporter:
+    """Дописывает спаны в файл, по одному JSON на строку.
+
+    Файл открывается при первом спане в режиме дозаписи с построчной
+    буферизацией, поэтому несколько процессов могут писать в один файл.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Запоминает путь к файлу спанов."""
+        self.path = path
+        self._file = None
+        self._lock = threading.Lock()
+
+    def __call__(self, span: Span) -> None:
+        """Записывает спан строкой JSON."""
+        line = json.dumps(span.to_dict(), ensure_ascii=False)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'a', encoding='utf-8',
+                                  buffering=1)
+            self._file.write(line + '\n')
+
+    def close(self) -> None:
+        """Закрывает файл."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -1,8 +1,12 @@
+import os
 import sys
-from os.path import abspath, dirname
+import tempfile
+from os.path import abspath, dirname, join
 
 root_dir = dirname(dirname(abspath(__file__)))
 sys.path.append(root_dir)
+os.environ.setdefault('LOG_FILE',
+                      join(tempfile.gettempdir(), 'homework-tests.log'))
 
 pytest_plugins = [
     'tests.fixtures.fixture_data'
@@ -1,8 +1,75 @@
+import json
 import random
+import threading
+import time
 from datetime import datetime
+from http import HTTPStatus
 
 import pytest
 
+EMPTY_RESPONSE = {'homeworks': [], 'current_date': 1}
+
+
+class MockBot:
+
+    def __init__(self):
+        self.sent = []
+        self.options = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+        self.options.append(kwargs)
+
+
+class MockApi:
+
+    def __init__(self, homeworks=(), current_date=1, delay=0):
+        self.homeworks = list(homeworks)
+        self.current_date = current_date
+        self.delay = delay
+        self.calls = []
+        self.active = self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, token, current_timestamp):
+        with self._lock:
+            self.calls.append((token, current_timestamp))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        return {'homeworks': [dict(homework) for homework in self.homeworks],
+                'current_date': self.current_date}
+
+    @property
+    def tokens(self):
+        return [token for token, _ in self.calls]
+
+    @property
+    def from_dates(self):
+        return [from_date for _, from_date in self.calls]
+
+
+class Clock:
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class MockResponse:
+
+    def __init__(self, body=None, status_code=HTTPStatus.OK, headers=None):
+        self.text = json.dumps(EMPTY_RESPONSE if body is None else body)
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.text)
+
 
 @pytest.fixture
 def random_timestamp():
@@ -19,3 +86,22 @@ def current_timestamp():
 @pytest.fixture
 def api_url():
     return 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
+
+
+@pytest.fixture
+def memory_state(monkeypatch):
+    import homework
+    from services.state import MemoryStateStore
+
+    store = MemoryStateStore()
+    monkeypatch.setattr(homework, 'state_store', store)
+    return store
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    import homework
+
+    api = MockApi()
+    monkeypatch.setattr(homework, 'request_homeworks', api)
+    return api
@@ -0,0 +1,107 @@
+import logging
+
+import pytest
+
+import homework
+from services.alerts import GLOBAL_SCOPE, ErrorAggregator, fingerprint
+from services.http import ApiResponseError
+from services.tenants import Tenant
+from tests.fixtures.fixture_data import Clock, MockBot
+
+
+@pytest.fixture
+def alerts(monkeypatch):
+    clock = Clock()
+    alerts = ErrorAggregator(window=60, summary_interval=600, clock=clock)
+    alerts.clock = clock
+    monkeypatch.setattr(homework, 'error_alerts', alerts)
+    monkeypatch.setattr(homework, 'outbox', None)
+    return alerts
+
+
+class TestErrorAggregator:
+
+    def test_fingerprint(self):
+        error = ApiResponseError('Ошибка', 502)
+        assert fingerprint(error, 'url') == 'ApiResponseError:url:502'
+        assert fingerprint(TimeoutError(), 'url') == 'TimeoutError:url'
+
+    def test_window(self, alerts):
+        assert alerts.record('t', 'timeout')
+        assert alerts.record('t', '502'), (
+            'О сбое с другим отпечатком сообщается сразу'
+        )
+        for _ in range(5):
+            assert not alerts.record('t', 'timeout')
+            assert not alerts.record('t', '502')
+        alerts.clock.now = 61
+        assert alerts.record('t', 'timeout'), (
+            'После окна о повторе сбоя сообщается снова'
+        )
+
+    def test_summaries(self, alerts):
+        alerts.record('t', 'timeout', target='chat')
+        alerts.record('t', 'timeout', target='chat')
+        alerts.record('t', 'timeout', target='chat')
+        assert alerts.summaries() == []
+        alerts.clock.now = 600
+        assert alerts.summaries() == [('chat', 2)]
+        alerts.clock.now = 1200
+        assert alerts.summaries() == [], (
+            'Сводка без новых повторов не отправляется'
+        )
+
+    def test_resolve_reopens_window(self, alerts):
+        alerts.record('t', 'timeout')
+        alerts.record('t', 'timeout')
+        alerts.resolve('t')
+        assert alerts.record('t', 'timeout'), (
+            'После успешного опроса о новом сбое сообщается сразу'
+        )
+        alerts.clock.now = 600
+        assert alerts.summaries() == [(None, 1)]
+
+
+class TestNotifyError:
+
+    def test_outage_does_not_fan_out(self, monkeypatch, alerts):
+        monkeypatch.setattr(homework, 'ERRORS_CHAT_ID', 'ops')
+        bot = MockBot()
+        tenants = [Tenant(f'token{number}', str(number))
+                   for number in range(100)]
+        for tenant in tenants:
+            homework.notify_error(bot, tenant, ApiResponseError('Сбой', 502))
+            homework.notify_error(bot, tenant, ConnectionError('Таймаут'))
+        assert [chat_id for chat_id, _ in bot.sent] == ['ops', 'ops'], (
+            'Недоступность API не должна рассылаться каждой подписке'
+        )
+        alerts.clock.now = 600
+        homework.send_error_summaries(bot)
+        assert bot.sent[-1] == (
+            'ops', 'Повторных сбоев за последние 10 мин.: 198')
+
+    def test_tenant_error_goes_to_tenant(self, alerts):
+        bot = MockBot()
+        tenant = Tenant('token', '7')
+        for _ in range(3):
+            homework.notify_error(bot, tenant, ApiResponseError('Сбой', 401))
+        assert [chat_id for chat_id, _ in bot.sent] == ['7']
+        assert GLOBAL_SCOPE not in alerts._scopes
+
+    def test_traceback_logged_outside_except(self, alerts):
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        try:
+            raise ApiResponseError('Сбой', 401)
+        except ApiResponseError as caught:
+            error = caught
+        homework.logger.addHandler(handler)
+        try:
+            homework.notify_error(MockBot(), Tenant('token', '7'), error)
+        finally:
+            homework.logger.removeHandler(handler)
+        assert records[0].exc_info[1] is error, (
+            'Трассировка сбоя должна логироваться и вне блока except, '
+            'например в пуле потоков'
+        )
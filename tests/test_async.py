@@ -0,0 +1,30 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import homework
+from services.tenants import Tenant
+from tests.fixtures.fixture_data import MockBot
+
+
+class TestAsyncPolling:
+
+    def test_polls_run_concurrently(self, mock_api, memory_state):
+        mock_api.homeworks = [{'homework_name': 'hw', 'status': 'approved'}]
+        mock_api.delay = 0.05
+        bot = MockBot()
+        tenants = [Tenant(f'token{i}', str(i)) for i in range(4)]
+
+        async def poll_all():
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                await asyncio.gather(*(
+                    homework.poll_tenant_async(executor, bot, tenant)
+                    for tenant in tenants))
+
+        asyncio.run(poll_all())
+        assert mock_api.peak > 1, (
+            'Проверьте, что запросы к API выполняются конкурентно'
+        )
+        assert sorted(chat_id for chat_id, _ in bot.sent) == [
+            '0', '1', '2', '3']
+        assert all(memory_state.get_homeworks(tenant.key)
+                   for tenant in tenants)
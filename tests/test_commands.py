@@ -0,0 +1,96 @@
+import threading
+
+import pytest
+
+import homework
+from services.singleflight import SingleFlight
+from services.snapshots import SnapshotCache
+from services.tenants import Tenant
+from tests.fixtures.fixture_data import Clock, MockBot
+
+HOMEWORKS = [
+    {'id': 1, 'homework_name': 'first', 'status': 'approved',
+     'date_updated': '2022-01-01T00:00:00Z'},
+    {'id': 2, 'homework_name': 'second', 'status': 'reviewing',
+     'date_updated': '2022-02-01T00:00:00Z'},
+]
+
+
+@pytest.fixture
+def commands(monkeypatch, mock_api, memory_state):
+    clock = Clock()
+    monkeypatch.setattr(homework, 'status_cache', SnapshotCache(60, clock))
+    monkeypatch.setattr(homework, 'status_refreshes', SingleFlight())
+    monkeypatch.setattr(homework, 'subscriptions', {})
+    monkeypatch.setattr(homework, 'outbox', None)
+    mock_api.homeworks = HOMEWORKS
+    mock_api.current_date = 100
+    mock_api.delay = 0.05
+    tenant = Tenant('token', '1', from_date=1)
+    homework.subscriptions['1'] = [tenant]
+    return tenant, clock, mock_api.calls
+
+
+class TestCommands:
+
+    def test_status_uses_cache(self, commands):
+        tenant, clock, requests = commands
+        text, parse_mode = homework.answer_command('1', 'status')
+        assert text.splitlines() == [
+            'Работа "second": ' + homework.VERDICTS['reviewing'],
+            'Работа "first": ' + homework.VERDICTS['approved'],
+        ]
+        assert parse_mode is None
+        homework.answer_command('1', 'status')
+        assert len(requests) == 1, (
+            'Свежий кеш отвечает на /status без запроса к API'
+        )
+
+    def test_polls_keep_snapshot_fresh(self, commands, mock_api):
+        tenant, clock, requests = commands
+        homework.answer_command('1', 'status')
+        clock.now = 50
+        mock_api.homeworks = [dict(HOMEWORKS[1], status='approved')]
+        mock_api.current_date = 200
+        homework.poll_tenant(MockBot(), tenant)
+        clock.now = 100
+        text, _ = homework.answer_command('1', 'status')
+        assert len(requests) == 2, (
+            'Опрос должен обновлять снимок, продлевая его свежесть'
+        )
+        assert homework.VERDICTS['reviewing'] not in text, (
+            'После опроса /status показывает новый статус работы'
+        )
+        assert text.count(homework.VERDICTS['approved']) == 2
+
+    def test_stale_cache_refreshes_once(self, commands):
+        tenant, clock, requests = commands
+        answers = []
+        threads = [threading.Thread(target=lambda: answers.append(
+            homework.answer_command('1', 'status'))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(requests) == 1, (
+            'Одновременные /status делят один запрос к API'
+        )
+        assert len(set(answers)) == 1
+        clock.now = 61
+        homework.answer_command('1', 'status')
+        assert len(requests) == 2, 'Устаревший снимок запрашивается заново'
+
+    def test_pause_and_subscribe(self, commands, memory_state):
+        tenant, clock, requests = commands
+        text, _ = homework.answer_command('1', 'pause')
+        assert '/subscribe' in text
+        assert memory_state.is_paused(tenant.key)
+        homework.poll_tenant(MockBot(), tenant)
+        assert requests == [], 'Приостановленная подписка не опрашивается'
+        homework.answer_command('1', 'subscribe')
+        assert not memory_state.is_paused(tenant.key)
+        assert not homework.tenant_paused(tenant)
+
+    def test_unknown_chat(self, commands):
+        text, _ = homework.answer_command('2', 'status')
+        assert text == homework.CATALOGS['ru'].replies['unknown']
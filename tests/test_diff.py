@@ -0,0 +1,29 @@
+from services.diff import diff_statuses, homework_id
+
+
+class TestDiffStatuses:
+
+    def test_new_and_changed_only(self):
+        known = {'1': ('reviewing', None), '2': ('approved', None)}
+        homeworks = [
+            {'id': 1, 'status': 'approved'},
+            {'id': 2, 'status': 'approved'},
+            {'id': 3, 'status': 'reviewing'},
+        ]
+        changes = list(diff_statuses(known, homeworks))
+        assert [(c.homework_id, c.previous, c.status) for c in changes] == [
+            ('1', 'reviewing', 'approved'),
+            ('3', None, 'reviewing'),
+        ], 'Отдаются только новые работы и смены статуса'
+
+    def test_duplicates_collapse_to_latest(self):
+        homeworks = [
+            {'id': 1, 'status': 'reviewing'},
+            {'id': 1, 'status': 'rejected'},
+        ]
+        changes = list(diff_statuses({}, homeworks))
+        assert [c.status for c in changes] == ['rejected']
+
+    def test_homework_id_falls_back_to_name(self):
+        assert homework_id({'homework_name': 'hw'}) == 'hw'
+        assert homework_id({'id': 5, 'homework_name': 'hw'}) == '5'
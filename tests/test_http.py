@@ -0,0 +1,87 @@
+import json
+from http import HTTPStatus
+
+import homework
+from services.http import ResponseCache, body_digest, pooled_session
+from services.tenants import Tenant
+from tests.fixtures.fixture_data import MockResponse
+
+
+class MockSession:
+
+    def __init__(self):
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(kwargs)
+        return MockResponse()
+
+
+class TestPooledSession:
+
+    def test_pool_size(self):
+        session = pooled_session(7)
+        adapter = session.get_adapter(homework.ENDPOINT)
+        assert adapter._pool_maxsize == 7
+        assert adapter._pool_block
+
+    def test_request_uses_session_and_timeouts(self, monkeypatch):
+        mock_session = MockSession()
+        monkeypatch.setattr(homework, 'session', mock_session)
+        homework.request_homeworks('token', 100)
+        homework.request_homeworks('token', 200)
+        assert len(mock_session.calls) == 2, (
+            'Проверьте, что запросы идут через общую сессию'
+        )
+        assert mock_session.calls[0]['timeout'] == (
+            homework.CONNECT_TIMEOUT, homework.READ_TIMEOUT)
+
+
+class MockRawResponse:
+
+    def __init__(self, body, status_code=HTTPStatus.OK, headers=None):
+        self.content = body
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class TestResponseCache:
+
+    def test_body_digest_ignores_current_date(self):
+        first = body_digest(b'{"homeworks": [], "current_date": 100}')
+        second = body_digest(b'{"homeworks": [], "current_date": 200}')
+        assert first[0] == second[0]
+        assert (first[1], second[1]) == (100, 200)
+
+    def test_request_changes_skips_unchanged_body(self, monkeypatch,
+                                                 memory_state):
+        bodies = [b'{"homeworks": [], "current_date": 1000}',
+                  b'{"homeworks": [], "current_date": 2000}']
+        calls = []
+
+        class MockSession:
+            def get(self, url, headers=None, **kwargs):
+                calls.append(headers)
+                return MockRawResponse(bodies[len(calls) - 1],
+                                       headers={'ETag': '"v1"'})
+
+        monkeypatch.setattr(homework, 'session', MockSession())
+        monkeypatch.setattr(homework, 'response_cache', ResponseCache())
+        tenant = Tenant('token', '1', from_date=500)
+        assert homework.request_changes(tenant) == {
+            'homeworks': [], 'current_date': 1000}
+        assert homework.request_changes(tenant) is None, (
+            'Не изменившийся ответ не разбирается повторно'
+        )
+        assert calls[1]['If-None-Match'] == '"v1"'
+        assert tenant.from_date == 2000 - homework.CURSOR_OVERLAP, (
+            'Курсор сдвигается и без разбора ответа'
+        )
+
+    def test_not_modified(self):
+        cache = ResponseCache()
+        response = MockRawResponse(b'', HTTPStatus.NOT_MODIFIED)
+        assert cache.unchanged('key', response) == (True, None)
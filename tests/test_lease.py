@@ -0,0 +1,95 @@
+import threading
+
+import pytest
+
+import homework
+from services.lease import LeaseKeeper, LeaseLost, SQLiteLease
+from services.outbox import Outbox
+from tests.fixtures.fixture_data import Clock
+
+
+class TestSQLiteLease:
+
+    def test_single_owner_and_takeover(self, tmp_path):
+        path = str(tmp_path / 'lease.db')
+        clock = Clock(1000.0)
+        first = SQLiteLease(path, 'poller', 'first', ttl=30, clock=clock)
+        second = SQLiteLease(path, 'poller', 'second', ttl=30, clock=clock)
+        assert first.acquire()
+        assert not second.acquire(), (
+            'Пока аренда действует, второй процесс её не получает'
+        )
+        clock.now += 20
+        assert first.acquire()
+        clock.now += 20
+        assert not second.acquire(), 'Продление сдвигает срок аренды'
+        clock.now += 11
+        assert second.acquire(), 'Просроченную аренду можно перехватить'
+        assert second.current_owner() == 'second'
+        assert not first.acquire()
+
+    def test_release(self, tmp_path):
+        path = str(tmp_path / 'lease.db')
+        first = SQLiteLease(path, 'poller', 'first')
+        second = SQLiteLease(path, 'poller', 'second')
+        assert first.acquire()
+        first.release()
+        assert second.acquire()
+
+
+class TestLeaseKeeper:
+
+    def test_lost_lease_stops_polling(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'lease.db')
+        clock = Clock(1000.0)
+        keeper = LeaseKeeper(SQLiteLease(path, 'poller', 'first', ttl=30,
+                                         clock=clock), interval=0.01)
+        keeper.wait_acquire()
+        monkeypatch.setattr(homework, 'lease_keeper', keeper)
+        homework.check_lease()
+
+        clock.now += 31
+        SQLiteLease(path, 'poller', 'second', clock=clock).acquire()
+        keeper._heartbeat()
+        with pytest.raises(LeaseLost):
+            homework.check_lease()
+        keeper.stop()
+
+    def test_lost_lease_abandons_outbox(self, tmp_path, monkeypatch,
+                                        memory_state):
+        path = str(tmp_path / 'lease.db')
+        clock = Clock(1000.0)
+        keeper = LeaseKeeper(SQLiteLease(path, 'poller', 'first', ttl=30,
+                                         clock=clock), interval=0.01,
+                             on_lost=homework.abandon_outbox)
+        keeper.wait_acquire()
+        sending, release = threading.Event(), threading.Event()
+
+        def send(chat_id, text):
+            sending.set()
+            release.wait(5)
+
+        outbox = Outbox(send, workers=1).start()
+        dropped = []
+        for number in range(3):
+            outbox.put(str(number), 'msg',
+                       on_dropped=lambda n=number: dropped.append(n))
+        assert sending.wait(2)
+        monkeypatch.setattr(homework, 'outbox', outbox)
+        monkeypatch.setattr(homework, 'lease_keeper', keeper)
+
+        clock.now += 31
+        SQLiteLease(path, 'poller', 'second', clock=clock).acquire()
+        keeper._heartbeat()
+        assert keeper.lost
+        assert sorted(dropped) == [1, 2], (
+            'После потери аренды очередь не досылается, курсоры '
+            'неотправленных уведомлений откатываются'
+        )
+        outbox.put('4', 'late', on_dropped=lambda: dropped.append(4))
+        assert dropped[-1] == 4, (
+            'После потери аренды новые уведомления не ставятся в очередь'
+        )
+        release.set()
+        homework.drain()
+        assert len(outbox) == 0
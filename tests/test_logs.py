@@ -0,0 +1,58 @@
+import json
+import logging
+import queue
+
+from services.logs import (DroppingQueueHandler, JsonFormatter,
+                           start_queue_logging)
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(self.format(record))
+
+
+class TestQueueLogging:
+
+    def test_records_written_by_listener(self):
+        logger = logging.getLogger('tests.queue_logging')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        target = ListHandler()
+        target.setFormatter(JsonFormatter())
+        listener = start_queue_logging([logger], target)
+        logger.info('статус: %s', 'approved')
+        listener.stop()
+        record = json.loads(target.records[0])
+        assert record['message'] == 'статус: approved'
+        assert record['level'] == 'INFO'
+
+    def test_listener_starts_on_first_record(self):
+        logger = logging.getLogger('tests.lazy_listener')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        listener = start_queue_logging([logger], ListHandler())
+        assert listener._thread is None, (
+            'Поток listener не должен запускаться до первой записи'
+        )
+        logger.info('первая запись')
+        assert listener._thread is not None, (
+            'Первая запись должна запустить поток listener'
+        )
+        listener.stop()
+        listener.stop()
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        handler = DroppingQueueHandler(queue.Queue(1))
+        record = logging.LogRecord('x', logging.INFO, __file__, 1,
+                                   'msg %s', ('arg',), None)
+        handler.handle(record)
+        handler.handle(record)
+        assert handler.dropped == 1
+        assert handler.queue.get_nowait().args == ('arg',), (
+            'Запись форматируется в потоке listener, а не в вызывающем'
+        )
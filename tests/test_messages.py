@@ -0,0 +1,62 @@
+import pytest
+
+import homework
+from services.messages import HTML, MARKDOWN, Catalog, Renderer
+from services.tenants import Tenant
+from tests.fixtures.fixture_data import MockBot
+
+HOMEWORK = {'id': 1, 'homework_name': 'a<b>_c.', 'status': 'approved'}
+
+
+class TestRenderer:
+
+    def test_text_matches_parse_status(self):
+        assert homework.render_status(HOMEWORK) == (
+            'Изменился статус проверки работы "a<b>_c.". '
+            + homework.VERDICTS['approved'])
+
+    def test_template_compiled_once(self):
+        renderer = Renderer(homework.CATALOGS, 'ru')
+        for name in range(100):
+            renderer.status(name, 'approved', 'en')
+        info = renderer.status_template.cache_info()
+        assert (info.misses, info.hits) == (1, 99), (
+            'Шаблон должен собираться один раз на (язык, статус, формат)'
+        )
+
+    def test_formats_escape_name_and_text(self):
+        renderer = Renderer({'ru': Catalog('"{name}" - {verdict}',
+                                           {'ok': 'да!'}, '{error}',
+                                           '{count}', '{name}',
+                                           {})}, 'ru')
+        assert renderer.status('<b>', 'ok', message_format=HTML) == (
+            '"&lt;b&gt;" - да!')
+        assert renderer.status('a_b', 'ok', message_format=MARKDOWN) == (
+            '"a\\_b" \\- да\\!')
+
+    def test_unknown_locale_falls_back(self):
+        assert homework.renderer.status('x', 'reviewing', 'de') == (
+            homework.renderer.status('x', 'reviewing', 'ru'))
+
+    def test_unknown_status_and_format(self):
+        with pytest.raises(KeyError):
+            homework.renderer.status('x', 'unknown')
+        with pytest.raises(ValueError):
+            homework.renderer.status('x', 'approved', message_format='rtf')
+
+
+class TestTenantLanguage:
+
+    def test_poll_renders_tenant_locale_and_format(self, mock_api,
+                                                   memory_state):
+        mock_api.homeworks = [HOMEWORK]
+        tenant = Tenant('token', '7', from_date=1, locale='en',
+                        message_format=HTML)
+        bot = MockBot()
+        homework.poll_tenant(bot, tenant)
+        assert bot.sent == [('7', 'Homework "a&lt;b&gt;_c." review status '
+                             'changed. ' + homework.CATALOGS['en'].verdicts[
+                                 'approved'])]
+        assert bot.options[0]['parse_mode'] == 'HTML', (
+            'Сообщение отрисовывается на языке и в разметке подписки'
+        )
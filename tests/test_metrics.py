@@ -0,0 +1,61 @@
+from http import HTTPStatus
+from urllib.request import urlopen
+
+import homework
+from services.diff import parse_updated
+from services.metrics import Registry, serve_metrics
+from tests.fixtures.fixture_data import MockResponse
+
+
+class TestRegistry:
+
+    def test_render(self):
+        registry = Registry()
+        counter = registry.counter('polls', 'Опросы.')
+        histogram = registry.histogram('latency_seconds', 'Задержка.',
+                                       buckets=(0.1, 1))
+        registry.gauge('depth', 'Очередь.', lambda: 3)
+        counter.inc(code='200')
+        counter.inc(code='200')
+        histogram.observe(0.05)
+        histogram.observe(5)
+        text = registry.render()
+        assert 'polls_total{code="200"} 2' in text
+        assert 'latency_seconds_bucket{le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{le="1"} 1' in text
+        assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+        assert 'latency_seconds_count 2' in text
+        assert 'depth 3' in text
+
+    def test_serve_metrics(self):
+        registry = Registry()
+        registry.counter('polls', 'Опросы.').inc()
+        server = serve_metrics(registry, port=0)
+        try:
+            port = server.server_address[1]
+            with urlopen(f'http://127.0.0.1:{port}/metrics') as response:
+                assert response.status == HTTPStatus.OK
+                assert 'polls_total 1' in response.read().decode()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestInstrumentation:
+
+    def test_request_homeworks_counts_polls(self, monkeypatch):
+        class MockSession:
+            def get(self, url, **kwargs):
+                return MockResponse()
+
+        monkeypatch.setattr(homework, 'session', MockSession())
+        before = homework.polls_total.value(code='200')
+        observed = homework.api_latency.count
+        homework.request_homeworks('token', 1)
+        assert homework.polls_total.value(code='200') == before + 1
+        assert homework.api_latency.count == observed + 1
+
+    def test_parse_updated(self):
+        assert parse_updated('1970-01-01T00:01:00Z') == 60
+        assert parse_updated(None) is None
+        assert parse_updated('вчера') is None
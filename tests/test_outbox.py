@@ -0,0 +1,206 @@
+import threading
+import time
+
+import telegram
+
+import homework
+from services.outbox import Outbox, TokenBucket
+from services.tenants import Tenant
+
+
+class RetryAfter(Exception):
+
+    def __init__(self, retry_after):
+        super().__init__(f'Retry in {retry_after}')
+        self.retry_after = retry_after
+
+
+class Recorder:
+
+    def __init__(self, fail_first=None):
+        self.sent = []
+        self.fail_first = fail_first
+        self.event = threading.Event()
+
+    def __call__(self, chat_id, text):
+        if self.fail_first is not None:
+            error, self.fail_first = self.fail_first, None
+            raise error
+        self.sent.append((time.monotonic(), chat_id, text))
+        self.event.set()
+
+
+class BlockedBot:
+
+    def __init__(self):
+        self.calls = 0
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.calls += 1
+        raise telegram.error.Unauthorized(
+            'Forbidden: bot was blocked by the user')
+
+
+class TestTokenBucket:
+
+    def test_rate(self):
+        bucket = TokenBucket(rate=2, capacity=1, now=0)
+        assert bucket.wait_time(0) == 0
+        bucket.take()
+        assert bucket.wait_time(0) == 0.5
+        assert bucket.wait_time(0.5) == 0
+
+
+class TestOutbox:
+
+    def test_coalesces_messages_for_one_chat(self):
+        send = Recorder()
+        outbox = Outbox(send, workers=1)
+        sent = []
+        for number in range(3):
+            outbox.put('1', f'msg{number}', on_sent=lambda n=number:
+                       sent.append(n))
+        outbox.start()
+        outbox.stop(timeout=2)
+        assert [text for _, _, text in send.sent] == [
+            'msg0\n\nmsg1\n\nmsg2'], (
+            'Несколько сообщений одному чату склеиваются в одно'
+        )
+        assert sent == [0, 1, 2]
+
+    def test_parse_modes_are_not_coalesced(self):
+        sent = []
+        outbox = Outbox(lambda chat_id, text, parse_mode=None: sent.append(
+            (text, parse_mode)), workers=1)
+        outbox.put('1', 'a', parse_mode='HTML')
+        outbox.put('1', 'b', parse_mode='HTML')
+        outbox.put('1', 'c')
+        outbox.start()
+        outbox.stop(timeout=2)
+        assert sent == [('a\n\nb', 'HTML'), ('c', None)], (
+            'Сообщения с разной разметкой не склеиваются'
+        )
+
+    def test_duplicate_key_is_ignored(self):
+        outbox = Outbox(Recorder())
+        assert outbox.put('1', 'msg', key='k')
+        assert not outbox.put('1', 'msg', key='k')
+        assert len(outbox) == 1
+
+    def test_retry_after_is_honoured(self):
+        send = Recorder(fail_first=RetryAfter(0.2))
+        outbox = Outbox(send, workers=1).start()
+        started = time.monotonic()
+        outbox.put('1', 'msg')
+        assert send.event.wait(2)
+        outbox.stop(timeout=1)
+        assert send.sent[0][0] - started >= 0.2
+
+    def test_chat_rate_limit(self):
+        send = Recorder()
+        outbox = Outbox(send, chat_rate=10, chat_burst=1, workers=2).start()
+        for number in range(3):
+            outbox.put('1', 'x' * 3000)
+        outbox.stop(timeout=2)
+        times = [moment for moment, _, _ in send.sent]
+        assert len(times) == 3
+        assert times[-1] - times[0] >= 0.15, (
+            'Частота отправки в один чат ограничена'
+        )
+
+    def test_failing_callback_keeps_worker(self):
+        send = Recorder()
+        outbox = Outbox(send, workers=1).start()
+
+        def fail():
+            raise RuntimeError('database is locked')
+
+        outbox.put('1', 'first', key='first', on_sent=fail)
+        assert send.event.wait(2)
+        send.event.clear()
+        outbox.put('1', 'second', key='second')
+        assert send.event.wait(2), (
+            'Сбой обработчика on_sent не должен останавливать отправку'
+        )
+        assert outbox.put('1', 'first', key='first'), (
+            'Ключ сообщения должен освобождаться и после сбоя обработчика'
+        )
+        assert outbox.stop(timeout=2) == 0
+
+    def test_permanent_error_is_not_retried(self):
+        send = Recorder(fail_first=PermissionError('blocked'))
+        outbox = Outbox(send, workers=1, permanent_errors=(PermissionError,))
+        rejected, dropped = [], []
+        outbox.put('1', 'text', key='key',
+                   on_rejected=lambda: rejected.append(True),
+                   on_dropped=lambda: dropped.append(True))
+        outbox.start()
+        assert outbox.stop(timeout=2) == 0
+        assert rejected == [True] and dropped == [], (
+            'Постоянная ошибка не повторяется и не откатывает курсор'
+        )
+        assert send.sent == []
+
+    def test_unexpected_error_releases_chat(self, monkeypatch):
+        send = Recorder()
+        outbox = Outbox(send, workers=1)
+        deliver = outbox._deliver
+        calls = []
+
+        def flaky(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise RuntimeError('Сбой')
+            deliver(*args)
+
+        monkeypatch.setattr(outbox, '_deliver', flaky)
+        outbox.put('1', 'x' * 3000, key='lost')
+        outbox.put('1', 'y' * 3000)
+        outbox.start()
+        assert send.event.wait(2), (
+            'После сбоя пакета чат должен снова попадать в очередь'
+        )
+        assert outbox.stop(timeout=2) == 0
+        assert [text[0] for _, _, text in send.sent] == ['y']
+
+
+class TestNotifyThroughOutbox:
+
+    def test_status_marked_after_send(self, monkeypatch, mock_api,
+                                      memory_state):
+        send = Recorder()
+        outbox = Outbox(send, workers=1)
+        monkeypatch.setattr(homework, 'outbox', outbox)
+        mock_api.homeworks = [
+            {'id': 1, 'homework_name': 'hw', 'status': 'approved'}]
+        tenant = Tenant('token', '1')
+        homework.poll_tenant(None, tenant)
+        homework.poll_tenant(None, tenant)
+        assert len(outbox) == 1, (
+            'Статус в очереди не ставится в очередь повторно'
+        )
+        outbox.start()
+        outbox.stop(timeout=2)
+        assert memory_state.get_homeworks(tenant.key) == {
+            '1': ('approved', None)}
+
+    def test_blocked_chat_is_marked_handled(self, monkeypatch, mock_api,
+                                            memory_state):
+        monkeypatch.setattr(homework, 'outbox', None)
+        mock_api.homeworks = [
+            {'id': 1, 'homework_name': 'hw', 'status': 'approved'}]
+        mock_api.current_date = 10000
+        bot = BlockedBot()
+        outbox = homework.init_outbox(bot)
+        tenant = Tenant('token', '1', from_date=5000)
+        homework.poll_tenant(None, tenant)
+        outbox.stop(timeout=2)
+        assert bot.calls == 1
+        assert tenant.from_date == 10000 - homework.CURSOR_OVERLAP, (
+            'Отказ Telegram не должен откатывать курсор опроса'
+        )
+        assert memory_state.get_homeworks(tenant.key) == {
+            '1': ('approved', None)}, (
+            'Статус, который Telegram отказался принять, не отправляется '
+            'повторно'
+        )
@@ -0,0 +1,73 @@
+import threading
+
+import homework
+from services.profiling import Profiler, Sampler, functions
+
+
+def busy(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def idle(stop):
+    stop.wait()
+
+
+class TestSampler:
+
+    def test_counts_targets_in_other_threads(self):
+        stop = threading.Event()
+        threads = [threading.Thread(target=function, args=(stop,))
+                   for function in (busy, idle)]
+        for thread in threads:
+            thread.start()
+        sampler = Sampler({'busy': functions(__file__, 'busy'),
+                           'missing': functions(__file__, 'missing')},
+                          interval=0.005)
+        report = sampler.run(0.2, threading.Event())
+        stop.set()
+        for thread in threads:
+            thread.join()
+        assert report.targets['busy'] > 0, (
+            'Функция, которая работает в другом потоке, '
+            'должна попадать в выборки'
+        )
+        assert report.targets['missing'] == 0
+        assert report.idle > 0, (
+            'Ожидающий поток должен считаться отдельно от работающих'
+        )
+        assert report.samples >= report.targets['busy']
+        assert report.hot
+
+
+class TestProfiler:
+
+    def test_toggle_writes_report(self, tmp_path):
+        path = tmp_path / 'profile.txt'
+        profiler = Profiler(Sampler(homework.PROFILE_TARGETS), 60,
+                            lambda: str(path), polls=lambda: 0)
+        profiler.toggle()
+        assert profiler.running
+        profiler.toggle()
+        profiler.join(5)
+        assert not profiler.running, (
+            'Повторный сигнал должен досрочно завершать окно'
+        )
+        report = path.read_text(encoding='utf-8')
+        for label in ('get_api_answer', 'check_response', 'parse_status',
+                      'send_message', 'logging'):
+            assert label in report
+
+    def test_profile_flag(self):
+        assert homework.parse_args([]).profile is None
+        assert homework.parse_args(['--profile']).profile == (
+            homework.PROFILE_WINDOW)
+        assert homework.parse_args(['--profile', '5']).profile == 5
+
+    def test_targets_match_bot_functions(self):
+        targets = homework.PROFILE_TARGETS
+        assert targets['get_api_answer'](homework.fetch_response.__code__)
+        assert targets['parse_status'](homework.render_status.__code__)
+        assert not targets['parse_status'](
+            homework.check_response.__code__)
+        assert targets['logging'](homework.logger.info.__code__)
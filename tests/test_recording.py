@@ -0,0 +1,108 @@
+import gzip
+import json
+import threading
+
+import homework
+from services.recording import Recorder, read_records, redact
+from tests.fixtures.fixture_data import MockResponse
+
+
+class TestRecorder:
+
+    def test_records_redacted_traffic(self, monkeypatch, tmp_path):
+        path = str(tmp_path / 'traffic.jsonl')
+        body = {'homeworks': [], 'current_date': 1000}
+        monkeypatch.setattr(homework, 'PRACTICUM_TOKEN', 'secret-token')
+        monkeypatch.setattr(homework.requests, 'get',
+                            lambda *args, **kwargs: MockResponse(body))
+        monkeypatch.setattr(homework, 'recorder', Recorder(path))
+        homework.get_api_answer(100)
+        homework.get_api_answer(200)
+        records = list(read_records(path))
+        assert [record.from_date for record in records] == [100, 200], (
+            'Запись должна попадать в файл сразу, без закрытия'
+        )
+        assert json.loads(records[0].body) == body
+        assert records[0].token == redact('secret-token')
+        homework.recorder.close()
+        with open(path, encoding='utf-8') as file:
+            assert 'secret-token' not in file.read(), (
+                'Токен не должен попадать в файл записи'
+            )
+
+    def test_skips_line_torn_by_crash(self, tmp_path):
+        path = tmp_path / 'traffic.jsonl'
+        recorder = Recorder(str(path))
+        recorder.record('token', 1, 200, '{}')
+        with open(path, 'ab') as file:
+            file.write(b'{"at": 1, "token": "abc", "from_da')
+        recorder = Recorder(str(path))
+        recorder.record('token', 2, 200, '{}')
+        recorder.record('token', 3, 200, '{}')
+        recorder.close()
+        assert [record.from_date
+                for record in read_records(str(path))] == [1, 3], (
+            'Оборванная при аварии строка должна пропускаться'
+        )
+
+    def test_concurrent_writers_do_not_interleave(self, tmp_path):
+        path = str(tmp_path / 'traffic.jsonl')
+        recorders = [Recorder(path) for _ in range(4)]
+        body = 'x' * 100000
+        threads = [threading.Thread(target=lambda r=recorder: [
+            r.record('token', number, 200, body) for number in range(20)])
+            for recorder in recorders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for recorder in recorders:
+            recorder.close()
+        assert len(list(read_records(path))) == 80
+
+    def test_reads_truncated_gzip(self, tmp_path):
+        path = tmp_path / 'traffic.jsonl'
+        recorder = Recorder(str(path))
+        for from_date in range(100):
+            recorder.record('token', from_date, 200, '{}' * from_date)
+        recorder.close()
+        packed = tmp_path / 'traffic.jsonl.gz'
+        packed.write_bytes(gzip.compress(path.read_bytes())[:-200])
+        records = list(read_records(str(packed)))
+        assert 0 < len(records) < 100
+
+    def test_unchanged_body_is_not_repeated(self, tmp_path):
+        path = str(tmp_path / 'traffic.jsonl')
+        recorder = Recorder(path)
+        body = '{{"homeworks": [], "current_date": {}}}'
+        recorder.record('token', 1, 200, body.format(1))
+        recorder.record('token', 2, 200, body.format(2))
+        recorder.record('other', 2, 200, body.format(2))
+        recorder.record('token', 3, 500, '')
+        recorder.close()
+        bodies = [record.body for record in read_records(path)]
+        assert bodies[1] is None, (
+            'Тело, совпавшее с прошлым без current_date, не записывается'
+        )
+        assert None not in (bodies[0], bodies[2], bodies[3])
+
+    def test_gzip_members_survive_torn_write(self, tmp_path):
+        path = tmp_path / 'traffic.jsonl.gz'
+        recorder = Recorder(str(path))
+        recorder.record('token', 1, 200, '{"homeworks": [1]}')
+        recorder.close()
+        torn = gzip.compress(b'{"at": 1, "token": "abc"}\n')[:-10]
+        with open(path, 'ab') as file:
+            file.write(torn)
+        recorder = Recorder(str(path))
+        for from_date in range(2, 5):
+            recorder.record('token', from_date, 200,
+                            f'{{"homeworks": [{from_date}]}}')
+        recorder.close()
+        assert [record.from_date
+                for record in read_records(str(path))] == [1, 2, 3, 4], (
+            'Оборванный член gzip не должен скрывать записи после него'
+        )
+        assert path.read_bytes().startswith(b'\x1f\x8b'), (
+            'Запись в файл .gz должна быть сжатой'
+        )
@@ -0,0 +1,45 @@
+import json
+
+from bench.replay import replay
+from services.recording import Record
+
+
+def record(at, status, homeworks, token='student', code=200):
+    body = json.dumps({
+        'homeworks': [{'id': 1, 'homework_name': 'hw', 'status': status}]
+        + homeworks,
+        'current_date': 1000,
+    })
+    return Record(at, token, 0, code, body)
+
+
+class TestReplay:
+
+    def test_replays_parsing_and_diffing(self):
+        other = [{'id': 2, 'homework_name': 'other', 'status': 'approved'}]
+        records = [
+            record(0.0, 'reviewing', []),
+            record(10.0, 'reviewing', other),
+            Record(20.0, 'student', 0, 500, ''),
+            record(30.0, 'approved', other),
+            record(40.0, 'approved', [], token='another'),
+            Record(50.0, 'student', 0, 200, '{"current_date": 1}'),
+        ]
+        sleeps = []
+        result = replay(records, speedup=10, sleep=sleeps.append)
+        assert sleeps == [1.0] * 5, (
+            'Паузы между ответами должны делиться на speedup'
+        )
+        assert result['responses'] == 5
+        assert result['skipped'] == 1
+        assert result['students'] == 2
+        assert result['messages'] == 4, (
+            'Сообщения должны появляться только для новых статусов'
+        )
+        assert result['errors'] == {'KeyError': 1}
+
+    def test_without_speedup_does_not_sleep(self):
+        sleeps = []
+        replay([record(0.0, 'reviewing', []), record(60.0, 'approved', [])],
+               sleep=sleeps.append)
+        assert sleeps == []
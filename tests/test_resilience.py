@@ -0,0 +1,75 @@
+import random
+from http import HTTPStatus
+
+import pytest
+
+import homework
+from services.resilience import (Backoff, CircuitBreaker, CircuitOpenError,
+                                 CLOSED, HALF_OPEN, OPEN)
+from tests.fixtures.fixture_data import Clock, MockResponse
+
+
+class TestBackoff:
+
+    def test_grows_and_is_capped(self):
+        backoff = Backoff(base=10, cap=100)
+        rng = random.Random(0)
+        for attempt, ceiling in ((1, 10), (2, 20), (3, 40), (10, 100)):
+            delay = backoff.delay(attempt, rng=rng)
+            assert ceiling / 2 <= delay <= ceiling
+
+
+class TestCircuitBreaker:
+
+    def test_open_half_open_closed(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60,
+                                 probe_timeout=10, clock=clock)
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError) as error:
+            breaker.before_request()
+        assert error.value.retry_after == 60
+
+        clock.now = 60
+        assert breaker.state == HALF_OPEN
+        breaker.before_request()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_request()
+        breaker.record_success()
+        assert breaker.state == CLOSED
+        breaker.before_request()
+
+    def test_failed_probe_reopens(self):
+        clock = Clock()
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60,
+                                 clock=clock)
+        breaker.record_failure()
+        clock.now = 60
+        breaker.before_request()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+
+
+class TestRequestHomeworksBreaker:
+
+    def test_open_breaker_stops_requests(self, monkeypatch):
+        calls = []
+
+        class MockSession:
+            def get(self, url, **kwargs):
+                calls.append(url)
+                return MockResponse(
+                    status_code=HTTPStatus.SERVICE_UNAVAILABLE)
+
+        monkeypatch.setattr(homework, 'session', MockSession())
+        monkeypatch.setattr(homework, 'api_breaker',
+                            CircuitBreaker(failure_threshold=2))
+        for _ in range(4):
+            with pytest.raises(ConnectionError):
+                homework.request_homeworks('token', 1)
+        assert len(calls) == 2, (
+            'Пока автомат разомкнут, запросы к API не отправляются'
+        )
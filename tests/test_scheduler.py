@@ -0,0 +1,52 @@
+import random
+
+import homework
+from services.http import ApiResponseError, parse_retry_after
+from services.scheduler import PollPolicy
+from services.tenants import Tenant
+from tests.fixtures.fixture_data import MockBot
+
+
+class TestPollPolicy:
+    policy = PollPolicy(base=600, reviewing=120, idle=1800, jitter=0)
+
+    def test_reviewing_is_polled_faster(self):
+        assert self.policy.delay(True, 0) == 120
+
+    def test_idle_backs_off_up_to_limit(self):
+        delays = [self.policy.delay(False, idle) for idle in range(4)]
+        assert delays == [600, 1200, 1800, 1800]
+
+    def test_retry_after_is_honoured(self):
+        error = ApiResponseError('Сбой', 429, retry_after=900)
+        assert homework.next_poll_delay(
+            Tenant('token', '1'), False, error) == 900, (
+            'После ответа с Retry-After опрос откладывается не меньше, '
+            'чем просит сервер'
+        )
+
+    def test_jitter_bounds(self):
+        policy = PollPolicy(base=600, jitter=0.1)
+        rng = random.Random(1)
+        delays = {policy.delay(False, 0, rng=rng) for _ in range(50)}
+        assert len(delays) > 1
+        assert all(540 <= delay <= 660 for delay in delays)
+
+    def test_parse_retry_after(self):
+        assert parse_retry_after({'Retry-After': '30'}) == 30
+        assert parse_retry_after({}) is None
+        assert parse_retry_after(
+            {'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}) == 0
+
+
+class TestNextPollDelay:
+
+    def test_poll_tenant_returns_reviewing_delay(self, monkeypatch,
+                                                 mock_api, memory_state):
+        mock_api.homeworks = [
+            {'id': 1, 'homework_name': 'hw', 'status': 'reviewing'}]
+        monkeypatch.setattr(homework, 'poll_policy', TestPollPolicy.policy)
+        delay = homework.poll_tenant(MockBot(), Tenant('token', '1'))
+        assert delay == 120, (
+            'Пока работа на ревью, опрос должен идти чаще'
+        )
@@ -0,0 +1,149 @@
+import os
+import signal
+import sys
+import time
+
+from services.sharding import HashRing, Supervisor, owned
+
+
+def shard_target(shard, items):
+    if shard == 'shard-1':
+        sys.exit(1)
+    time.sleep(30)
+
+
+def signalled_target(shard, items):
+    path = items[0]
+    signal.signal(signal.SIGUSR1, lambda *args: open(
+        f'{path}.{shard}', 'w').close())
+    open(f'{path}.ready.{shard}', 'w').close()
+    time.sleep(30)
+
+
+def finished_target(shard, items):
+    pass
+
+
+def slow_target(shard, items):
+    path, delay, _ = items[0]
+    signal.signal(signal.SIGTERM, lambda *args: (
+        time.sleep(delay), sys.exit(0)))
+    open(f'{path}.ready.{shard}', 'w').close()
+    time.sleep(30)
+
+
+def wait_for(path, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        assert time.monotonic() < deadline, f'Не дождались {path}'
+        time.sleep(0.05)
+
+
+def wait_dead(supervisor, shard, timeout=10):
+    process = supervisor._processes[shard]
+    process.join(timeout)
+    assert not process.is_alive()
+
+
+class TestHashRing:
+
+    def test_removal_moves_only_removed_keys(self):
+        keys = [f'tenant{number}' for number in range(1000)]
+        ring = HashRing(['a', 'b', 'c'])
+        before = {key: ring.node_for(key) for key in keys}
+        assert set(before.values()) == {'a', 'b', 'c'}
+        ring.remove('c')
+        after = {key: ring.node_for(key) for key in keys}
+        moved = [key for key in keys if before[key] != after[key]]
+        assert moved and all(before[key] == 'c' for key in moved), (
+            'При удалении узла переезжают только его ключи'
+        )
+
+    def test_owned_splits_between_nodes(self):
+        keys = [f'tenant{number}' for number in range(100)]
+        parts = [owned(keys, str, 3, node) for node in range(3)]
+        assert sorted(sum(parts, [])) == sorted(keys)
+
+
+class TestSupervisor:
+
+    def test_crashing_shard_is_restarted_then_evicted(self):
+        items = [f'tenant{number}' for number in range(20)]
+        supervisor = Supervisor(shard_target, items, str, shards=2,
+                                max_restarts=1, stop_timeout=5)
+        supervisor.start()
+        try:
+            assert set(supervisor.assignment) == {'shard-0', 'shard-1'}
+            wait_dead(supervisor, 'shard-1')
+            supervisor.check()
+            assert 'shard-1' in supervisor.ring.nodes, (
+                'Упавший шард сначала перезапускается'
+            )
+            wait_dead(supervisor, 'shard-1')
+            supervisor.check()
+            assert supervisor.ring.nodes == ['shard-0']
+            assert sorted(supervisor.assignment['shard-0']) == sorted(items)
+        finally:
+            supervisor.stop()
+
+    def test_empty_shard_is_not_started(self):
+        supervisor = Supervisor(shard_target, ['tenant'], str, shards=3,
+                                stop_timeout=5)
+        supervisor.start()
+        try:
+            owner = supervisor.ring.node_for('tenant')
+            assert list(supervisor._processes) == [owner], (
+                'Шард без подписок не запускается'
+            )
+        finally:
+            supervisor.stop()
+
+    def test_clean_exit_is_not_restarted(self):
+        supervisor = Supervisor(finished_target, ['tenant'], str, shards=1)
+        supervisor.start()
+        wait_dead(supervisor, 'shard-0')
+        supervisor.check()
+        assert supervisor._processes == {}, (
+            'Шард, завершившийся с кодом 0, не перезапускается'
+        )
+        assert 'shard-0' in supervisor.ring.nodes
+
+    def test_signal_is_forwarded_to_shards(self, tmp_path):
+        path = str(tmp_path / 'signalled')
+        supervisor = Supervisor(signalled_target, [path], str, shards=1,
+                                stop_timeout=5)
+        supervisor.start()
+        try:
+            wait_for(f'{path}.ready.shard-0')
+            supervisor.forward(signal.SIGUSR1)
+            wait_for(f'{path}.shard-0')
+        finally:
+            supervisor.stop()
+
+    def test_shards_stop_within_one_deadline(self, tmp_path):
+        path = str(tmp_path / 'slow')
+        items = [(path, 1, number) for number in range(30)]
+        supervisor = Supervisor(slow_target, items, lambda item: str(item[2]),
+                                shards=3, stop_timeout=5)
+        supervisor.start()
+        for shard in supervisor.ring.nodes:
+            wait_for(f'{path}.ready.{shard}')
+        processes = list(supervisor._processes.values())
+        started = time.monotonic()
+        supervisor.stop()
+        assert time.monotonic() - started < 2.5, (
+            'Шарды останавливаются одновременно, а не по очереди'
+        )
+        assert [process.exitcode for process in processes] == [0, 0, 0]
+
+    def test_straggler_is_killed_at_deadline(self, tmp_path):
+        path = str(tmp_path / 'stuck')
+        supervisor = Supervisor(slow_target, [(path, 30, 0)], str,
+                                shards=1, stop_timeout=0.5)
+        supervisor.start()
+        wait_for(f'{path}.ready.shard-0')
+        process = supervisor._processes['shard-0']
+        started = time.monotonic()
+        supervisor.stop()
+        assert time.monotonic() - started < 5
+        assert process.exitcode == -signal.SIGKILL
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+
+import pytest
+
+import homework
+from services.outbox import Outbox
+from services.shutdown import Shutdown
+from services.tenants import Tenant
+from tests.fixtures.fixture_data import MockBot
+
+
+@pytest.fixture
+def shutdown(monkeypatch):
+    expired = []
+    shutdown = Shutdown(5, lambda: expired.append(True))
+    shutdown.expired = expired
+    monkeypatch.setattr(homework, 'shutdown', shutdown)
+    return shutdown
+
+
+class TestShutdown:
+
+    def test_wait_is_interrupted(self, shutdown):
+        threading.Timer(0.05, shutdown.request).start()
+        started = time.monotonic()
+        assert shutdown.wait(5)
+        assert time.monotonic() - started < 1, (
+            'Ожидание должно прерываться запросом остановки'
+        )
+        assert shutdown.remaining() <= 5
+
+    def test_subscribe_after_request(self, shutdown):
+        called = []
+        shutdown.request()
+        shutdown.subscribe(lambda: called.append(True))
+        assert called == [True]
+
+    def test_deadline(self):
+        expired = threading.Event()
+        Shutdown(0.05, expired.set).request()
+        assert expired.wait(1), (
+            'По истечении срока остановки вызывается on_timeout'
+        )
+
+    def test_signal_exits_until_deferred(self, shutdown):
+        previous = signal.getsignal(signal.SIGUSR1)
+        shutdown.install((signal.SIGUSR1,))
+        try:
+            with pytest.raises(SystemExit):
+                os.kill(os.getpid(), signal.SIGUSR1)
+                time.sleep(1)
+            fresh = Shutdown(5, lambda: None)
+            fresh.install((signal.SIGUSR1,))
+            fresh.defer_exit()
+            os.kill(os.getpid(), signal.SIGUSR1)
+            assert fresh.wait(1), (
+                'После defer_exit() сигнал только запрашивает остановку'
+            )
+        finally:
+            signal.signal(signal.SIGUSR1, previous)
+
+
+class TestGracefulStop:
+
+    def test_run_tenants_stops_without_sleeping(self, monkeypatch, shutdown,
+                                                memory_state):
+        monkeypatch.setattr(homework, 'poll_tenant', lambda bot, tenant: 600)
+        threading.Timer(0.2, shutdown.request).start()
+        started = time.monotonic()
+        homework.run_tenants(MockBot(), [Tenant('token', '1')])
+        assert time.monotonic() - started < 2, (
+            'Цикл опроса должен выйти сразу после запроса остановки'
+        )
+
+    def test_run_tenants_async_stops(self, monkeypatch, shutdown,
+                                     memory_state):
+        monkeypatch.setattr(homework, 'poll_tenant_async', None)
+        threading.Timer(0.2, shutdown.request).start()
+        started = time.monotonic()
+        asyncio.run(homework.run_tenants_async(
+            MockBot(), [Tenant('token', '1')], io_threads=1))
+        assert time.monotonic() - started < 2
+
+    def test_unsent_notification_rewinds_cursor(self, monkeypatch,
+                                                memory_state):
+        outbox = Outbox(lambda chat_id, text: None)
+        monkeypatch.setattr(homework, 'outbox', outbox)
+        tenant = Tenant('token', '1', from_date=100)
+        pending = next(homework.pending_statuses(
+            tenant, [{'id': 1, 'homework_name': 'hw', 'status': 'approved'}]))
+        homework.notify(MockBot(), tenant, pending)
+        homework.save_from_date(tenant, {'current_date': 5000})
+        assert outbox.stop(timeout=0) == 1
+        assert tenant.from_date == 100, (
+            'Неотправленное уведомление откатывает курсор подписки'
+        )
+        assert memory_state.get_cursor(tenant.key) == 100
@@ -0,0 +1,68 @@
+from http import HTTPStatus
+
+import pytest
+import requests
+
+import homework
+from bench.run import benchmark, percentile
+from bench.simulator import Simulator, SimulatorConfig
+
+
+class TestBenchmark:
+
+    def test_percentile(self):
+        assert percentile([], 0.5) is None
+        assert percentile([3, 1, 2], 0.5) == 2
+        assert percentile(list(range(1, 101)), 0.99) == 99
+
+    def test_end_to_end_on_simulator(self, monkeypatch):
+        for name in ('ENDPOINT', 'poll_policy', 'session', 'state_store',
+                     'outbox', 'response_cache'):
+            monkeypatch.setattr(homework, name, getattr(homework, name))
+        simulator = Simulator(SimulatorConfig(change_interval=0.2)).start()
+        try:
+            result = benchmark(tenants=3, duration=1.5, interval=0.1,
+                               workers=4, simulator=simulator)
+        finally:
+            simulator.stop()
+        assert result['polls'] > 3
+        assert result['notified_changes'] > 0, (
+            'Смена статуса в симуляторе должна дойти до sendMessage'
+        )
+        assert result['latency_p50_s'] is not None
+
+
+class TestSimulatorFaults:
+
+    @pytest.fixture
+    def simulator(self, request):
+        simulator = Simulator(SimulatorConfig(
+            retry_after=7, **request.param)).start()
+        yield simulator
+        simulator.stop()
+
+    @pytest.mark.parametrize(
+        'simulator', [{'api_429_rate': 1.0}], indirect=True)
+    def test_api_rate_limit_sends_retry_after(self, simulator):
+        response = requests.get(
+            simulator.endpoint, params={'from_date': 0},
+            headers={'Authorization': 'OAuth token'})
+        assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+        assert response.headers['Retry-After'] == '7', (
+            'Ответ 429 API статусов должен нести заголовок Retry-After'
+        )
+        assert simulator.stats.api_rate_limited == 1
+        assert simulator.stats.poll_errors == 0
+
+    @pytest.mark.parametrize(
+        'simulator', [{'telegram_error_rate': 1.0}], indirect=True)
+    def test_telegram_error(self, simulator):
+        response = requests.post(
+            simulator.telegram_url + 'token/sendMessage',
+            json={'chat_id': 1, 'text': 'text'})
+        assert response.status_code == HTTPStatus.INTERNAL_SERVER_ERROR
+        assert response.json()['ok'] is False, (
+            'sendMessage должен уметь отвечать ошибкой, отличной от 429'
+        )
+        assert simulator.stats.send_errors == 1
+        assert simulator.stats.sends == 0
@@ -0,0 +1,114 @@
+import threading
+import time
+
+import pytest
+
+import homework
+from services.singleflight import CoalescingCache, SingleFlight
+from tests.fixtures.fixture_data import MockResponse
+
+
+class TestSingleFlight:
+
+    def test_concurrent_calls_share_result(self):
+        flight = SingleFlight()
+        calls = []
+
+        def slow(value):
+            calls.append(value)
+            time.sleep(0.1)
+            return value * 2
+
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(flight.do('key', slow, 21)))
+            for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert calls == [21], (
+            'Одновременные вызовы с одним ключом выполняются один раз'
+        )
+        assert results == [42] * 5
+        assert len(flight) == 0
+
+    def test_error_is_shared_and_not_cached(self):
+        flight = SingleFlight()
+
+        def fail():
+            raise ConnectionError('Сбой')
+
+        with pytest.raises(ConnectionError):
+            flight.do('key', fail)
+        assert flight.do('key', lambda: 'ok') == 'ok', (
+            'Завершённый вызов не должен кешироваться'
+        )
+
+
+class TestCoalescingCache:
+
+    def test_result_expires_after_ttl(self):
+        now = [0.0]
+        cache = CoalescingCache(ttl=5, clock=lambda: now[0])
+        calls = []
+
+        def load(value):
+            calls.append(value)
+            return value
+
+        assert cache.call('key', load, 1) == 1
+        now[0] = 4.9
+        assert cache.call('key', load, 2) == 1, (
+            'Недавний результат должен отдаваться из кеша'
+        )
+        now[0] = 5.0
+        assert cache.call('key', load, 3) == 3
+        assert calls == [1, 3]
+        assert cache.shared == 1
+
+    def test_least_recently_used_is_evicted(self):
+        cache = CoalescingCache(ttl=60, max_size=2)
+        cache.call('a', str, 1)
+        cache.call('b', str, 2)
+        cache.call('a', str, 10)
+        cache.call('c', str, 3)
+        assert len(cache) == 2
+        assert cache.call('a', str, 11) == '1'
+        assert cache.call('b', str, 20) == '20', (
+            'Вытесняться должен давно не запрошенный результат'
+        )
+
+    def test_errors_are_not_cached(self):
+        cache = CoalescingCache(ttl=60)
+
+        def fail():
+            raise ConnectionError('Сбой')
+
+        with pytest.raises(ConnectionError):
+            cache.call('key', fail)
+        assert cache.call('key', lambda: 'ok') == 'ok'
+
+    def test_concurrent_api_calls_share_request(self, monkeypatch):
+        calls = []
+
+        def mock_get(*args, **kwargs):
+            calls.append(kwargs['params'])
+            time.sleep(0.1)
+            return MockResponse()
+
+        monkeypatch.setattr(homework.requests, 'get', mock_get)
+        monkeypatch.setattr(homework, 'api_calls', CoalescingCache(ttl=60))
+        threads = [threading.Thread(
+            target=homework.get_api_answer, args=(1000,))
+            for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        homework.get_api_answer(1000)
+        homework.get_api_answer(2000)
+        assert calls == [{'from_date': 1000}, {'from_date': 2000}], (
+            'Одинаковые запросы к API должны выполняться один раз'
+        )
+        assert homework.api_calls.shared == 5
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+from bench.startup import ROOT, parse_import_times
+
+IMPORTTIME = '''import time: self [us] | cumulative | imported package
+import time:       100 |        100 | site
+import time:        50 |         50 |     telegram.error
+import time:       300 |        350 |   telegram
+import time:       200 |        200 |   requests
+import time:        10 |        560 | homework
+'''
+
+
+class TestStartup:
+
+    def test_import_is_lazy(self, tmp_path):
+        code = ('import sys, threading, homework; print(sorted(m for m in '
+                '("telegram", "asyncio", "dotenv", "multiprocessing", '
+                '"http.server") if m in sys.modules), '
+                'threading.active_count())')
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        env.pop('LOG_FILE', None)
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=str(tmp_path), env=env,
+            check=True, stdout=subprocess.PIPE, universal_newlines=True
+        ).stdout
+        modules, threads = output.rsplit(' ', 1)
+        assert modules == '[]', (
+            'Импорт homework не должен загружать telegram, asyncio, dotenv, '
+            'multiprocessing и http.server'
+        )
+        assert threads.strip() == '1', (
+            'Импорт homework не должен запускать потоки'
+        )
+        assert not (tmp_path / 'homework.py.log').exists(), (
+            'Файл лога должен открываться при первой записи, а не при импорте'
+        )
+
+    def test_parse_import_times(self):
+        assert parse_import_times(IMPORTTIME, 'homework') == [
+            (350, 'telegram'), (200, 'requests')]
@@ -0,0 +1,77 @@
+import homework
+from services.state import SQLiteStateStore
+from services.tenants import Tenant
+from tests.fixtures.fixture_data import MockBot
+
+
+class TestSQLiteStateStore:
+
+    def test_wal_and_persistence(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        store = SQLiteStateStore(path)
+        mode = store._connection.execute('PRAGMA journal_mode').fetchone()
+        assert mode[0] == 'wal'
+        store.set_cursor('tenant', 100)
+        store.set_homework('tenant', '1', 'reviewing', '2022-01-01')
+        store.close()
+
+        store = SQLiteStateStore(path)
+        assert store.get_cursor('tenant') == 100
+        assert store.get_homeworks('tenant') == {
+            '1': ('reviewing', '2022-01-01')}
+        assert store.get_cursor('other') is None
+        store.close()
+
+    def test_paused_persists(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        store = SQLiteStateStore(path)
+        store.set_paused('tenant', True)
+        store.close()
+        store = SQLiteStateStore(path)
+        assert store.is_paused('tenant'), (
+            'Пауза подписки должна переживать перезапуск'
+        )
+        store.set_paused('tenant', False)
+        assert not store.is_paused('tenant')
+        store.close()
+
+    def test_writes_are_batched(self, tmp_path):
+        path = str(tmp_path / 'state.db')
+        store = SQLiteStateStore(path, batch_size=3, flush_interval=60)
+        store.set_homework('tenant', '1', 'reviewing')
+        store.set_homework('tenant', '2', 'reviewing')
+        reader = SQLiteStateStore(path)
+        assert reader.get_homeworks('tenant') == {}, (
+            'Записи должны копиться до заполнения пакета'
+        )
+        store.set_homework('tenant', '3', 'reviewing')
+        reader._homeworks.clear()
+        assert len(reader.get_homeworks('tenant')) == 3
+        reader.close()
+        store.close()
+
+
+class TestStatusDedup:
+
+    def test_restart_does_not_resend(self, monkeypatch, mock_api, tmp_path):
+        mock_api.homeworks = [
+            {'id': 1, 'homework_name': 'hw', 'status': 'reviewing'}]
+        mock_api.current_date = 1000
+        path = str(tmp_path / 'state.db')
+        bot = MockBot()
+        for _ in range(2):
+            monkeypatch.setattr(homework, 'state_store',
+                                SQLiteStateStore(path))
+            homework.poll_tenant(bot, Tenant('token', '1'))
+            homework.state_store.close()
+        assert len(bot.sent) == 1, (
+            'После перезапуска уже отправленный статус не отправляется'
+        )
+
+        mock_api.homeworks[0]['status'] = 'approved'
+        monkeypatch.setattr(homework, 'state_store', SQLiteStateStore(path))
+        homework.poll_tenant(bot, Tenant('token', '1'))
+        homework.state_store.close()
+        assert len(bot.sent) == 2, (
+            'Смена статуса той же работы должна отправляться'
+        )
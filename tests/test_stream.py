@@ -0,0 +1,138 @@
+import json
+
+import pytest
+
+import homework
+from services.http import ApiResponseError
+from services.resilience import CircuitBreaker
+from services.stream import HomeworkStream
+from services.tenants import Tenant
+
+RESPONSE = {
+    'current_date': 1700000000,
+    'homeworks': [
+        {'id': 1, 'homework_name': 'Домашка "один"', 'status': 'approved'},
+        {'id': 2, 'homework_name': 'два', 'status': 'reviewing',
+         'lesson': {'tags': [1, 2.5, None, True]}},
+    ],
+    'extra': {'nested': ['}', ']']},
+}
+
+
+def chunked(body, size):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+class TestHomeworkStream:
+
+    @pytest.mark.parametrize('size', [1, 3, 7, 4096])
+    def test_same_as_json(self, size):
+        body = json.dumps(RESPONSE, ensure_ascii=False).encode()
+        stream = HomeworkStream(chunked(body, size))
+        assert list(stream) == RESPONSE['homeworks'], (
+            'Потоковый разбор должен совпадать с json.loads'
+        )
+        assert stream.get('current_date') == RESPONSE['current_date']
+        assert stream.get('extra') == RESPONSE['extra']
+
+    @pytest.mark.parametrize('chunks, value', [
+        ([b'{"current_date": 1.', b'5, "homeworks": []}'], 1.5),
+        ([b'{"current_date": 1e', b'3, "homeworks": []}'], 1000.0),
+        ([b'{"current_date": 1e-', b'1, "homeworks": []}'], 0.1),
+        ([b'{"current_date": 12', b'3, "homeworks": []}'], 123),
+    ])
+    def test_number_split_between_chunks(self, chunks, value):
+        stream = HomeworkStream(chunks)
+        assert list(stream) == []
+        assert stream.get('current_date') == value, (
+            'Число, разрезанное границей куска, должно читаться целиком'
+        )
+
+    def test_yields_before_body_is_read(self):
+        read = []
+
+        def chunks():
+            for chunk in (b'{"homeworks": [{"id": 1}', b', {"id": 2}]}'):
+                read.append(chunk)
+                yield chunk
+
+        stream = iter(HomeworkStream(chunks()))
+        assert next(stream) == {'id': 1}
+        assert len(read) == 1, (
+            'Работа должна отдаваться до того, как прочитан весь ответ'
+        )
+
+    def test_closes_response(self):
+        closed = []
+        stream = HomeworkStream([b'{"homeworks": []}'],
+                                close=lambda: closed.append(True))
+        assert list(stream) == []
+        assert closed == [True]
+
+    @pytest.mark.parametrize('body, error', [
+        (b'{"current_date": 1}', KeyError),
+        (b'{"homeworks": {}}', TypeError),
+        (b'{"homeworks": [1]}', TypeError),
+        (b'[]', TypeError),
+        (b'{"homeworks": [{"id": 1}', ValueError),
+    ])
+    def test_errors(self, body, error):
+        with pytest.raises(error):
+            list(HomeworkStream(chunked(body, 2)))
+
+
+class MockStreamResponse:
+    status_code = 200
+    headers = {'ETag': '"v1"'}
+
+    def __init__(self, body, status_code=200):
+        self.body = body
+        self.status_code = status_code
+        self.closed = False
+
+    def iter_content(self, chunk_size):
+        return chunked(self.body, 5)
+
+    def close(self):
+        self.closed = True
+
+
+class TestStreamChanges:
+
+    def test_poll_with_stream(self, monkeypatch, memory_state):
+        body = json.dumps(RESPONSE).encode()
+        calls = []
+
+        class MockSession:
+            def get(self, url, **kwargs):
+                calls.append(kwargs)
+                return MockStreamResponse(body)
+
+        monkeypatch.setattr(homework, 'session', MockSession())
+        monkeypatch.setattr(homework, 'STREAM_RESPONSES', True)
+        tenant = Tenant('token', '1', from_date=500)
+        response, pending = homework.collect_changes(tenant)
+        assert calls[0]['stream'] is True, (
+            'В потоковом режиме тело ответа не должно читаться заранее'
+        )
+        assert [change.homework_id for change, _ in pending] == ['1', '2']
+        homework.save_from_date(tenant, response)
+        assert tenant.from_date == (
+            RESPONSE['current_date'] - homework.CURSOR_OVERLAP)
+
+    def test_error_response_is_closed(self, monkeypatch, memory_state):
+        response = MockStreamResponse(b'{"error": "boom"}', 500)
+
+        class MockSession:
+            def get(self, url, **kwargs):
+                return response
+
+        monkeypatch.setattr(homework, 'session', MockSession())
+        monkeypatch.setattr(homework, 'api_breaker', CircuitBreaker())
+        monkeypatch.setattr(homework, 'STREAM_RESPONSES', True)
+        with pytest.raises(ApiResponseError):
+            homework.collect_changes(Tenant('token', '1'))
+        assert response.closed, (
+            'Потоковый ответ с ошибкой должен закрываться, '
+            'иначе соединение не вернётся в пул'
+        )
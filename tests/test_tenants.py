@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+import homework
+from services.tenants import Tenant, load_tenants
+from tests.fixtures.fixture_data import MockBot
+
+
+class TestTenants:
+
+    def test_load_tenants(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'token1', 'chat_id': 1},
+            {'practicum_token': 'token2', 'chat_id': '2'},
+        ]))
+        tenants = load_tenants(str(path))
+        assert [tenant.chat_id for tenant in tenants] == ['1', '2'], (
+            'Проверьте, что подписки загружаются из файла'
+        )
+        assert 'token1' not in repr(tenants[0]), (
+            'Токен Практикума не должен попадать в repr подписки'
+        )
+
+    def test_load_tenants_locale_and_format(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([
+            {'practicum_token': 'token1', 'chat_id': 1, 'locale': 'en',
+             'format': 'markdown'},
+            {'practicum_token': 'token2', 'chat_id': 2, 'format': 'rtf'},
+        ]))
+        with pytest.raises(ValueError):
+            load_tenants(str(path))
+        path.write_text(path.read_text().replace('rtf', 'html'))
+        first, second = load_tenants(str(path))
+        assert (first.locale, first.parse_mode) == ('en', 'MarkdownV2')
+        assert (second.locale, second.parse_mode) == (None, 'HTML')
+
+    def test_load_tenants_missing_key(self, tmp_path):
+        path = tmp_path / 'tenants.json'
+        path.write_text(json.dumps([{'practicum_token': 'token1'}]))
+        with pytest.raises(KeyError):
+            load_tenants(str(path))
+
+    def test_poll_tenant_uses_own_token_and_chat(self, mock_api,
+                                                 memory_state):
+        mock_api.homeworks = [{'homework_name': 'hw', 'status': 'approved'}]
+        bot = MockBot()
+        tenants = [Tenant('token1', '1'), Tenant('token2', '2')]
+        for tenant in tenants:
+            homework.poll_tenant(bot, tenant)
+            homework.poll_tenant(bot, tenant)
+        assert mock_api.tokens == ['token1', 'token1', 'token2', 'token2']
+        assert [chat_id for chat_id, _ in bot.sent] == ['1', '2'], (
+            'Каждое изменение статуса отправляется один раз '
+            'в чат своей подписки'
+        )
+
+    def test_poll_tenant_advances_cursor(self, mock_api, memory_state):
+        mock_api.current_date = 10000
+        tenant = Tenant('token', '1', from_date=5000)
+        homework.poll_tenant(MockBot(), tenant)
+        homework.poll_tenant(MockBot(), tenant)
+        assert mock_api.from_dates == [
+            5000, 10000 - homework.CURSOR_OVERLAP], (
+            'Проверьте, что следующий опрос запрашивает изменения '
+            'начиная с current_date предыдущего ответа'
+        )
+
+    def test_cursor_kept_without_current_date(self):
+        assert homework.next_from_date({'homeworks': []}, 5000) == 5000
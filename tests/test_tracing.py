@@ -0,0 +1,102 @@
+import json
+from functools import partial
+
+import pytest
+
+import homework
+from services.outbox import Outbox
+from services.tenants import Tenant
+from services.tracing import (ERROR, NOOP_SPAN, FileExporter, MemoryExporter,
+                              NoopTracer, Tracer)
+from tests.fixtures.fixture_data import MockBot, MockResponse
+
+RESPONSE = {
+    'homeworks': [{'id': 7, 'homework_name': 'hw', 'status': 'approved'}],
+    'current_date': 1,
+}
+
+
+class TestTracer:
+
+    def test_nested_spans_share_trace(self):
+        exporter = MemoryExporter()
+        tracer = Tracer(exporter)
+        with tracer.span('poll', {'tenant': 'key'}) as root:
+            with tracer.span('get_api_answer') as child:
+                child.set_attribute('http.status_code', 200)
+        with tracer.span('poll') as other:
+            pass
+        assert [span.name for span in exporter.spans] == [
+            'get_api_answer', 'poll', 'poll']
+        assert child.trace_id == root.trace_id
+        assert child.parent_id == root.span_id
+        assert root.parent_id is None
+        assert other.trace_id != root.trace_id, (
+            'Каждый цикл опроса должен получать свою трассу'
+        )
+        assert root.end >= child.end >= child.start >= root.start
+
+    def test_error_marks_span(self):
+        exporter = MemoryExporter()
+        with pytest.raises(KeyError):
+            with Tracer(exporter).span('check_response'):
+                raise KeyError('homeworks')
+        span = exporter.spans[0].to_dict()
+        assert span['status'] == {'code': ERROR, 'message': 'KeyError'}
+
+    def test_noop_tracer_records_nothing(self):
+        with NoopTracer().span('poll', {'tenant': 'key'}) as span:
+            span.set_attribute('changes', 1)
+        assert span is NOOP_SPAN
+
+    def test_file_exporter_writes_json_lines(self, tmp_path):
+        path = tmp_path / 'spans.jsonl'
+        tracer = Tracer(FileExporter(str(path)))
+        with tracer.span('poll', {'tenant': 'key'}):
+            pass
+        tracer.close()
+        span = json.loads(path.read_text(encoding='utf-8'))
+        assert span['name'] == 'poll'
+        assert span['attributes'] == {'tenant': 'key'}
+        assert len(span['trace_id']) == 32 and len(span['span_id']) == 16
+
+
+class TestPollTracing:
+
+    def test_poll_stages_are_traced(self, monkeypatch, memory_state):
+        exporter = MemoryExporter()
+        monkeypatch.setattr(homework, 'tracer', Tracer(exporter))
+        monkeypatch.setattr(homework.requests, 'get',
+                            lambda *args, **kwargs: MockResponse(RESPONSE))
+        homework.poll_tenant(MockBot(), Tenant('token', '1'))
+        spans = {span.name: span for span in exporter.spans}
+        assert set(spans) == {
+            'poll', 'get_api_answer', 'check_response', 'diff_statuses',
+            'parse_status', 'notify', 'send_message'}, (
+            'Каждый этап цикла опроса должен попадать в трассу'
+        )
+        assert len({span.trace_id for span in exporter.spans}) == 1
+        assert spans['get_api_answer'].attributes['http.status_code'] == 200
+        assert spans['parse_status'].parent_id == (
+            spans['diff_statuses'].span_id)
+        assert spans['notify'].attributes['homework.id'] == '7'
+        assert spans['send_message'].parent_id == spans['notify'].span_id
+
+    def test_queued_send_is_child_of_notify(self, monkeypatch,
+                                            memory_state):
+        exporter = MemoryExporter()
+        monkeypatch.setattr(homework, 'tracer', Tracer(exporter))
+        monkeypatch.setattr(homework.requests, 'get',
+                            lambda *args, **kwargs: MockResponse(RESPONSE))
+        outbox = Outbox(partial(homework.deliver_message, MockBot()),
+                        workers=1)
+        monkeypatch.setattr(homework, 'outbox', outbox)
+        homework.poll_tenant(None, Tenant('token', '1'))
+        outbox.start()
+        outbox.stop(timeout=2)
+        spans = {span.name: span for span in exporter.spans}
+        assert spans['send_message'].parent_id == spans['notify'].span_id, (
+            'Отправка из очереди должна попадать в трассу уведомления'
+        )
+        assert spans['send_message'].trace_id == spans['poll'].trace_id
+        assert spans['send_message'].attributes['telegram.chat_id'] == '1'